@@ -0,0 +1,398 @@
+from typing import List, Tuple, Union
+
+import numpy
+
+from first_distance import FirstDistance
+from first_pace import FirstPace
+from first_speed import FirstSpeed
+from first_step import FirstStepBase, FirstStepBody, FirstStepRepeat, FirstStepShape
+from first_time import FirstTime
+from first_workout import FirstWorkout
+
+
+def _index_array(values: List[int]) -> numpy.ndarray:
+
+    """
+    The smallest signed integer array that holds the values - indexes and counts of a plan fit in 8 or 16 bits
+
+    :param values: integer values, -1 for none
+    :type values: list[int]
+    :return: the array
+    :rtype: numpy.ndarray
+    """
+    low = min(values, default=0)
+    high = max(values, default=0)
+    for dtype in [numpy.int8, numpy.int16, numpy.int32]:
+        limits = numpy.iinfo(dtype)
+        if limits.min <= low and high <= limits.max:
+            return numpy.array(values, dtype=dtype)
+
+    return numpy.array(values, dtype=numpy.int64)
+
+
+class FirstStepArena(object):
+
+    """All the steps of a plan in parallel arrays, in depth first order so a parent always comes before its children.
+    Paces, names and intensities are stored once and referenced by index.
+    The children of a step, and the top level steps of a workout, are linked with first_child and next_sibling.
+    Use view() and workout_steps() for objects with the step API, and totals() for array computations"""
+
+    BODY = 0
+    REPEAT = 1
+    DISTANCE = 0
+    TIME = 1
+
+    def __init__(self, workouts: List[FirstWorkout]):
+
+        """
+        Constructor
+
+        :param workouts: the workouts of a plan
+        :type workouts: list[FirstWorkout]
+        :return: instance of FirstStepArena
+        :rtype: FirstStepArena
+        """
+        self.paces = []
+        self.names = []
+        self.intensities = []
+        pace_ids = {}
+        name_ids = {}
+        intensity_ids = {}
+
+        kinds = []
+        parents = []
+        workout_indexes = []
+        repeats = []
+        counts = []
+        duration_kinds = []
+        values = []
+        units = []
+        pace_indexes = []
+        name_indexes = []
+        intensity_indexes = []
+        step_ids = []
+
+        def index_of(item, ids: dict, items: list) -> int:
+            index = ids.get(item)
+            if index is None:
+                index = len(items)
+                ids[item] = index
+                items.append(item)
+            return index
+
+        def add(step: FirstStepBase, parent: int, workout_index: int, count: int) -> None:
+            index = len(kinds)
+            parents.append(parent)
+            workout_indexes.append(workout_index)
+            counts.append(count)
+            name_indexes.append(index_of(item=step.name, ids=name_ids, items=self.names))
+            step_ids.append(step.step_id)
+            if isinstance(step, FirstStepRepeat):
+                kinds.append(self.REPEAT)
+                repeats.append(step.repeat)
+                duration_kinds.append(-1)
+                values.append(numpy.nan)
+                units.append(-1)
+                pace_indexes.append(-1)
+                intensity_indexes.append(-1)
+                for child in step.steps:
+                    add(step=child, parent=index, workout_index=workout_index, count=count * step.repeat)
+            else:
+                kinds.append(self.BODY)
+                repeats.append(1)
+                if step.get_duration_type() == 'distance':
+                    duration_kinds.append(self.DISTANCE)
+                    values.append(step.distance.distance)
+                    units.append(FirstDistance.units.unit_id(name=step.distance.unit))
+                else:
+                    duration_kinds.append(self.TIME)
+                    values.append(step.time.total_seconds())
+                    units.append(-1)
+                pace_indexes.append(index_of(item=step.pace, ids=pace_ids, items=self.paces))
+                intensity_indexes.append(index_of(item=step.intensity, ids=intensity_ids, items=self.intensities))
+
+        self.workout_count = len(workouts)
+        for workout_index, workout in enumerate(workouts):
+            for workout_step in workout.steps:
+                add(step=workout_step, parent=-1, workout_index=workout_index, count=1)
+
+        first_children = [-1] * len(kinds)
+        next_siblings = [-1] * len(kinds)
+        workout_firsts = [-1] * self.workout_count
+        last_children = {}  # parent row, or -2 - workout index for the top level -> the last child seen
+        for row, (parent, workout_index) in enumerate(zip(parents, workout_indexes)):
+            key = parent if parent != -1 else -2 - workout_index
+            previous = last_children.get(key)
+            if previous is not None:
+                next_siblings[previous] = row
+            elif parent == -1:
+                workout_firsts[workout_index] = row
+            else:
+                first_children[parent] = row
+            last_children[key] = row
+
+        self.kind = numpy.array(kinds, dtype=numpy.int8)
+        self.parent = _index_array(parents)
+        self.first_child = _index_array(first_children)
+        self.next_sibling = _index_array(next_siblings)  # top level steps link to the next one in the workout
+        self.workout_first = _index_array(workout_firsts)  # first top level step of each workout
+        self.workout = _index_array(workout_indexes)
+        self.repeat = _index_array(repeats)
+        self.count = _index_array(counts)  # how many times the step is run
+        self.duration_kind = numpy.array(duration_kinds, dtype=numpy.int8)
+        self.value = numpy.array(values, dtype=numpy.float64)  # distance in its unit or seconds
+        self.unit = numpy.array(units, dtype=numpy.int8)  # FirstDistance.units id
+        self.pace = _index_array(pace_indexes)
+        self.name = _index_array(name_indexes)
+        self.intensity = _index_array(intensity_indexes)
+        self.step_id = _index_array(step_ids)
+
+    def __len__(self) -> int:
+
+        return len(self.kind)
+
+    def nbytes(self) -> int:
+
+        """
+        Memory of the arrays
+
+        :return: number of bytes
+        :rtype: int
+        """
+        return sum(array.nbytes for array in [self.kind, self.parent, self.first_child, self.next_sibling,
+                                              self.workout_first, self.workout, self.repeat, self.count,
+                                              self.duration_kind, self.value, self.unit, self.pace, self.name,
+                                              self.intensity, self.step_id])
+
+    def view(self, index: int) -> Union['FirstStepBodyView', 'FirstStepRepeatView']:
+
+        """
+        A step object over one row
+
+        :param index: row index
+        :type index: int
+        :return: the view
+        :rtype: FirstStepBodyView | FirstStepRepeatView
+        """
+        if index < 0 or index >= len(self.kind):
+            raise ValueError('step index must be between 0 and {}'.format(len(self.kind) - 1))
+        if self.kind[index] == self.REPEAT:
+            return FirstStepRepeatView(arena=self, index=index)
+        else:
+            return FirstStepBodyView(arena=self, index=index)
+
+    def children(self, index: int) -> List[Union['FirstStepBodyView', 'FirstStepRepeatView']]:
+
+        """
+        The child steps of a row
+
+        :param index: row index, -1 for the top level steps of all the workouts
+        :type index: int
+        :return: views of the direct children
+        :rtype: list[FirstStepBodyView | FirstStepRepeatView]
+        """
+        if index < -1 or index >= len(self.kind):
+            raise ValueError('step index must be between -1 and {}'.format(len(self.kind) - 1))
+        if index == -1:
+            return [view for workout_index in range(self.workout_count)
+                    for view in self.workout_steps(workout_index=workout_index)]
+
+        return self.__siblings(first=int(self.first_child[index]))
+
+    def __siblings(self, first: int) -> List[Union['FirstStepBodyView', 'FirstStepRepeatView']]:
+
+        views = []
+        row = first
+        while row != -1:
+            views.append(self.view(index=row))
+            row = int(self.next_sibling[row])
+
+        return views
+
+    def workout_steps(self, workout_index: int) -> List[Union['FirstStepBodyView', 'FirstStepRepeatView']]:
+
+        """
+        The top level steps of a workout
+
+        :param workout_index: the workout index in the plan
+        :type workout_index: int
+        :return: views of the steps
+        :rtype: list[FirstStepBodyView | FirstStepRepeatView]
+        """
+        return self.__siblings(first=int(self.workout_first[workout_index]))
+
+    def step_totals(self, distance_unit: str = 'm', time_unit: str = 'second') -> Tuple[numpy.ndarray, numpy.ndarray]:
+
+        """
+        Distance and duration of a single run of each body step - nan for repeat steps.
+        Times of distance steps are rounded to the second like FirstPace.time_for
+
+        :param distance_unit: length unit
+        :type distance_unit: str
+        :param time_unit: duration unit
+        :type time_unit: str
+        :return: (distances, durations)
+        :rtype: tuple[numpy.ndarray, numpy.ndarray]
+        """
+        unit_sizes = numpy.array([FirstDistance.units.sizes[name] for name in FirstDistance.units.names],
+                                 dtype=numpy.float64)
+        pace_seconds = numpy.array([pace.seconds_per_meter for pace in self.paces] + [numpy.nan], dtype=numpy.float64)
+        seconds_per_meter = pace_seconds[self.pace]  # -1 picks the nan for repeats
+
+        by_distance = self.duration_kind == self.DISTANCE
+        meters = numpy.where(by_distance, self.value * unit_sizes[self.unit], self.value / seconds_per_meter)
+        seconds = numpy.where(by_distance, numpy.rint(meters * seconds_per_meter), self.value)
+
+        return (meters * FirstDistance.units.factor(from_unit='m', to_unit=distance_unit),
+                seconds * FirstTime.units.factor(from_unit='second', to_unit=time_unit))
+
+    def totals(self, distance_unit: str = 'mile', time_unit: str = 'minute') -> Tuple[numpy.ndarray, numpy.ndarray]:
+
+        """
+        Total distance and duration of each workout, straight from the arrays
+
+        :param distance_unit: length unit
+        :type distance_unit: str
+        :param time_unit: duration unit
+        :type time_unit: str
+        :return: (distances, durations) with one item per workout
+        :rtype: tuple[numpy.ndarray, numpy.ndarray]
+        """
+        distances, durations = self.step_totals(distance_unit=distance_unit, time_unit=time_unit)
+        body = self.kind == self.BODY
+        workouts = self.workout[body]
+
+        return (numpy.bincount(workouts, weights=distances[body] * self.count[body], minlength=self.workout_count),
+                numpy.bincount(workouts, weights=durations[body] * self.count[body], minlength=self.workout_count))
+
+
+class FirstStepBodyView(object):
+
+    """FirstStepBody API over one row of a FirstStepArena. Values are created on access"""
+
+    __slots__ = ('arena', 'index')
+
+    def __init__(self, arena: FirstStepArena, index: int):
+
+        self.arena = arena
+        self.index = index
+
+    @property
+    def name(self) -> str:
+
+        return self.arena.names[self.arena.name[self.index]]
+
+    @property
+    def step_id(self) -> int:
+
+        return int(self.arena.step_id[self.index])
+
+    @property
+    def pace(self) -> Union[FirstPace, FirstSpeed]:
+
+        return self.arena.paces[self.arena.pace[self.index]]
+
+    @property
+    def intensity(self) -> str:
+
+        return self.arena.intensities[self.arena.intensity[self.index]]
+
+    @property
+    def distance(self) -> Union[FirstDistance, None]:
+
+        if self.arena.duration_kind[self.index] != FirstStepArena.DISTANCE:
+            return None
+        return FirstDistance(distance=float(self.arena.value[self.index]),
+                             unit=FirstDistance.units.names[self.arena.unit[self.index]])
+
+    @property
+    def time(self) -> Union[FirstTime, None]:
+
+        if self.arena.duration_kind[self.index] != FirstStepArena.TIME:
+            return None
+        return FirstTime(seconds=float(self.arena.value[self.index]))
+
+    def __str__(self) -> str:
+
+        output = FirstStepBase.__str__(self)
+        output += 'type - body  {} - {}\n'.format(self.get_target_type(), str(self.pace))
+        if self.get_duration_type() == 'distance':
+            output += 'Distance - {}\n'.format(str(self.distance))
+        else:
+            output += 'Time - {}\n'.format(str(self.time))
+
+        return output
+
+    @property
+    def shape(self) -> FirstStepShape:
+
+        return FirstStepBody.compute_shape(self)
+
+    def totals(self, distance_unit: str = 'm', time_unit: str = 'second') -> Tuple[float, float]:
+
+        return FirstStepBody.compute_totals(self, distance_unit=distance_unit, time_unit=time_unit)
+
+    get_duration_type = FirstStepBody.get_duration_type
+    get_target_type = FirstStepBody.get_target_type
+    total = FirstStepBase.total
+    details = FirstStepBody.details
+    to_json = FirstStepBody.to_json
+    to_html = FirstStepBody.to_html
+    _render_json = FirstStepBody._render_json
+    _render_html = FirstStepBody._render_html
+    tcx_top = FirstStepBase.tcx_top
+    tcx = FirstStepBody.tcx
+
+
+class FirstStepRepeatView(object):
+
+    """FirstStepRepeat API over one row of a FirstStepArena"""
+
+    __slots__ = ('arena', 'index')
+
+    def __init__(self, arena: FirstStepArena, index: int):
+
+        self.arena = arena
+        self.index = index
+
+    @property
+    def name(self) -> str:
+
+        return self.arena.names[self.arena.name[self.index]]
+
+    @property
+    def step_id(self) -> int:
+
+        return int(self.arena.step_id[self.index])
+
+    @property
+    def repeat(self) -> int:
+
+        return int(self.arena.repeat[self.index])
+
+    @property
+    def steps(self) -> List[Union[FirstStepBodyView, 'FirstStepRepeatView']]:
+
+        return self.arena.children(index=self.index)
+
+    def __str__(self) -> str:
+
+        return '{}type - repeat  repeat - {}\n'.format(FirstStepBase.__str__(self), str(self.repeat))
+
+    @property
+    def shape(self) -> FirstStepShape:
+
+        return FirstStepRepeat.compute_shape(self)
+
+    def totals(self, distance_unit: str = 'm', time_unit: str = 'second') -> Tuple[float, float]:
+
+        return FirstStepRepeat.compute_totals(self, distance_unit=distance_unit, time_unit=time_unit)
+
+    total = FirstStepBase.total
+    details = FirstStepRepeat.details
+    to_json = FirstStepRepeat.to_json
+    to_html = FirstStepRepeat.to_html
+    _render_json = FirstStepRepeat._render_json
+    _render_html = FirstStepRepeat._render_html
+    tcx_top = FirstStepBase.tcx_top
+    tcx = FirstStepRepeat.tcx
@@ -0,0 +1,382 @@
+from typing import Iterable, List
+
+import numpy
+
+from first_distance import FirstDistance
+from first_pace import FirstPace
+from first_time import FirstTime
+
+
+def _format_durations(seconds: numpy.ndarray) -> List[str]:
+
+    whole = numpy.rint(seconds).astype(numpy.int64)
+    hours, rest = numpy.divmod(whole, 3600)
+    minutes, seconds = numpy.divmod(rest, 60)
+
+    return ['{}:{:02d}:{:02d}'.format(h, m, s) for h, m, s in zip(hours.tolist(), minutes.tolist(), seconds.tolist())]
+
+
+class DistanceArray(object):
+
+    """Column of distances kept in meters"""
+
+    def __init__(self, meters: Iterable[float]):
+
+        """
+        Constructor
+
+        :param meters: the distances in meters
+        :type meters: numpy.ndarray | list[float]
+        :return: instance of DistanceArray
+        :rtype: DistanceArray
+        """
+        self.meters = numpy.asarray(meters, dtype=numpy.float64)
+
+    def __len__(self) -> int:
+
+        return len(self.meters)
+
+    @classmethod
+    def from_values(cls, values: Iterable[float], unit: str):
+
+        """
+        Create from values in one unit
+
+        :param values: the distances
+        :type values: numpy.ndarray | list[float]
+        :param unit: length unit of the values
+        :type unit: str
+        :return: instance of DistanceArray
+        :rtype: DistanceArray
+        """
+        return cls(meters=numpy.asarray(values, dtype=numpy.float64) * FirstDistance.units.factor(from_unit=unit,
+                                                                                                  to_unit='m'))
+
+    @classmethod
+    def from_distances(cls, distances: Iterable[FirstDistance]):
+
+        """
+        Create from FirstDistance instances of any units
+
+        :param distances: the distances
+        :type distances: list[FirstDistance]
+        :return: instance of DistanceArray
+        :rtype: DistanceArray
+        """
+        return cls(meters=[distance.convert_to(unit='m') for distance in distances])
+
+    def convert_to(self, unit: str) -> numpy.ndarray:
+
+        """
+        The distances in another unit
+
+        :param unit: length unit
+        :type unit: str
+        :return: the values
+        :rtype: numpy.ndarray
+        """
+        return self.meters * FirstDistance.units.factor(from_unit='m', to_unit=unit)
+
+    def to_distances(self, unit: str = 'm') -> List[FirstDistance]:
+
+        """
+        Convert back to scalars
+
+        :param unit: length unit of the results
+        :type unit: str
+        :return: the distances
+        :rtype: list[FirstDistance]
+        """
+        return [FirstDistance(distance=value, unit=unit) for value in self.convert_to(unit=unit).tolist()]
+
+    def to_time(self, paces: 'PaceArray') -> 'DurationArray':
+
+        """
+        How much time it takes to run each distance with the matching pace
+
+        :param paces: one pace per distance
+        :type paces: PaceArray
+        :return: the durations - not rounded
+        :rtype: DurationArray
+        """
+        return DurationArray(seconds=self.meters * paces.seconds_per_meter)
+
+    def format(self, unit: str, decimals: int = 3) -> List[str]:
+
+        """
+        Format like FirstDistance.to_html
+
+        :param unit: length unit
+        :type unit: str
+        :param decimals: number of decimal places
+        :type decimals: int
+        :return: strings like '1.600 km'
+        :rtype: list[str]
+        """
+        pattern = '{{:.{}f}} {}'.format(decimals, unit)
+        return [pattern.format(value) for value in self.convert_to(unit=unit).tolist()]
+
+
+class DurationArray(object):
+
+    """Column of durations kept in seconds"""
+
+    def __init__(self, seconds: Iterable[float]):
+
+        """
+        Constructor
+
+        :param seconds: the durations in seconds
+        :type seconds: numpy.ndarray | list[float]
+        :return: instance of DurationArray
+        :rtype: DurationArray
+        """
+        self.seconds = numpy.asarray(seconds, dtype=numpy.float64)
+
+    def __len__(self) -> int:
+
+        return len(self.seconds)
+
+    @classmethod
+    def from_times(cls, times: Iterable[FirstTime]):
+
+        """
+        Create from FirstTime instances
+
+        :param times: the durations
+        :type times: list[FirstTime]
+        :return: instance of DurationArray
+        :rtype: DurationArray
+        """
+        return cls(seconds=[time.total_seconds() for time in times])
+
+    def convert_to(self, unit: str) -> numpy.ndarray:
+
+        """
+        The durations in another unit
+
+        :param unit: duration unit - second, minute or hour
+        :type unit: str
+        :return: the values
+        :rtype: numpy.ndarray
+        """
+        return self.seconds * FirstTime.units.factor(from_unit='second', to_unit=unit)
+
+    def to_times(self) -> List[FirstTime]:
+
+        """
+        Convert back to scalars
+
+        :return: the durations
+        :rtype: list[FirstTime]
+        """
+        return [FirstTime(seconds=value) for value in self.seconds.tolist()]
+
+    def to_distance(self, paces: 'PaceArray') -> DistanceArray:
+
+        """
+        How far you run each duration with the matching pace
+
+        :param paces: one pace per duration
+        :type paces: PaceArray
+        :return: the distances
+        :rtype: DistanceArray
+        """
+        return DistanceArray(meters=self.seconds / paces.seconds_per_meter)
+
+    def format(self) -> List[str]:
+
+        """
+        Format like FirstTime, rounded to the second. Hours are not wrapped to days
+
+        :return: strings like '1:05:30'
+        :rtype: list[str]
+        """
+        return _format_durations(seconds=self.seconds)
+
+
+class PaceArray(object):
+
+    """Column of paces kept in seconds per meter"""
+
+    def __init__(self, seconds_per_meter: Iterable[float]):
+
+        """
+        Constructor
+
+        :param seconds_per_meter: the paces in seconds per meter
+        :type seconds_per_meter: numpy.ndarray | list[float]
+        :return: instance of PaceArray
+        :rtype: PaceArray
+        """
+        self.seconds_per_meter = numpy.asarray(seconds_per_meter, dtype=numpy.float64)
+
+    def __len__(self) -> int:
+
+        return len(self.seconds_per_meter)
+
+    @classmethod
+    def from_values(cls, seconds: Iterable[float], unit: str):
+
+        """
+        Create from seconds per length unit, like the columns of the pace table
+
+        :param seconds: seconds per length unit
+        :type seconds: numpy.ndarray | list[float]
+        :param unit: the length unit
+        :type unit: str
+        :return: instance of PaceArray
+        :rtype: PaceArray
+        """
+        return cls(seconds_per_meter=numpy.asarray(seconds, dtype=numpy.float64) * FirstDistance.units.factor(
+            from_unit='m', to_unit=unit))
+
+    @classmethod
+    def from_paces(cls, paces: Iterable[FirstPace]):
+
+        """
+        Create from FirstPace or FirstSpeed instances of any units
+
+        :param paces: the paces
+        :type paces: list[FirstPace | FirstSpeed]
+        :return: instance of PaceArray
+        :rtype: PaceArray
+        """
+        return cls(seconds_per_meter=[pace.seconds_per_meter for pace in paces])
+
+    def convert_to(self, unit: str) -> numpy.ndarray:
+
+        """
+        The paces per another length unit
+
+        :param unit: length unit
+        :type unit: str
+        :return: seconds per unit
+        :rtype: numpy.ndarray
+        """
+        return self.seconds_per_meter * FirstDistance.units.factor(from_unit=unit, to_unit='m')
+
+    def to_paces(self, unit: str) -> List[FirstPace]:
+
+        """
+        Convert back to scalars, rounded to the second
+
+        :param unit: length unit of the results
+        :type unit: str
+        :return: the paces
+        :rtype: list[FirstPace]
+        """
+        seconds = numpy.rint(self.convert_to(unit=unit)).astype(numpy.int64)
+        return [FirstPace(seconds=value, length_unit=unit) for value in seconds.tolist()]
+
+    def to_time(self, distances: DistanceArray) -> DurationArray:
+
+        """
+        How much time it takes to run each distance with the matching pace
+
+        :param distances: one distance per pace
+        :type distances: DistanceArray
+        :return: the durations - not rounded
+        :rtype: DurationArray
+        """
+        return distances.to_time(paces=self)
+
+    def to_distance(self, times: DurationArray) -> DistanceArray:
+
+        """
+        How far you run each duration with the matching pace
+
+        :param times: one duration per pace
+        :type times: DurationArray
+        :return: the distances
+        :rtype: DistanceArray
+        """
+        return times.to_distance(paces=self)
+
+    def format(self, unit: str) -> List[str]:
+
+        """
+        Format like FirstPace, rounded to the second
+
+        :param unit: length unit
+        :type unit: str
+        :return: strings like '0:08:10 min per mile'
+        :rtype: list[str]
+        """
+        suffix = ' min per {}'.format(unit)
+        return [string + suffix for string in _format_durations(seconds=self.convert_to(unit=unit))]
+
+
+class UnitConversions(object):
+
+    """Distances and paces converted to output units in one vectorized pass, for rendering a whole plan.
+    Values that were not collected fall back to their own conversion methods"""
+
+    def __init__(self, distances: Iterable[FirstDistance], paces: Iterable[FirstPace], units: Iterable[str]):
+
+        """
+        Constructor
+
+        :param distances: the distances to convert - duplicates are converted once
+        :type distances: list[FirstDistance]
+        :param paces: the paces or speeds to convert - duplicates are converted once
+        :type paces: list[FirstPace | FirstSpeed]
+        :param units: output length units
+        :type units: list[str]
+        :return: instance of UnitConversions
+        :rtype: UnitConversions
+        """
+        sizes = FirstDistance.units.sizes
+        self.units = list(units)
+        for unit in self.units:
+            FirstDistance.units.unit_id(name=unit)  # validate
+
+        distances = list(dict.fromkeys(distances))
+        self.__distance_index = {distance: index for index, distance in enumerate(distances)}
+        values = numpy.array([distance.distance for distance in distances], dtype=numpy.float64)
+        from_sizes = numpy.array([sizes[distance.unit] for distance in distances], dtype=numpy.float64)
+        # multiply by the from size and divide by the to size like FirstDistance.convert_to
+        self.__distances = {unit: (values * from_sizes / sizes[unit]).tolist() for unit in self.units}
+
+        paces = list(dict.fromkeys(paces))
+        self.__pace_index = {pace: index for index, pace in enumerate(paces)}
+        seconds_per_meter = PaceArray.from_paces(paces=paces).seconds_per_meter
+        self.__seconds_per_unit = {unit: (seconds_per_meter * sizes[unit]).tolist() for unit in self.units}
+
+    def distance(self, distance: FirstDistance, unit: str) -> float:
+
+        """
+        A distance value in another unit
+
+        :param distance: the distance
+        :type distance: FirstDistance
+        :param unit: length unit
+        :type unit: str
+        :return: the converted value
+        :rtype: float
+        """
+        index = self.__distance_index.get(distance)
+        values = self.__distances.get(unit)
+        if index is None or values is None:
+            return distance.convert_to(unit=unit)
+
+        return values[index]
+
+    def seconds_per_unit(self, pace: FirstPace, unit: str) -> float:
+
+        """
+        A pace or speed as seconds per another length unit - not rounded
+
+        :param pace: the pace or speed
+        :type pace: FirstPace | FirstSpeed
+        :param unit: length unit
+        :type unit: str
+        :return: seconds per unit
+        :rtype: float
+        """
+        index = self.__pace_index.get(pace)
+        values = self.__seconds_per_unit.get(unit)
+        if index is None or values is None:
+            return pace.seconds_per_unit(unit=unit)
+
+        return values[index]
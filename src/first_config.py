@@ -7,5 +7,14 @@ class Config(object):
 
     DATABASE_DIR = 'database'
     DATABASE_JSON = '{}/{}/training_db.json'.format(basedir, DATABASE_DIR)
+    SNAPSHOT_EXTENSION = 'snapshot'
+    DATABASE_SQLITE = '{}/{}/training_db.sqlite'.format(basedir, DATABASE_DIR)
     TEST_RESOURCE_DIR = '{}/test/resources'.format(basedir)
     DOWNLOADS_DIR = path.expanduser('~/Downloads')
+    LENGTH_UNITS = {'m': 1, 'km': 1000, 'mile': 1609.344, 'ft': 0.3048}  # more can be registered at run time
+    DURATION_UNITS = {'second': 1, 'minute': 60, 'hour': 3600}
+    RACE_TYPE_ALIASES = {'half': 'HalfMarathon', 'full': 'Marathon', '5km': '5K', '10km': '10K'}
+    RELOAD_POLL_SECONDS = 5.0
+    PACE_EXTRAPOLATION_SECONDS = 600
+    TIME_PARSE_CACHE_SIZE = 4096
+    FORMAT_CACHE_SIZE = 4096
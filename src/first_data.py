@@ -1,10 +1,15 @@
-import json
-from datetime import timedelta
+from bisect import bisect_left
+from multiprocessing import shared_memory
 from typing import Dict, List
 
+import numpy
+
+from first_config import Config
 from first_distance import FirstDistance
+from first_instructions import CompiledWorkout, FirstInstructionCompiler
 from first_pace import FirstPace
 from first_race import FirstRaceType
+from first_snapshot import FirstSnapshot
 from first_time import FirstTime
 
 
@@ -63,7 +68,8 @@ class FirstSegment(object):
 
 class PlanInstructions(object):
 
-    def __init__(self, name: str, race_name: str, instructions: List[str] = None):
+    def __init__(self, name: str, race_name: str, instructions: List[str] = None,
+                 compiled: List[CompiledWorkout] = None):
 
         """
         Constructor
@@ -72,12 +78,17 @@ class PlanInstructions(object):
         :type name: str
         :param race_name: reference race name
         :type race_name: str
+        :param instructions: workout lines
+        :type instructions: list[str]
+        :param compiled: the compiled workout lines (see FirstInstructionCompiler)
+        :type compiled: list[CompiledWorkout]
         return: instance of PlanInstructions
         :rtype: PlanInstructions
         """
         self.name = name
         self.race_name = race_name
         self.instructions = instructions or []
+        self.compiled = compiled
 
     def __repr__(self):
 
@@ -91,15 +102,269 @@ class PlanInstructions(object):
         :type line: str
         """
         self.instructions.append(line)
+        self.compiled = None  # compiled again when needed
+
+
+class FirstLazyPlanInstructions(object):
+
+    """Sequence of PlanInstructions decoded from the snapshot the first time each plan is accessed.
+    Only the snapshot is read - the json source may change or go away after loading"""
+
+    def __init__(self, snapshot: FirstSnapshot):
+
+        """
+        Constructor
+
+        :param snapshot: a snapshot with lazy plans (see FirstSnapshot.plan_instructions)
+        :type snapshot: FirstSnapshot
+        :return: instance of FirstLazyPlanInstructions
+        :rtype: FirstLazyPlanInstructions
+        """
+        self.snapshot = snapshot
+        self.__loaded = [None] * len(snapshot.plans)
+
+    def __len__(self) -> int:
+
+        return len(self.__loaded)
+
+    def __getitem__(self, index: int) -> PlanInstructions:
+
+        plan_instructions = self.__loaded[index]
+        if plan_instructions is None:
+            plan = self.snapshot.plans[index]
+            instructions, compiled = self.snapshot.plan_instructions(index=index)
+            plan_instructions = PlanInstructions(name=plan['name'], race_name=plan['race_name'],
+                                                 instructions=list(instructions), compiled=compiled)
+            self.__loaded[index] = plan_instructions
+
+        return plan_instructions
+
+    def __iter__(self):
+
+        for index in range(len(self.__loaded)):
+            yield self[index]
+
+    def is_loaded(self, index: int) -> bool:
+
+        """
+        Check if a plan was already decoded
+
+        :param index: plan index
+        :type index: int
+        :return: True if decoded
+        :rtype: bool
+        """
+        return self.__loaded[index] is not None
+
+
+class FirstPaceTable(object):
+
+    """Read-only view of the pace matrix with the list-of-rows interface of the original table.
+    Column 0 is the reference race time and the rest are paces. FirstTime and FirstPace instances are created
+    only when an item is accessed"""
+
+    def __init__(self, matrix: numpy.ndarray, length_unit: str):
+
+        """
+        Constructor
+
+        :param matrix: seconds table (rows x columns)
+        :type matrix: numpy.ndarray
+        :param length_unit: the paces length unit
+        :type length_unit: str
+        :return: instance of FirstPaceTable
+        :rtype: FirstPaceTable
+        """
+        self.matrix = matrix
+        self.length_unit = length_unit
+
+    def __len__(self) -> int:
+
+        return len(self.matrix)
+
+    def __getitem__(self, row: int) -> 'FirstPaceRow':
+
+        if row < -len(self.matrix) or row >= len(self.matrix):
+            raise IndexError('pace table row out of range')
+        return FirstPaceRow(table=self, row=row)
+
+    def __iter__(self):
+
+        for row in range(len(self.matrix)):
+            yield FirstPaceRow(table=self, row=row)
+
+    def item(self, row: int, column: int):
+
+        """
+        Materialize one table item
+
+        :param row: row index
+        :type row: int
+        :param column: column index
+        :type column: int
+        :return: the reference time for column 0 or the pace
+        :rtype: FirstTime | FirstPace
+        """
+        seconds = int(self.matrix[row, column])
+        if column == 0 or column == -self.matrix.shape[1]:
+            return FirstTime(seconds=seconds)
+        return FirstPace(seconds=seconds, length_unit=self.length_unit)
+
+
+class FirstPaceRow(object):
+
+    def __init__(self, table: FirstPaceTable, row: int):
+
+        self.table = table
+        self.row = row
+
+    def __len__(self) -> int:
+
+        return self.table.matrix.shape[1]
+
+    def __getitem__(self, column: int):
+
+        return self.table.item(row=self.row, column=column)
+
+    def __iter__(self):
+
+        for column in range(len(self)):
+            yield self.table.item(row=self.row, column=column)
+
+
+class FirstRaceRegistry(object):
+
+    """Race type names, aliases and plan lookup shared by the database backends (FirstData and FirstSqliteData).
+    The derived class sets race_types and calls build_race_type_registry"""
+
+    LOW_TIME_MARGIN = 600  # seconds below the fastest database time that still match the first row
+
+    def build_race_type_registry(self, reference_race: str, plan_race_names: List[str],
+                                 aliases: Dict[str, str] = None) -> None:
+
+        """
+        Index the race types by name and alias, and the plans by race type
+
+        :param reference_race: the race type of the pace table reference times
+        :type reference_race: str
+        :param plan_race_names: the race name of each plan, in plan order
+        :type plan_race_names: list[str]
+        :param aliases: alias to race type name. Default is Config.RACE_TYPE_ALIASES
+        :type aliases: dict[str, str]
+        """
+        self.__race_type_registry = {}
+        for index, race_type in enumerate(self.race_types):
+            self.__race_type_registry[self.normalize_race_name(name=race_type.name)] = index
+        for alias, name in (Config.RACE_TYPE_ALIASES if aliases is None else aliases).items():
+            self.add_race_type_alias(alias=alias, name=name)
 
+        self.reference_race_index = self.race_type_index_by_name(name=reference_race)
+        self.__plan_indexes = {}
+        for index, race_name in enumerate(plan_race_names):
+            self.__plan_indexes.setdefault(self.race_type_index_by_name(name=race_name), index)
 
-class FirstData(object):
+    @staticmethod
+    def normalize_race_name(name: str) -> str:
 
-    def __init__(self, json_path: str):
+        """
+        Registry key of a race type name - case, spaces, dashes and underscores are ignored
+
+        :param name: race type name or alias
+        :type name: str
+        :return: the normalized name
+        :rtype: str
+        """
+        return ''.join(char for char in name.lower() if char not in ' -_')
+
+    def add_race_type_alias(self, alias: str, name: str) -> None:
+
+        """
+        Register another name for a race type
+
+        :param alias: like 'half'
+        :type alias: str
+        :param name: an existing race type name or alias
+        :type name: str
+        """
+        self.__race_type_registry[self.normalize_race_name(name=alias)] = self.race_type_index_by_name(name=name)
+
+    def race_type_index_by_name(self, name: str) -> int:
+
+        """
+        Return the index in the database to the race type name
+
+        :param name: type name or alias
+        :type name: str
+        :return: the type index in the database
+        :rtype: int
+        """
+        index = self.__race_type_registry.get(self.normalize_race_name(name=name))
+        if index is None:
+            raise ValueError('Race type {} not found'.format(name))
+
+        return index
+
+    def get_race_type_by_name(self, name: str) -> FirstRaceType:
+
+        """
+        Return the race type from the database with this race type name
+
+        :param name: type name or alias
+        :type name: str
+        :return: the type in the database
+        :rtype: FirstRaceType
+        """
+        return self.race_types[self.race_type_index_by_name(name=name)]
+
+    def plan_index_by_race_name(self, name: str) -> int:
+
+        """
+        Return the index of the plan instructions for a race type
+
+        :param name: type name or alias
+        :type name: str
+        :return: the index in plan_instructions
+        :rtype: int
+        """
+        index = self.__plan_indexes.get(self.race_type_index_by_name(name=name))
+        if index is None:
+            raise ValueError('No plan instructions for race type {}'.format(name))
+
+        return index
+
+    def check_race_index(self, race_index: int) -> None:
+
+        """
+        Validate a race index
+
+        :param race_index: index in race_types
+        :type race_index: int
+        """
+        num_races = len(self.race_types)
+        if race_index < 0 or race_index >= num_races:
+            raise ValueError('Race index must be between 0 and %1d' % (num_races-1))
+
+
+class FirstData(FirstRaceRegistry):
+
+    def __init__(self, json_path: str, use_snapshot: bool = True, race_type_aliases: Dict[str, str] = None,
+                 lazy_plans: bool = False, snapshot: FirstSnapshot = None):
 
         """
         Constructor
 
+        :param json_path: the json database path
+        :type json_path: str
+        :param use_snapshot: load from the compiled snapshot next to the json file (rebuilt when stale)
+        :type use_snapshot: bool
+        :param race_type_aliases: alias to race type name. Default is Config.RACE_TYPE_ALIASES
+        :type race_type_aliases: dict[str, str]
+        :param lazy_plans: decode each plan's instructions only when it is first accessed. Loading faster needs
+                           the snapshot - with use_snapshot=False the whole json is still parsed and only compiling
+                           the plans is deferred
+        :type lazy_plans: bool
+        :param snapshot: an already loaded snapshot (e.g. attached from shared memory) - json_path is not read
+        :type snapshot: FirstSnapshot
         :return: instance of FirstData
         :rtype: FirstData
         """
@@ -110,74 +375,174 @@ class FirstData(object):
         self.segments_lookup = {}
         self.reference_race = None
         self.segments_paces = []
+        self.pace_matrix = None
+        self.pace_columns = {}
         self.plan_instructions = []
 
-        if json_path is not None:
-            with open(json_path, 'r') as fd:
-                data_dict = json.load(fd)
-
-                self.name = data_dict['name']
-                self.note = data_dict['note']
-
-                self.race_types = [FirstRaceType(name=race['name'],
-                                                 distance=FirstDistance.from_string(race['distance']))
-                                   for race in data_dict['races']]
-                self.race_times = [[FirstTime.from_string(string=time) for time in times]
-                                   for times in data_dict['equivalent_times']]
-                self.__get_segments_json(json_segments=data_dict['segments'])
-                self.plan_instructions = [PlanInstructions(name=plan['name'], race_name=plan['race_name'],
-                                                           instructions=[line for line in plan['instructions']])
-                                          for plan in data_dict['workout_instructions']]
+        if snapshot is not None:
+            self.snapshot = snapshot
+        elif json_path is not None:
+            if use_snapshot:
+                self.snapshot = FirstSnapshot.cached(json_path=json_path, lazy=lazy_plans)
+            else:
+                self.snapshot = FirstSnapshot.from_json(json_path=json_path, lazy=lazy_plans)
         else:
             raise ValueError('json_path should point to an existing file')
 
-    def __get_segments_json(self, json_segments: Dict) -> None:
-
-        self.reference_race = json_segments['reference_race']
-        index = 0
-        for segment_type in json_segments['segment_types']:
-            name = segment_type['name']
-            type_str = segment_type['type']
-            ref_pace = segment_type['ref_pace_name']
-            if type_str == 'DISTANCE':
-                distance = FirstDistance.from_string(string=segment_type['distance'])
-                self.segments.append(FirstSegment(name=name, distance=distance))
-            elif type_str == 'TIME':
-                duration = FirstTime.from_string(string=segment_type['time'])
-                self.segments.append(FirstSegment(name=name, duration=duration,
-                                                  ref_pace_name=ref_pace))
+        self.__load_snapshot(snapshot=self.snapshot)
+        if lazy_plans or any('compiled' not in plan for plan in self.snapshot.plans):
+            self.plan_instructions = FirstLazyPlanInstructions(snapshot=self.snapshot)
+        else:
+            self.plan_instructions = [PlanInstructions(name=plan['name'], race_name=plan['race_name'],
+                                                       instructions=list(plan['instructions']),
+                                                       compiled=plan['compiled'])
+                                      for plan in self.snapshot.plans]
+        self.build_race_type_registry(reference_race=self.reference_race,
+                                      plan_race_names=[plan['race_name'] for plan in self.snapshot.plans],
+                                      aliases=race_type_aliases)
+
+    @classmethod
+    def attach(cls, snapshot_path: str = None, shared_memory_name: str = None,
+               race_type_aliases: Dict[str, str] = None):
+
+        """
+        Create a FirstData over published tables without parsing the json database - for worker processes.
+        The numeric tables are read-only views of the memory-mapped snapshot file or of the shared memory block,
+        so all the workers share one copy
+
+        :param snapshot_path: a snapshot file (see publish)
+        :type snapshot_path: str
+        :param shared_memory_name: a shared memory block name (see publish_shared)
+        :type shared_memory_name: str
+        :param race_type_aliases: alias to race type name. Default is Config.RACE_TYPE_ALIASES
+        :type race_type_aliases: dict[str, str]
+        :return: instance of FirstData
+        :rtype: FirstData
+        """
+        if (snapshot_path is None) == (shared_memory_name is None):
+            raise ValueError('Exactly one of snapshot_path and shared_memory_name is required')
+
+        if snapshot_path is not None:
+            snapshot = FirstSnapshot.load(path=snapshot_path, mapped=True)
+        else:
+            snapshot = FirstSnapshot.attach(name=shared_memory_name)
+
+        return cls(json_path=None, race_type_aliases=race_type_aliases, snapshot=snapshot)
+
+    def publish(self, snapshot_path: str) -> None:
+
+        """
+        Write the tables to a snapshot file that workers attach to with FirstData.attach(snapshot_path=...)
+
+        :param snapshot_path: the snapshot file path
+        :type snapshot_path: str
+        """
+        self.snapshot.save(path=snapshot_path)
+
+    def publish_shared(self, name: str = None) -> shared_memory.SharedMemory:
+
+        """
+        Copy the tables to a shared memory block that workers attach to with
+        FirstData.attach(shared_memory_name=block.name). The caller should close and unlink the block at the end
+
+        :param name: the block name. Default is a generated unique name
+        :type name: str
+        :return: the shared memory block
+        :rtype: shared_memory.SharedMemory
+        """
+        return self.snapshot.publish(name=name)
+
+    def __load_snapshot(self, snapshot: FirstSnapshot) -> None:
+
+        self.name = snapshot.name
+        self.note = snapshot.note
+
+        self.race_types = [FirstRaceType(name=race['name'], distance=FirstDistance.from_string(race['distance']))
+                           for race in snapshot.races]
+        self.race_times = [[FirstTime(seconds=seconds) for seconds in row] for row in snapshot.race_seconds.tolist()]
+        self.__race_columns = snapshot.race_seconds.T.tolist()  # sorted - searched with bisect
+
+        self.reference_race = snapshot.reference_race
+        for index, segment in enumerate(snapshot.segments):
+            if segment['type'] == 'DISTANCE':
+                self.segments.append(FirstSegment(name=segment['name'],
+                                                  distance=FirstDistance.from_string(segment['distance'])))
+            elif segment['type'] == 'TIME':
+                self.segments.append(FirstSegment(name=segment['name'], duration=FirstTime(seconds=segment['time']),
+                                                  ref_pace_name=segment['ref_pace_name']))
             else:  # PACE
-                self.segments.append(FirstSegment(name=name, ref_pace_name=ref_pace))
-
-            self.segments_lookup[name] = index
-            index += 1
-
-        pace_unit = json_segments['pace_unit']
-        distance_unit = pace_unit.split()[-1]
-        for line in json_segments['paces']:
-            items = line.split()
-            paces_list = [FirstTime.from_string(items[0])]
-            index = 0
-            for pace_str in items[1:]:
-                time_str = '0:{}'.format(pace_str)
-                ref_segment = self.segments[index]
-                if ref_segment.get_type() == 'distance':
-                    cur_time = FirstTime.from_string(time_str)
-                    cur_distance = ref_segment.distance
-                    paces_list.append(FirstPace.from_time_distance(time=cur_time, distance=cur_distance,
-                                                                   unit=distance_unit))
-                elif ref_segment.get_type() == 'pace':
-                    paces_list.append(FirstPace.from_string('{} {}'.format(time_str, pace_unit)))
-                else:
-                    raise ValueError('Duration segments have already a reference pace')
-
-                index += 1
-            self.segments_paces.append(paces_list)
+                self.segments.append(FirstSegment(name=segment['name'], ref_pace_name=segment['ref_pace_name']))
+            self.segments_lookup[segment['name']] = index
+
+        self.instruction_compiler = FirstInstructionCompiler(segments=snapshot.segments)
+
+        self.pace_matrix = snapshot.pace_seconds.view()
+        self.pace_matrix.flags.writeable = False
+        for segment in self.segments:  # +1 since the first column is the ref time
+            self.pace_columns[segment.name] = self.segments_lookup[segment.ref_pace_name or segment.name] + 1
+        self.segments_paces = FirstPaceTable(matrix=self.pace_matrix, length_unit=snapshot.pace_unit.split()[-1])
+        self.__pace_ref_column = snapshot.pace_seconds[:, 0].tolist()
 
     def __str__(self) -> str:
 
         return self.name
 
+    @staticmethod
+    def __to_seconds(times) -> numpy.ndarray:
+
+        if isinstance(times, numpy.ndarray):
+            return times
+        return numpy.array([time.total_seconds() if isinstance(time, FirstTime) else time for time in times],
+                           dtype=numpy.float64)
+
+    def equivalent_time_index(self, time_from: FirstTime, race_index_from: int) -> int:
+
+        """
+        Performance method - binary search for the row of a race time in the equivalent times table
+
+        :param time_from: race time
+        :type time_from: FirstTime
+        :param race_index_from: race index
+        :type race_index_from: int
+        :return: the first row with a time equal to or longer than time_from
+        :rtype: int
+        """
+        self.check_race_index(race_index=race_index_from)
+        column = self.__race_columns[race_index_from]
+        seconds = time_from.total_seconds()
+        if seconds < column[0] - self.LOW_TIME_MARGIN:
+            raise ValueError('Time is shorter than the lowest database time')
+
+        index = bisect_left(column, seconds)
+        if index == len(column):
+            raise ValueError('Time is longer than the highest database time')
+
+        return index
+
+    def equivalent_time_indexes(self, times_from, race_index_from: int) -> numpy.ndarray:
+
+        """
+        Batch version of equivalent_time_index
+
+        :param times_from: race times - FirstTime instances or seconds
+        :type times_from: list | numpy.ndarray
+        :param race_index_from: race index
+        :type race_index_from: int
+        :return: the rows
+        :rtype: numpy.ndarray
+        """
+        self.check_race_index(race_index=race_index_from)
+        column = self.snapshot.race_seconds[:, race_index_from]
+        seconds = self.__to_seconds(times=times_from)
+        if numpy.any(seconds < column[0] - self.LOW_TIME_MARGIN):
+            raise ValueError('Time is shorter than the lowest database time')
+
+        indexes = numpy.searchsorted(column, seconds, side='left')
+        if numpy.any(indexes == len(column)):
+            raise ValueError('Time is longer than the highest database time')
+
+        return indexes
+
     def equivalent_time(self, time_from: FirstTime, race_index_from: int, race_index_to: int) -> FirstTime:
 
         """
@@ -194,53 +559,30 @@ class FirstData(object):
         :rtype: FirstTime
         """
 
-        num_races = len(self.race_types)
-        if race_index_from < 0 or race_index_from >= num_races:
-            raise ValueError('Race index must be between 0 and %1d' % (num_races-1))
-        if race_index_to < 0 or race_index_to >= num_races:
-            raise ValueError('Race index must be between 0 and %1d' % (num_races-1))
-        ten_minutes = timedelta(minutes=10)
-        low_time = self.race_times[0][race_index_from] - ten_minutes
-        if time_from < low_time:
-            raise ValueError('Time is shorter than the lowest database time')
-
-        for row in self.race_times:
-            if time_from <= row[race_index_from]:
-                return row[race_index_to]
+        self.check_race_index(race_index=race_index_from)
+        self.check_race_index(race_index=race_index_to)
 
-        raise ValueError('Time is longer than the highest database time')
+        return self.race_times[self.equivalent_time_index(time_from=time_from,
+                                                          race_index_from=race_index_from)][race_index_to]
 
-    def race_type_index_by_name(self, name: str) -> int:
+    def equivalent_times(self, times_from, race_index_from: int, race_index_to: int) -> List[FirstTime]:
 
         """
-        Return the index in the database to the race type name
+        Batch version of equivalent_time
 
-        :param name: type name
-        :type name: str
-        :return: the type index in the database
-        :rtype: int
-        """
-        for index in range(len(self.race_types)):
-            if self.race_types[index].name == name:
-                return index
-
-        raise ValueError('Race type {} not found'.format(name))
-
-    def get_race_type_by_name(self, name: str) -> FirstRaceType:
-
-        """
-        Return the race type from the database with this race type name
-
-        :param name: type name
-        :type name: str
-        :return: the type in the database
-        :rtype: FirstRaceType
+        :param times_from: race times - FirstTime instances or seconds
+        :type times_from: list | numpy.ndarray
+        :param race_index_from:
+        :type race_index_from: int
+        :param race_index_to:
+        :type race_index_to: int
+        :return: equivalent times
+        :rtype: list[FirstTime]
         """
-        for race_type in self.race_types:
-            if race_type.name == name:
-                return race_type
+        self.check_race_index(race_index=race_index_to)
+        indexes = self.equivalent_time_indexes(times_from=times_from, race_index_from=race_index_from)
 
-        raise ValueError('Race type {} not found'.format(name))
+        return [self.race_times[index][race_index_to] for index in indexes.tolist()]
 
     def segment_index_by_name(self, name: str) -> int:
 
@@ -268,6 +610,47 @@ class FirstData(object):
 
         return self.segments[self.segment_index_by_name(name=name)]
 
+    def pace_column(self, name: str) -> numpy.ndarray:
+
+        """
+        Performance method - the paces of a segment for all rows, a read-only view of the pace matrix
+
+        :param name: segment name as appears in the instructions
+        :type name: str
+        :return: seconds per pace length unit
+        :rtype: numpy.ndarray
+        """
+
+        return self.pace_matrix[:, self.pace_columns[name]]
+
+    def pace_row(self, index: int) -> numpy.ndarray:
+
+        """
+        Performance method - one row of the pace matrix, a read-only view
+
+        :param index: the row index
+        :type index: int
+        :return: the reference time followed by the paces in seconds
+        :rtype: numpy.ndarray
+        """
+
+        return self.pace_matrix[index]
+
+    def segment_pace(self, time_index: int, name: str) -> FirstPace:
+
+        """
+        Create the pace of a segment. Segments with a reference pace get the reference pace
+
+        :param time_index: the row index in the paces table
+        :type time_index: int
+        :param name: segment name as appears in the instructions
+        :type name: str
+        :return: the pace
+        :rtype: FirstPace
+        """
+
+        return self.segments_paces.item(row=time_index, column=self.pace_columns[name])
+
     def pace_index_by_race_time(self, race_time: FirstTime, race_name: str) -> int:
 
         """
@@ -281,12 +664,124 @@ class FirstData(object):
         :rtype: int
         """
         from_race_index = self.race_type_index_by_name(name=race_name)
-        to_race_index = self.race_type_index_by_name(name=self.reference_race)
+        to_race_index = self.reference_race_index
         ref_time = self.equivalent_time(time_from=race_time,
                                         race_index_from=from_race_index, race_index_to=to_race_index)
 
-        for index in range(len(self.segments_paces)):
-            if self.segments_paces[index][0] >= ref_time:
-                return index
+        index = bisect_left(self.__pace_ref_column, ref_time.total_seconds())
+        if index == len(self.__pace_ref_column):
+            raise ValueError('Row not found with given time')
+
+        return index
+
+    def pace_indexes_by_race_times(self, race_times, race_name: str) -> numpy.ndarray:
+
+        """
+        Batch version of pace_index_by_race_time
+
+        :param race_times: race target times - FirstTime instances or seconds
+        :type race_times: list | numpy.ndarray
+        :param race_name: the race name
+        :type race_name: str
+        :return: the indexes based on the times
+        :rtype: numpy.ndarray
+        """
+        from_race_index = self.race_type_index_by_name(name=race_name)
+        to_race_index = self.reference_race_index
+        rows = self.equivalent_time_indexes(times_from=race_times, race_index_from=from_race_index)
+        ref_seconds = self.snapshot.race_seconds[rows, to_race_index]
+
+        ref_column = self.snapshot.pace_seconds[:, 0]
+        indexes = numpy.searchsorted(ref_column, ref_seconds, side='left')
+        if numpy.any(indexes == len(ref_column)):
+            raise ValueError('Row not found with given time')
+
+        return indexes
+
+    @staticmethod
+    def __interpolate(x: numpy.ndarray, xp: numpy.ndarray, fp: numpy.ndarray, clamp: bool) -> numpy.ndarray:
+
+        """
+        Piecewise linear interpolation of table columns. Outside the table the first or last segment is extended
+
+        :param x: the points to evaluate
+        :type x: numpy.ndarray
+        :param xp: sorted table keys
+        :type xp: numpy.ndarray
+        :param fp: table values - one row per key, one or more columns
+        :type fp: numpy.ndarray
+        :param clamp: use the first/last table values outside the table instead of extending
+        :type clamp: bool
+        :return: values - one row per point
+        :rtype: numpy.ndarray
+        """
+        high = numpy.clip(numpy.searchsorted(xp, x, side='right'), 1, len(xp) - 1)
+        low = high - 1
+        span = (xp[high] - xp[low]).astype(numpy.float64)
+        weight = numpy.divide(x - xp[low], span, out=numpy.zeros(len(x)), where=span != 0)
+        if clamp:
+            weight = numpy.clip(weight, 0.0, 1.0)
+        if fp.ndim > 1:
+            weight = weight[:, numpy.newaxis]
+
+        return fp[low] + weight * (fp[high] - fp[low])
+
+    def interpolated_paces(self, race_times, race_name: str, extrapolation: str = 'raise',
+                           max_extrapolation: float = Config.PACE_EXTRAPOLATION_SECONDS) -> numpy.ndarray:
+
+        """
+        Continuous version of the pace table - the paces for any target time are interpolated from the
+        neighbouring rows instead of picking the first row at or above the time
+
+        :param race_times: race target times - FirstTime instances or seconds
+        :type race_times: list | numpy.ndarray
+        :param race_name: the race name
+        :type race_name: str
+        :param extrapolation: for times outside the table - 'raise', 'clamp' to the first/last row, or 'linear'
+        :type extrapolation: str
+        :param max_extrapolation: times further than this (seconds) outside the table always raise
+        :type max_extrapolation: float
+        :return: one row per time in the pace matrix layout - reference race time then seconds per unit
+        :rtype: numpy.ndarray
+        """
+        if extrapolation not in ['raise', 'clamp', 'linear']:
+            raise ValueError('extrapolation must be "raise", "clamp" or "linear"')
+
+        from_race_index = self.race_type_index_by_name(name=race_name)
+        seconds = numpy.asarray(self.__to_seconds(times=race_times), dtype=numpy.float64)
+        column = self.snapshot.race_seconds[:, from_race_index]
+        margin = 0 if extrapolation == 'raise' else max_extrapolation
+        if numpy.any(seconds < column[0] - margin):
+            raise ValueError('Time is shorter than the lowest database time')
+        if numpy.any(seconds > column[-1] + margin):
+            raise ValueError('Time is longer than the highest database time')
+
+        clamp = extrapolation == 'clamp'
+        ref_seconds = self.__interpolate(x=seconds, xp=column,
+                                         fp=self.snapshot.race_seconds[:, self.reference_race_index], clamp=clamp)
+        paces = self.__interpolate(x=ref_seconds, xp=self.pace_matrix[:, 0], fp=self.pace_matrix, clamp=clamp)
+        paces[:, 0] = ref_seconds
+
+        return paces
+
+    def interpolated_pace(self, race_time: FirstTime, race_name: str, segment_name: str,
+                          extrapolation: str = 'raise') -> FirstPace:
+
+        """
+        Interpolated pace of one segment - see interpolated_paces
+
+        :param race_time: race target time
+        :type race_time: FirstTime
+        :param race_name: the race name
+        :type race_name: str
+        :param segment_name: segment name as appears in the instructions
+        :type segment_name: str
+        :param extrapolation: for times outside the table - 'raise', 'clamp' or 'linear'
+        :type extrapolation: str
+        :return: the pace rounded to whole seconds
+        :rtype: FirstPace
+        """
+        paces = self.interpolated_paces(race_times=[race_time], race_name=race_name, extrapolation=extrapolation)
 
-        raise ValueError('Row not found with given time')
+        return FirstPace(seconds=int(round(paces[0, self.pace_columns[segment_name]])),
+                         length_unit=self.segments_paces.length_unit)
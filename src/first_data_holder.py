@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+from typing import Dict, Tuple
+
+from first_config import Config
+from first_data import FirstData
+
+
+class FirstDataHolder(object):
+
+    """Holds the current FirstData of a json database for long running processes.
+    When the file changes a new FirstData is built (by the polling thread or by check) and swapped in with a single
+    reference assignment. Callers should take data once per plan - a plan that is being generated keeps using the
+    instance it started with, so it always sees one consistent database"""
+
+    def __init__(self, json_path: str, poll_interval: float = Config.RELOAD_POLL_SECONDS, **data_options):
+
+        """
+        Constructor - loads the database
+
+        :param json_path: the json database path
+        :type json_path: str
+        :param poll_interval: seconds between file checks of the polling thread
+        :type poll_interval: float
+        :param data_options: other FirstData arguments like use_snapshot
+        :return: instance of FirstDataHolder
+        :rtype: FirstDataHolder
+        """
+        if poll_interval <= 0:
+            raise ValueError('poll_interval must be positive')
+
+        self.json_path = json_path
+        self.poll_interval = poll_interval
+        self.data_options = data_options
+
+        self.check_count = 0
+        self.reload_count = 0
+        self.failed_reload_count = 0
+        self.last_reload_seconds = None
+        self.last_reload_at = None
+        self.last_error = None
+
+        self.__reload_lock = threading.Lock()
+        self.__stop_event = threading.Event()
+        self.__thread = None
+        self.__stamp = self.__source_stamp()
+        self.__data = FirstData(json_path=json_path, **data_options)
+
+    @property
+    def data(self) -> FirstData:
+
+        """
+        The current database
+
+        :return: the most recently loaded FirstData
+        :rtype: FirstData
+        """
+        return self.__data
+
+    def __source_stamp(self) -> Tuple[int, int]:
+
+        stat = os.stat(self.json_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def check(self) -> bool:
+
+        """
+        Reload the database if the json file changed since the last load
+
+        :return: True if a new database was swapped in
+        :rtype: bool
+        """
+        with self.__reload_lock:
+            self.check_count += 1
+            try:
+                stamp = self.__source_stamp()
+            except OSError as ex:  # e.g. the file is being replaced - try again on the next check
+                self.last_error = str(ex)
+                return False
+            if stamp == self.__stamp:
+                return False
+
+            return self.__reload(stamp=stamp)
+
+    def reload(self) -> bool:
+
+        """
+        Reload the database unconditionally
+
+        :return: True if a new database was swapped in
+        :rtype: bool
+        """
+        with self.__reload_lock:
+            return self.__reload(stamp=self.__source_stamp())
+
+    def __reload(self, stamp: Tuple[int, int]) -> bool:
+
+        start = time.perf_counter()
+        try:
+            data = FirstData(json_path=self.json_path, **self.data_options)
+        except Exception as ex:  # any broken or wrong-shaped file - keep serving the previous database
+            self.failed_reload_count += 1
+            self.last_error = str(ex)
+            self.__stamp = stamp  # don't retry a broken file until it changes again
+            return False
+
+        self.__data = data
+        self.__stamp = stamp
+        self.reload_count += 1
+        self.last_reload_seconds = time.perf_counter() - start
+        self.last_reload_at = time.time()
+        self.last_error = None
+
+        return True
+
+    def start(self) -> None:
+
+        """
+        Start the polling thread
+        """
+        if self.__thread is not None and self.__thread.is_alive():
+            return
+
+        self.__stop_event.clear()
+        self.__thread = threading.Thread(target=self.__poll, name='FirstDataHolder', daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+
+        """
+        Stop the polling thread and wait for it
+        """
+        self.__stop_event.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def __poll(self) -> None:
+
+        while not self.__stop_event.wait(timeout=self.poll_interval):
+            try:
+                self.check()
+            except Exception as ex:  # keep polling - a later version of the file may be fine
+                self.last_error = str(ex)
+
+    def metrics(self) -> Dict:
+
+        """
+        Reload statistics
+
+        :return: checks, reloads, failed reloads, last reload duration (seconds) and time, last error
+        :rtype: dict
+        """
+        return {'checks': self.check_count,
+                'reloads': self.reload_count,
+                'failed_reloads': self.failed_reload_count,
+                'last_reload_seconds': self.last_reload_seconds,
+                'last_reload_at': self.last_reload_at,
+                'last_error': self.last_error}
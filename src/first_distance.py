@@ -1,8 +1,21 @@
-from typing import Union, Dict
+import weakref
+from typing import Union, Dict, TYPE_CHECKING
+
+from first_config import Config
+from first_format import cached_format, register_format
+from first_units import FirstUnitRegistry
+
+if TYPE_CHECKING:
+    from first_arrays import UnitConversions
 
 
 class FirstDistance(object):
 
+    """Immutable distance value. Equal values share one instance while it is referenced (see __new__)"""
+
+    __slots__ = ('distance', 'unit', '__weakref__')
+    __interned = weakref.WeakValueDictionary()
+
     @staticmethod
     def is_valid_unit(unit: str) -> bool:
 
@@ -14,11 +27,12 @@ class FirstDistance(object):
         :return: True if unit is one of the recognized length unit strings
         :rtype: bool
         """
-        return unit in ['m', 'km', 'ft', 'mile']
+        return FirstDistance.units.is_valid(name=unit)
 
-    conversions = {'m': 1, 'km': 1000, 'mile': 1609.344, 'ft': 0.3048}
+    units = FirstUnitRegistry(sizes=Config.LENGTH_UNITS)
+    conversions = units.sizes  # unit to meters
 
-    def __init__(self, distance: float, unit: str):
+    def __new__(cls, distance: float, unit: str):
 
         """
         Constructor
@@ -30,13 +44,38 @@ class FirstDistance(object):
         :return: instance of FirstDistance
         :rtype: FirstDistance
         """
+        key = (cls, type(distance), distance, unit)  # the type too - 1 and 1.0 are printed differently
+        instance = cls.__interned.get(key)
+        if instance is not None:
+            return instance
+
         if distance < 0:
             raise ValueError('{} is not a positive number'.format(distance))
-        self.distance = distance
-
-        if not self.is_valid_unit(unit=unit):
+        if not cls.is_valid_unit(unit=unit):
             raise ValueError('"{}" is not a valid unit'.format(unit))
-        self.unit = unit
+
+        instance = super().__new__(cls)
+        object.__setattr__(instance, 'distance', distance)
+        object.__setattr__(instance, 'unit', unit)
+        cls.__interned[key] = instance
+
+        return instance
+
+    def __setattr__(self, key, value):
+
+        raise AttributeError('FirstDistance is immutable')
+
+    def __reduce__(self):
+
+        return self.__class__, (self.distance, self.unit)
+
+    def __eq__(self, other) -> bool:
+
+        return isinstance(other, FirstDistance) and self.distance == other.distance and self.unit == other.unit
+
+    def __hash__(self) -> int:
+
+        return hash((self.distance, self.unit))
 
     @classmethod
     def from_string(cls, string: str):
@@ -61,16 +100,23 @@ class FirstDistance(object):
 
         return cls(distance=value, unit=unit)
 
-    def to_json(self, output_unit: Union[str, None] = None) -> Dict:
+    def to_json(self, output_unit: Union[str, None] = None, conversions: 'UnitConversions' = None) -> Dict:
 
         if output_unit and output_unit != self.unit:
-            dist = self.convert_to(output_unit)
+            if conversions is None:
+                dist = self.convert_to(output_unit)
+            else:
+                dist = conversions.distance(distance=self, unit=output_unit)
             return {'distance': dist, 'unit': output_unit}
         else:
             return {'distance': self.distance, 'unit': self.unit}
 
     def to_html(self, output_unit: Union[str, None] = None) -> str:
 
+        return cached_format('distance_html', self, output_unit)
+
+    def _render_html(self, output_unit: Union[str, None]) -> str:
+
         if output_unit and output_unit != self.unit:
             dist = self.convert_to(output_unit)
             return '{0:.3f} {1:s}'.format(dist, output_unit)
@@ -91,12 +137,7 @@ class FirstDistance(object):
         :return: the converted value
         :rtype: float
         """
-        if not self.is_valid_unit(unit=unit):
-            raise ValueError('{} is not a valid unit'.format(unit))
+        return self.units.converter(from_unit=self.unit, to_unit=unit)(self.distance)
 
-        if self.unit == unit:
-            return self.distance
-        else:
-            to_m = self.conversions[self.unit]
-            from_m = self.conversions[unit]
-            return self.distance * to_m / from_m
+
+register_format(kind='distance_html', render=FirstDistance._render_html)
@@ -0,0 +1,57 @@
+from functools import lru_cache
+from typing import Callable, Dict, Optional
+
+from first_config import Config
+
+_RENDERERS = {}
+
+
+def register_format(kind: str, render: Callable[[object, Optional[str]], str]) -> None:
+
+    """
+    Add a format kind to the cache
+
+    :param kind: format kind like 'distance_html'
+    :type kind: str
+    :param render: (value, output_unit) -> string
+    :type render: callable
+    """
+    _RENDERERS[kind] = render
+
+
+@lru_cache(maxsize=Config.FORMAT_CACHE_SIZE)
+def cached_format(kind: str, value, output_unit: Optional[str] = None) -> str:
+
+    """
+    Format a value, memoized by (kind, value, output_unit). Always pass the arguments by position -
+    the same call with keywords is a different cache key
+
+    :param kind: registered format kind
+    :type kind: str
+    :param value: a hashable value like FirstDistance, FirstPace or FirstTime
+    :param output_unit: the unit to format to, None for the value's own unit
+    :type output_unit: str
+    :return: the formatted string
+    :rtype: str
+    """
+    return _RENDERERS[kind](value, output_unit)
+
+
+def format_cache_info() -> Dict:
+
+    """
+    Formatting cache effectiveness
+
+    :return: {'hits': int, 'misses': int, 'size': int, 'maxsize': int}
+    :rtype: dict
+    """
+    info = cached_format.cache_info()
+
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'maxsize': info.maxsize}
+
+
+def clear_format_cache() -> None:
+
+    """Empty the formatting cache and reset the counters"""
+
+    cached_format.cache_clear()
@@ -0,0 +1,292 @@
+from typing import Dict, List, Tuple, Union
+
+from parse import parse
+
+from first_distance import FirstDistance
+
+
+class CompiledStep(object):
+
+    """Pace-independent form of a step instruction like '400 m@RI' or '8 mile@RP+20'.
+    The pace is kept by name ('RP' for race pace) and resolved only when a plan is generated"""
+
+    def __init__(self, name: str, pace_name: str, distance: Tuple[float, str] = None, duration: int = None,
+                 increment: int = None):
+
+        """
+        Constructor
+
+        :param name: the instruction text - the step name
+        :type name: str
+        :param pace_name: segment name for the pace table or 'RP'
+        :type pace_name: str
+        :param distance: (value, unit)
+        :type distance: tuple
+        :param duration: seconds
+        :type duration: int
+        :param increment: seconds added to the pace
+        :type increment: int
+        :return: instance of CompiledStep
+        :rtype: CompiledStep
+        """
+        self.name = name
+        self.pace_name = pace_name
+        self.distance = distance
+        self.duration = duration
+        self.increment = increment
+
+    def __eq__(self, other) -> bool:
+
+        return type(other) is type(self) and vars(other) == vars(self)
+
+    def __repr__(self) -> str:
+
+        return 'step: {}'.format(self.name)
+
+
+class CompiledRepeat(object):
+
+    def __init__(self, repeat: int, steps: List[Union[CompiledStep, 'CompiledRepeat']]):
+
+        """
+        Constructor
+
+        :param repeat: number of repetitions
+        :type repeat: int
+        :param steps: the repeated steps
+        :type steps: list[CompiledStep | CompiledRepeat]
+        :return: instance of CompiledRepeat
+        :rtype: CompiledRepeat
+        """
+        self.repeat = repeat
+        self.steps = steps
+
+    def __eq__(self, other) -> bool:
+
+        return type(other) is type(self) and vars(other) == vars(self)
+
+    def __repr__(self) -> str:
+
+        return 'repeat X {}: {}'.format(self.repeat, self.steps)
+
+
+class CompiledWorkout(object):
+
+    def __init__(self, week: str, keyrun: str, note: str, steps: List[Union[CompiledStep, CompiledRepeat]]):
+
+        """
+        Constructor
+
+        :param week: week number as appears in the instructions
+        :type week: str
+        :param keyrun: key-run number as appears in the instructions
+        :type keyrun: str
+        :param note: the steps instructions
+        :type note: str
+        :param steps: the compiled steps
+        :type steps: list[CompiledStep | CompiledRepeat]
+        :return: instance of CompiledWorkout
+        :rtype: CompiledWorkout
+        """
+        self.week = week
+        self.keyrun = keyrun
+        self.note = note
+        self.steps = steps
+
+    @property
+    def name(self) -> str:
+
+        return 'Week {} Keyrun {}'.format(self.week, self.keyrun)
+
+    def __eq__(self, other) -> bool:
+
+        return type(other) is type(self) and vars(other) == vars(self)
+
+    def __repr__(self) -> str:
+
+        return '{}: {}'.format(self.name, self.steps)
+
+
+class FirstInstructionCompiler(object):
+
+    """Compile workout instructions like '1 1 warmup#8x(400m#400 m@RI)cooldown' to CompiledWorkout.
+    Only the segment definitions are needed - paces are resolved by FirstWorkout.from_compiled"""
+
+    def __init__(self, segments: List[Dict]):
+
+        """
+        Constructor
+
+        :param segments: segment types - list of {'name', 'type', 'distance', 'time', 'ref_pace_name'}
+                         as kept in the database snapshot
+        :type segments: list[dict]
+        :return: instance of FirstInstructionCompiler
+        :rtype: FirstInstructionCompiler
+        """
+        self.segments = {}
+        for segment in segments:
+            distance = None
+            if segment['distance'] is not None:
+                distance = FirstDistance.from_string(segment['distance'])
+                distance = (distance.distance, distance.unit)
+            self.segments[segment['name']] = (distance, segment['time'])
+
+    def compile_step(self, instructions: str) -> CompiledStep:
+
+        """
+        Compile a single step
+
+        :param instructions: like '400 m@RI'
+        :type instructions: str
+        :return: the compiled step
+        :rtype: CompiledStep
+        """
+        items = instructions.split('@')
+        increment = None
+        if items[0] in self.segments:
+            pace_name = items[0]
+            distance, duration = self.segments[pace_name]
+        else:
+            distance = FirstDistance.from_string(items[0])
+            distance = (distance.distance, distance.unit)
+            if len(items) < 2:
+                raise ValueError('Missing pace in "{}"'.format(instructions))
+            pace_list = items[1].split('+')
+            pace_name = pace_list[0]
+            if len(pace_list) > 1:
+                try:
+                    increment = int(pace_list[1])
+                except ValueError:
+                    raise ValueError('Invalid pace increment in "{}"'.format(instructions))
+            if pace_name == 'RP':  # special case for race-pace
+                duration = None
+            elif pace_name in self.segments:
+                duration = self.segments[pace_name][1]
+            else:
+                raise ValueError('Unknown segment "{}" in "{}"'.format(pace_name, instructions))
+
+        if distance is None and duration is None:
+            raise ValueError('Either distance or time must have a value in "{}"'.format(instructions))
+        if distance is not None and duration is not None:
+            raise ValueError('Cannot set both distance and duration in "{}"'.format(instructions))
+
+        return CompiledStep(name=instructions, pace_name=pace_name, distance=distance, duration=duration,
+                            increment=increment)
+
+    def __compile_simple_steps(self, instructions: str) -> Tuple[List[CompiledStep], int]:
+
+        steps = []
+
+        last = instructions.split('#')[-1]
+        result = parse('{:d}x', last)
+        if result is not None:
+            simple_instructions = '#'.join(instructions.split('#')[:-1])
+            repeat = result.fixed[0]
+        else:
+            simple_instructions = instructions
+            repeat = -1
+
+        if simple_instructions != '':
+            for item in simple_instructions.split('#'):
+                steps.append(self.compile_step(instructions=item))
+
+        return steps, repeat
+
+    def __compile_steps(self, instructions: str, depth: int) -> Tuple[List, str]:
+
+        steps = []
+        simple_instructions = ''
+        remainder = instructions
+
+        while remainder:
+            char = remainder[0]
+            remainder = remainder[1:]
+            if char == '(':
+                simple_steps, repeat = self.__compile_simple_steps(instructions=simple_instructions)
+                simple_instructions = ''
+                if repeat < 1:
+                    raise ValueError('Syntax error: missing nX before (')
+
+                steps += simple_steps
+                repeat_steps, remainder = self.__compile_steps(instructions=remainder, depth=depth + 1)
+                steps.append(CompiledRepeat(repeat=repeat, steps=repeat_steps))
+            elif char == ')':
+                if depth == 0:
+                    raise ValueError('Unbalanced parentheses')
+                simple_steps, repeat = self.__compile_simple_steps(instructions=simple_instructions)
+                if repeat > 0:
+                    raise ValueError('Syntax error: trailing nX')
+                return steps + simple_steps, remainder
+            else:
+                simple_instructions += char
+
+        if depth > 0:
+            raise ValueError('Unbalanced parentheses')
+        simple_steps, repeat = self.__compile_simple_steps(instructions=simple_instructions)
+        if repeat > 0:
+            raise ValueError('Syntax error: trailing nX')
+
+        return steps + simple_steps, remainder
+
+    def compile_workout(self, instructions: str) -> CompiledWorkout:
+
+        """
+        Compile one workout line
+
+        :param instructions: week, key-run and steps like '1 1 warmup#8x(400m#400 m@RI)cooldown'
+        :type instructions: str
+        :return: the compiled workout
+        :rtype: CompiledWorkout
+        """
+        split1 = instructions.split(' ', 2)
+        if len(split1) != 3:
+            raise ValueError('Expected week, key-run and steps in "{}"'.format(instructions))
+
+        steps, _ = self.__compile_steps(instructions=split1[2], depth=0)
+
+        return CompiledWorkout(week=split1[0], keyrun=split1[1], note=split1[2], steps=steps)
+
+    def compile_plan(self, name: str, instructions: List[str]) -> List[CompiledWorkout]:
+
+        """
+        Compile all the workouts of a plan
+
+        :param name: plan name - for error messages
+        :type name: str
+        :param instructions: the workout lines
+        :type instructions: list[str]
+        :return: the compiled workouts
+        :rtype: list[CompiledWorkout]
+        """
+        return self.compile_plans(plans=[(name, instructions)])[0]
+
+    def compile_plans(self, plans: List[Tuple[str, List[str]]]) -> List[List[CompiledWorkout]]:
+
+        """
+        Compile the workouts of several plans. All the errors are reported together with their positions
+
+        :param plans: list of (plan name, workout lines)
+        :type plans: list[tuple]
+        :return: the compiled workouts of each plan
+        :rtype: list[list[CompiledWorkout]]
+        """
+        compiled = []
+        errors = []
+        for name, instructions in plans:
+            workouts = []
+            for line_index, line in enumerate(instructions):
+                try:
+                    workouts.append(self.compile_workout(instructions=line))
+                except ValueError as ex:
+                    split1 = line.split(' ', 2)
+                    if len(split1) == 3:
+                        position = 'week {} keyrun {}'.format(split1[0], split1[1])
+                    else:
+                        position = 'line {}'.format(line_index + 1)
+                    errors.append('"{}" {}: {}'.format(name, position, str(ex)))
+            compiled.append(workouts)
+
+        if errors:
+            raise ValueError('Invalid plan instructions:\n  {}'.format('\n  '.join(errors)))
+
+        return compiled
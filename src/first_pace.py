@@ -1,12 +1,33 @@
-from typing import Dict, Union
+import weakref
+from typing import Dict, Union, TYPE_CHECKING
+
+import numpy
 
 from first_distance import FirstDistance
+from first_format import cached_format, register_format
 from first_time import FirstTime
 
+if TYPE_CHECKING:
+    from first_arrays import UnitConversions
+
+
+def _format_seconds(seconds: int) -> str:
+
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+
+    return '{}:{:02d}:{:02d}'.format(hours, minutes, seconds)
+
 
 class FirstPace(object):
 
-    def __init__(self, minutes: int = 0, seconds: int = 0, length_unit: str = 'mile'):
+    """Immutable pace value. Equal values share one instance while it is referenced (see __new__).
+    The canonical value is seconds_per_meter; time and length_unit are the view it was created with"""
+
+    __slots__ = ('time', 'length_unit', 'seconds_per_meter', '__weakref__')
+    __interned = weakref.WeakValueDictionary()
+
+    def __new__(cls, minutes: int = 0, seconds: int = 0, length_unit: str = 'mile'):
 
         """
         Constructor
@@ -20,35 +41,104 @@ class FirstPace(object):
         :return: instance of FirstPace
         :rtype: FirstPace
         """
+        # validate before the lookup - 1:-10 must not find the interned 0:50
         if not FirstDistance.is_valid_unit(unit=length_unit):
             raise ValueError('"{}" is not a valid length unit'.format(length_unit))
-        self.time = FirstTime(minutes=minutes, seconds=seconds)
-        self.length_unit = length_unit
+        if minutes < 0 or seconds < 0:
+            raise ValueError('negative values are invalid')
+
+        key = (cls, minutes * 60 + seconds, length_unit)
+        instance = cls.__interned.get(key)
+        if instance is not None:
+            return instance
+
+        instance = super().__new__(cls)
+        time = FirstTime(minutes=minutes, seconds=seconds)
+        object.__setattr__(instance, 'time', time)
+        object.__setattr__(instance, 'length_unit', length_unit)
+        object.__setattr__(instance, 'seconds_per_meter',
+                           time.total_seconds() / FirstDistance.units.sizes[length_unit])
+        cls.__interned[key] = instance
+
+        return instance
+
+    def __setattr__(self, key, value):
+
+        raise AttributeError('FirstPace is immutable')
+
+    def __reduce__(self):
+
+        return self.__class__, (0, self.time.total_seconds(), self.length_unit)
+
+    def __eq__(self, other) -> bool:
+
+        return isinstance(other, FirstPace) and self.time == other.time and self.length_unit == other.length_unit
+
+    def __hash__(self) -> int:
+
+        return hash((self.time, self.length_unit))
 
     def __str__(self):
 
-        return str(self.time) + ' min per ' + self.length_unit
+        return cached_format('pace_html', self, None)
 
-    def to_json(self, output_unit: Union[str, None] = None) -> Dict:
+    def to_json(self, output_unit: Union[str, None] = None, conversions: 'UnitConversions' = None) -> Dict:
 
         if output_unit and output_unit != self.length_unit:
-            dist = FirstDistance(1.0, output_unit)
-            seconds_time = self.to_time(dist, 'second')
-            output_pace = FirstPace(seconds=round(seconds_time), length_unit=output_unit)
-            return {'pace': str(output_pace), 'length_unit': output_unit, 'time': output_pace.time.to_json()}
+            if conversions is None:
+                seconds = round(self.seconds_per_unit(unit=output_unit))
+            else:
+                seconds = round(conversions.seconds_per_unit(pace=self, unit=output_unit))
+            return {'pace': cached_format('pace_html', self, output_unit), 'length_unit': output_unit,
+                    'time': {'time': cached_format('seconds', seconds, None), 'seconds': seconds}}
         else:
             return {'pace': str(self), 'length_unit': self.length_unit, 'time': self.time.to_json()}
 
     def to_html(self, output_unit: Union[str, None] = None) -> str:
 
+        return cached_format('pace_html', self, output_unit)
+
+    def _render_html(self, output_unit: Union[str, None]) -> str:
+
         if output_unit and output_unit != self.length_unit:
-            dist = FirstDistance(1.0, output_unit)
-            seconds_time = self.to_time(dist, 'second')
-            output_pace = FirstPace(seconds=round(seconds_time), length_unit=output_unit)
-            return '{} min per {}'.format(str(output_pace.time), output_unit)
+            return '{} min per {}'.format(_format_seconds(seconds=round(self.seconds_per_unit(unit=output_unit))),
+                                          output_unit)
         else:
             return '{} min per {}'.format(str(self.time), self.length_unit)
 
+    def seconds_per_unit(self, unit: str) -> float:
+
+        """
+        The pace per another length unit - not rounded
+
+        :param unit: length unit
+        :type unit: str
+        :return: seconds per unit
+        :rtype: float
+        """
+        if unit == self.length_unit:
+            return self.time.total_seconds()
+
+        FirstDistance.units.unit_id(name=unit)  # validate
+        return self.seconds_per_meter * FirstDistance.units.sizes[unit]
+
+    def speed(self, length_unit: str = 'm', time_unit: str = 'second') -> float:
+
+        """
+        The speed of this pace, like speed() for m/s, speed('km', 'hour') for km/h or speed('mile', 'hour') for mph
+
+        :param length_unit: length unit
+        :type length_unit: str
+        :param time_unit: duration unit
+        :type time_unit: str
+        :return: length units per time unit
+        :rtype: float
+        """
+        FirstDistance.units.unit_id(name=length_unit)  # validate
+        FirstTime.units.unit_id(name=time_unit)
+
+        return FirstTime.units.sizes[time_unit] / (self.seconds_per_meter * FirstDistance.units.sizes[length_unit])
+
     @classmethod
     def from_string(cls, str_input: str):
 
@@ -68,12 +158,12 @@ class FirstPace(object):
         if not FirstDistance.is_valid_unit(unit=tokens[-1]):
             raise ValueError('"{}" is not a valid length unit'.format(length_unit))
 
-        return cls(minutes=p_time.seconds//60, seconds=p_time.seconds % 60, length_unit=length_unit)
+        return cls(seconds=p_time.milliseconds // 1000, length_unit=length_unit)
 
     @classmethod
     def copy(cls, from_pace: 'FirstPace'):
 
-        return cls.from_string(str(from_pace))
+        return from_pace  # immutable - nothing to copy
 
     def to_time(self, distance: FirstDistance, unit: str) -> float:
 
@@ -87,10 +177,45 @@ class FirstPace(object):
         :return: the time value for this unit
         :rtype: float
         """
-        factor = distance.convert_to(unit=self.length_unit)
+        return self.time_for(distance=distance.distance, distance_unit=distance.unit, unit=unit)
+
+    def time_for(self, distance: float, distance_unit: str, unit: str) -> float:
+
+        """
+        to_time for a raw distance value. The time is rounded to the second before the unit conversion
+
+        :param distance: the distance value
+        :type distance: float
+        :param distance_unit: length unit of the distance
+        :type distance_unit: str
+        :param unit: the desired unit of the result
+        :type unit: str
+        :return: the time value for this unit
+        :rtype: float
+        """
+        factor = FirstDistance.units.converter(from_unit=distance_unit, to_unit=self.length_unit)(distance)
         seconds = self.time.total_seconds() * factor
-        result_time = FirstTime(seconds=round(seconds))
-        return result_time.convert_to(unit=unit)
+        return FirstTime.units.converter(from_unit='second', to_unit=unit)(round(seconds))
+
+    def times_for(self, distances: numpy.ndarray, distance_unit: str, unit: str) -> numpy.ndarray:
+
+        """
+        time_for for an array of distance values
+
+        :param distances: the distance values
+        :type distances: numpy.ndarray
+        :param distance_unit: length unit of the distances
+        :type distance_unit: str
+        :param unit: the desired unit of the results
+        :type unit: str
+        :return: the time values for this unit
+        :rtype: numpy.ndarray
+        """
+        # the same converters and the same order of operations as time_for so the results are identical
+        factors = FirstDistance.units.converter(from_unit=distance_unit, to_unit=self.length_unit)(
+            numpy.asarray(distances, dtype=numpy.float64))
+        seconds = numpy.rint(self.time.total_seconds() * factors)  # round half to even like round()
+        return FirstTime.units.converter(from_unit='second', to_unit=unit)(seconds)
 
     def to_distance(self, time: FirstTime, unit: str) -> float:
 
@@ -104,9 +229,37 @@ class FirstPace(object):
         :return: the distance value for this unit
         :rtype: float
         """
-        factor = time.total_seconds()/self.time.total_seconds()
-        result_distance = FirstDistance(distance=factor, unit=self.length_unit)
-        return result_distance.convert_to(unit=unit)
+        return self.distance_for(seconds=time.total_seconds(), unit=unit)
+
+    def distance_for(self, seconds: float, unit: str) -> float:
+
+        """
+        to_distance for a raw duration in seconds
+
+        :param seconds: the duration
+        :type seconds: float
+        :param unit: the desired unit of the result
+        :type unit: str
+        :return: the distance value for this unit
+        :rtype: float
+        """
+        factor = seconds / self.time.total_seconds()
+        return FirstDistance.units.converter(from_unit=self.length_unit, to_unit=unit)(factor)
+
+    def distances_for(self, seconds: numpy.ndarray, unit: str) -> numpy.ndarray:
+
+        """
+        distance_for for an array of durations
+
+        :param seconds: the durations in seconds
+        :type seconds: numpy.ndarray
+        :param unit: the desired unit of the results
+        :type unit: str
+        :return: the distance values for this unit
+        :rtype: numpy.ndarray
+        """
+        factors = numpy.asarray(seconds, dtype=numpy.float64) / self.time.total_seconds()
+        return FirstDistance.units.converter(from_unit=self.length_unit, to_unit=unit)(factors)
 
     @classmethod
     def from_time_distance(cls, time: FirstTime, distance: FirstDistance, unit: str = None):
@@ -130,15 +283,17 @@ class FirstPace(object):
 
         return cls(minutes=int(seconds//60), seconds=round(seconds % 60), length_unit=unit)
 
-    def increment(self, seconds: int) -> None:
+    def increment(self, seconds: int) -> 'FirstPace':
 
         """
-        Increment the pace by number of seconds - for instructions like 'RP+15'
+        The pace incremented by number of seconds - for instructions like 'RP+15'
 
         :param seconds:
         :type seconds: int
+        :return: a slower pace
+        :rtype: FirstPace
         """
-        self.time = FirstTime(seconds=self.time.seconds + seconds)
+        return self.__class__(seconds=self.time.milliseconds // 1000 + seconds, length_unit=self.length_unit)
 
     def meters_per_second_delta(self, delta_in_seconds: int) -> float:
 
@@ -150,7 +305,10 @@ class FirstPace(object):
         :return: calculated speed in m/s
         :rtype: float
         """
-        seconds = self.time.total_seconds() + delta_in_seconds
-        meters = FirstDistance(distance=1.0, unit=self.length_unit).convert_to(unit='m')
+        meters = FirstDistance.units.sizes[self.length_unit]
+
+        return meters / (self.time.total_seconds() + delta_in_seconds)
+
 
-        return meters / seconds
+register_format(kind='seconds', render=lambda seconds, _: _format_seconds(seconds=seconds))
+register_format(kind='pace_html', render=FirstPace._render_html)
@@ -1,13 +1,20 @@
 import json
 from datetime import timedelta
-from typing import List, Union, Dict
+from typing import List, Union, Dict, Iterator, Tuple
 
+import numpy
+
+from first_arena import FirstStepArena
+from first_arrays import DistanceArray, DurationArray, PaceArray, UnitConversions
 from first_data import FirstData
+from first_distance import FirstDistance
+from first_pace import FirstPace
 from first_race import FirstRace
 from first_runner import FirstRunner
-from first_step import FirstStepBase
+from first_speed import FirstSpeed
+from first_step import FirstStepBase, FirstStepIds, FirstStepRepeat
 from first_utils import XmlTag
-from first_workout import FirstWorkout
+from first_workout import FirstTimelineSegment, FirstWorkout
 
 
 class FirstPlan(object):
@@ -41,6 +48,8 @@ class FirstPlan(object):
         self.race = race
         self.runner = runner
         self.workouts = []
+        self.step_ids = FirstStepIds()
+        self.__json_conversions = {}  # output unit -> UnitConversions (or None) reused by to_json
 
     def __str__(self) -> str:
 
@@ -112,7 +121,10 @@ class FirstPlan(object):
 
         return tcx.indented_str(doctype='xml')
 
-    def to_json(self, output_unit: Union[str, None] = None) -> Dict:
+    def to_json(self, output_unit: Union[str, None] = None, conversions: UnitConversions = None) -> Dict:
+
+        if output_unit and conversions is None:
+            conversions = self.__conversions_for(output_unit=output_unit)
 
         result_dict = {'name': self.name}
 
@@ -122,7 +134,8 @@ class FirstPlan(object):
             result_dict['race'] = self.race.to_json(output_unit=output_unit)
         if self.runner:
             result_dict['runner'] = self.runner.to_json()
-        workouts_list = [workout.to_json(output_unit=output_unit) for workout in self.workouts]
+        workouts_list = [workout.to_json(output_unit=output_unit, conversions=conversions)
+                         for workout in self.workouts]
         result_dict['workouts'] = workouts_list
 
         return result_dict
@@ -156,6 +169,140 @@ class FirstPlan(object):
 
         return html.indented_str(doctype='html')
 
+    def step_arrays(self) -> Dict:
+
+        """
+        Columns of all the body steps in the plan for analytics. Repeated steps appear once with their count.
+        The missing distance or duration of each step is derived from its pace (not rounded)
+
+        :return: {'workout': workout index, 'count': times the step is run, 'distance': DistanceArray,
+                  'duration': DurationArray, 'pace': PaceArray}
+        :rtype: dict
+        """
+        workout_indexes = []
+        counts = []
+        meters = []
+        seconds = []
+        paces = []
+
+        def collect(steps: List[FirstStepBase], count: int, workout_index: int) -> None:
+            for step in steps:
+                if isinstance(step, FirstStepRepeat):
+                    collect(steps=step.steps, count=count * step.repeat, workout_index=workout_index)
+                else:
+                    workout_indexes.append(workout_index)
+                    counts.append(count)
+                    meters.append(numpy.nan if step.distance is None else step.distance.convert_to(unit='m'))
+                    seconds.append(numpy.nan if step.time is None else step.time.total_seconds())
+                    paces.append(step.pace)
+
+        for index, workout in enumerate(self.workouts):
+            collect(steps=workout.steps, count=1, workout_index=index)
+
+        pace_array = PaceArray.from_paces(paces=paces)
+        meters = numpy.array(meters, dtype=numpy.float64)
+        seconds = numpy.array(seconds, dtype=numpy.float64)
+        by_time = numpy.isnan(meters)
+        meters[by_time] = seconds[by_time] / pace_array.seconds_per_meter[by_time]
+        seconds[~by_time] = meters[~by_time] * pace_array.seconds_per_meter[~by_time]
+
+        return {'workout': numpy.array(workout_indexes, dtype=numpy.int64),
+                'count': numpy.array(counts, dtype=numpy.int64),
+                'distance': DistanceArray(meters=meters), 'duration': DurationArray(seconds=seconds),
+                'pace': pace_array}
+
+    def timeline(self, compressed: bool = False) -> Iterator[FirstTimelineSegment]:
+
+        """
+        The timelines of all the workouts in order. Offsets restart at 0 for each workout
+
+        :param compressed: yield repeat blocks once with their repetition count instead of unrolling them
+        :type compressed: bool
+        :return: generator of segments
+        :rtype: iterator[FirstTimelineSegment]
+        """
+        for workout in self.workouts:
+            yield from workout.timeline(compressed=compressed)
+
+    def step_arena(self) -> FirstStepArena:
+
+        """
+        All the steps of the plan in a compact array representation
+
+        :return: the arena
+        :rtype: FirstStepArena
+        """
+        return FirstStepArena(workouts=self.workouts)
+
+    def __step_values(self) -> Tuple[List[FirstDistance], List[Union[FirstPace, FirstSpeed]]]:
+
+        distances = []
+        paces = []
+
+        def collect(steps: List[FirstStepBase]) -> None:
+            for step in steps:
+                if isinstance(step, FirstStepRepeat):
+                    collect(steps=step.steps)
+                else:
+                    if step.distance is not None:
+                        distances.append(step.distance)
+                    paces.append(step.pace)
+
+        for workout in self.workouts:
+            collect(steps=workout.steps)
+
+        return distances, paces
+
+    def __conversions_for(self, output_unit: str) -> Union[UnitConversions, None]:
+
+        # one instance per unit, so the step fragments cached with it are reused by the next to_json
+        if output_unit not in self.__json_conversions:
+            distances, paces = self.__step_values()
+            if all(distance.unit == output_unit for distance in distances) and \
+                    all(pace.length_unit == output_unit for pace in paces):
+                conversions = None  # already in the output unit - nothing to convert
+            else:
+                conversions = UnitConversions(distances=distances, paces=paces, units=[output_unit])
+            self.__json_conversions[output_unit] = conversions
+
+        return self.__json_conversions[output_unit]
+
+    def unit_conversions(self, units: List[str]) -> UnitConversions:
+
+        """
+        Convert all the step distances and paces of the plan in one pass. Pass the result to to_json
+        to render the plan in any of the units without converting each step again
+
+        :param units: output length units like ['km', 'mile']
+        :type units: list[str]
+        :return: the converted values
+        :rtype: UnitConversions
+        """
+        distances, paces = self.__step_values()
+
+        return UnitConversions(distances=distances, paces=paces, units=units)
+
+    def weekly_volume(self, unit: str = 'mile') -> numpy.ndarray:
+
+        """
+        Total distance of each plan week, counted from the week of the first workout
+
+        :param unit: length unit
+        :type unit: str
+        :return: distance per week
+        :rtype: numpy.ndarray
+        """
+        if len(self.workouts) == 0:
+            return numpy.zeros(0)
+
+        arrays = self.step_arrays()
+        first_date = self.workouts[0].workout_date
+        workout_weeks = numpy.array([(workout.workout_date - first_date).days // 7 for workout in self.workouts],
+                                    dtype=numpy.int64)
+        distances = arrays['distance'].convert_to(unit=unit) * arrays['count']
+
+        return numpy.bincount(workout_weeks[arrays['workout']], weights=distances, minlength=workout_weeks[-1] + 1)
+
     def add_workout(self, workout: FirstWorkout) -> None:
 
         """
@@ -166,6 +313,7 @@ class FirstPlan(object):
         """
 
         self.workouts.append(workout)
+        self.__json_conversions.clear()
 
     def can_generate_workouts(self) -> bool:
 
@@ -194,10 +342,10 @@ class FirstPlan(object):
         if self.workouts is not None and len(self.workouts) > 0:
             del self.workouts[:]
 
-        FirstStepBase.reset_global_id()  # ids are auto incremented. Make sure you start from 0
+        self.step_ids.reset()  # ids are auto incremented. Make sure you start from 0
+        self.__json_conversions.clear()
 
-        index = data.race_type_index_by_name(name=self.race.race_type.name)
-        plan_instructions = data.plan_instructions[index]
+        plan_instructions = data.plan_instructions[data.plan_index_by_race_name(name=self.race.race_type.name)]
         time_index = data.pace_index_by_race_time(race_time=self.race.target_time, race_name=self.race.race_type.name)
         # TODO for now all plans have 3 weekly key-runs. Add a parameter num_weekly_runs to generalize
         num_weekly_runs = 3
@@ -213,10 +361,14 @@ class FirstPlan(object):
         week_dates = [start_date, second_date, third_date]
         weekday_index = 0
         race_pace = self.race.race_pace()
-        for wi in plan_instructions.instructions:
-            self.workouts.append(FirstWorkout.from_instructions(instructions=wi, wo_date=week_dates[weekday_index],
-                                                                data=data, time_index=time_index,
-                                                                race_pace=race_pace))
+        compiled = plan_instructions.compiled
+        if compiled is None:
+            compiled = data.instruction_compiler.compile_plan(name=plan_instructions.name,
+                                                              instructions=plan_instructions.instructions)
+        for wi in compiled:
+            self.workouts.append(FirstWorkout.from_compiled(compiled=wi, wo_date=week_dates[weekday_index],
+                                                            data=data, time_index=time_index, race_pace=race_pace,
+                                                            step_ids=self.step_ids))
             week_dates[weekday_index] += timedelta(days=7)
             weekday_index = (weekday_index + 1) % num_weekly_runs
         if self.workouts[-1].workout_date != self.race.race_date:
@@ -126,7 +126,7 @@ class FirstRace(object):
         result_dict['race_type'] = self.race_type.to_json(output_unit=output_unit)
         result_dict['status'] = self.status
         if self.target_time:
-            result_dict['target_time'] = {'time': str(self.target_time), 'seconds': self.target_time.seconds}
+            result_dict['target_time'] = self.target_time.to_json()
 
         return result_dict
 
@@ -0,0 +1,460 @@
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import struct
+import sys
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Tuple
+
+import numpy
+
+from first_config import Config
+from first_distance import FirstDistance
+from first_instructions import CompiledWorkout, FirstInstructionCompiler
+from first_pace import FirstPace
+from first_time import FirstTime
+
+
+class FirstSharedBlock(shared_memory.SharedMemory):
+
+    """Shared memory block of a published snapshot.
+    FirstSnapshot.attach drops the block from the resource tracker of the attaching process, and a worker started
+    by the publisher shares the publisher's tracker, so unlink registers the block again before removing it"""
+
+    def unlink(self) -> None:
+
+        """
+        Remove the block - call once, from the process that published it
+        """
+        if os.name == 'posix' and sys.version_info < (3, 13):
+            resource_tracker.register(self._name, 'shared_memory')
+        super().unlink()
+
+
+class FirstSnapshot(object):
+
+    """Compiled numeric form of the FIRST database.
+    Times are stored as integer seconds and paces as integer seconds per pace unit, so a snapshot can be
+    saved to a flat binary file next to the json database and loaded again without parsing any string.
+    File layout - magic, version, header length, pickled header, then the raw arrays aligned to ALIGNMENT
+    and each plan's pickled instructions with their compiled form (see FirstInstructionCompiler).
+    The header keeps the offset and length of each plan, so a lazy snapshot decodes a plan from its own buffer
+    the first time it is asked for (see plan_instructions)"""
+
+    MAGIC = b'FIRSTDB\x00'
+    VERSION = 4
+    ALIGNMENT = 64
+    PREAMBLE = struct.Struct('<IQ')  # version, header length
+
+    def __init__(self, name: str, note: str, races: List[Dict], race_seconds: numpy.ndarray,
+                 reference_race: str, pace_unit: str, segments: List[Dict], pace_seconds: numpy.ndarray,
+                 plans: List[Dict], source: Dict = None, buffer=None, plan_spans: List[Tuple[int, int]] = None):
+
+        """
+        Constructor
+
+        :param name: database name
+        :type name: str
+        :param note: database note
+        :type note: str
+        :param races: race types - list of {'name', 'distance'}
+        :type races: list[dict]
+        :param race_seconds: equivalent times table (rows x races)
+        :type race_seconds: numpy.ndarray
+        :param reference_race: the race name the pace table is indexed by
+        :type reference_race: str
+        :param pace_unit: like 'min per mile'
+        :type pace_unit: str
+        :param segments: segment types - list of {'name', 'type', 'distance', 'time', 'ref_pace_name'}
+        :type segments: list[dict]
+        :param pace_seconds: paces table (rows x (1 + pace segments)). Column 0 is the reference race time
+        :type pace_seconds: numpy.ndarray
+        :param plans: plan instructions - list of {'name', 'race_name', 'instructions', 'compiled'}.
+                      In a lazy snapshot 'instructions' and 'compiled' are missing until the plan is decoded,
+                      or only 'compiled' until the plan is compiled
+        :type plans: list[dict]
+        :param source: stamp of the json source - {'mtime_ns', 'size', 'sha1'}
+        :type source: dict
+        :param buffer: the snapshot file content the lazy plans are decoded from
+        :param plan_spans: (offset, length) of each pickled plan in buffer
+        :type plan_spans: list[tuple[int, int]]
+        :return: instance of FirstSnapshot
+        :rtype: FirstSnapshot
+        """
+        self.name = name
+        self.note = note
+        self.races = races
+        self.race_seconds = race_seconds
+        self.reference_race = reference_race
+        self.pace_unit = pace_unit
+        self.segments = segments
+        self.pace_seconds = pace_seconds
+        self.plans = plans
+        self.source = source
+        self.buffer = buffer
+        self.plan_spans = plan_spans
+        self.block = None  # the shared memory block the arrays live in (see attach)
+
+    @staticmethod
+    def path_for(json_path: str) -> str:
+
+        """
+        The default snapshot location - next to the json source
+
+        :param json_path: the json database path
+        :type json_path: str
+        :return: snapshot path
+        :rtype: str
+        """
+        return '{}.{}'.format(os.path.splitext(json_path)[0], Config.SNAPSHOT_EXTENSION)
+
+    @staticmethod
+    def source_stamp(stat: os.stat_result, sha1: str) -> Dict:
+
+        return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha1': sha1}
+
+    @classmethod
+    def from_json_bytes(cls, raw: bytes, lazy: bool = False):
+
+        """
+        Compile the json database content
+
+        :param raw: the json database file content
+        :type raw: bytes
+        :param lazy: compile each plan only when it is first asked for (see plan_instructions)
+        :type lazy: bool
+        :return: instance of FirstSnapshot
+        :rtype: FirstSnapshot
+        """
+        data_dict = json.loads(raw.decode('utf-8'))
+        if not isinstance(data_dict, dict):
+            raise ValueError('Malformed json - the database must be an object')
+        plans = [{'name': plan['name'], 'race_name': plan['race_name'], 'instructions': plan['instructions']}
+                 for plan in data_dict['workout_instructions']]
+
+        races = [{'name': race['name'], 'distance': race['distance']} for race in data_dict['races']]
+        race_seconds = numpy.array([FirstTime.parse_many(strings=times) for times in data_dict['equivalent_times']],
+                                   dtype=numpy.int32)
+
+        json_segments = data_dict['segments']
+        segments = []
+        for segment_type in json_segments['segment_types']:
+            segment = {'name': segment_type['name'], 'type': segment_type['type'], 'distance': None, 'time': None,
+                       'ref_pace_name': segment_type['ref_pace_name']}
+            if segment['type'] == 'DISTANCE':
+                segment['distance'] = segment_type['distance']
+            elif segment['type'] == 'TIME':
+                segment['time'] = FirstTime.parse_many(strings=[segment_type['time']])[0]
+            segments.append(segment)
+
+        pace_unit = json_segments['pace_unit']
+        distance_unit = pace_unit.split()[-1]
+        pace_rows = []
+        for line in json_segments['paces']:
+            items = line.split()
+            row = FirstTime.parse_many(strings=items[:1])
+            segment_seconds = FirstTime.parse_many(strings=['0:{}'.format(pace_str) for pace_str in items[1:]])
+            for index, seconds in enumerate(segment_seconds):
+                ref_segment = segments[index]
+                if ref_segment['type'] == 'DISTANCE':
+                    pace = FirstPace.from_time_distance(time=FirstTime(seconds=seconds),
+                                                        distance=FirstDistance.from_string(ref_segment['distance']),
+                                                        unit=distance_unit)
+                    row.append(int(pace.time.total_seconds()))
+                elif ref_segment['type'] == 'PACE':
+                    row.append(seconds)  # already per pace unit
+                else:
+                    raise ValueError('Duration segments have already a reference pace')
+            pace_rows.append(row)
+
+        if not lazy:
+            compiled = FirstInstructionCompiler(segments=segments).compile_plans(
+                plans=[(plan['name'], plan['instructions']) for plan in plans])
+            for plan, workouts in zip(plans, compiled):
+                plan['compiled'] = workouts
+
+        return cls(name=data_dict['name'], note=data_dict['note'], races=races, race_seconds=race_seconds,
+                   reference_race=json_segments['reference_race'], pace_unit=pace_unit, segments=segments,
+                   pace_seconds=numpy.array(pace_rows, dtype=numpy.int32), plans=plans)
+
+    @classmethod
+    def from_json(cls, json_path: str, lazy: bool = False):
+
+        """
+        Compile a json database file
+
+        :param json_path: the json database path
+        :type json_path: str
+        :param lazy: compile each plan only when it is first asked for - the json is still parsed in full
+        :type lazy: bool
+        :return: instance of FirstSnapshot
+        :rtype: FirstSnapshot
+        """
+        with open(json_path, 'rb') as fd:
+            raw = fd.read()
+
+        snapshot = cls.from_json_bytes(raw=raw, lazy=lazy)
+        snapshot.source = cls.source_stamp(stat=os.stat(json_path), sha1=hashlib.sha1(raw).hexdigest())
+
+        return snapshot
+
+    @classmethod
+    def cached(cls, json_path: str, snapshot_path: str = None, lazy: bool = False):
+
+        """
+        Load the snapshot of a json database. The snapshot is rebuilt and saved if it is missing
+        or if it doesn't match the json source (mtime and size, then content hash)
+
+        :param json_path: the json database path
+        :type json_path: str
+        :param snapshot_path: where to keep the snapshot. Default is next to the json file
+        :type snapshot_path: str
+        :param lazy: don't decode the plan instructions when the snapshot is valid
+        :type lazy: bool
+        :return: instance of FirstSnapshot
+        :rtype: FirstSnapshot
+        """
+        stat = os.stat(json_path)  # fail early for a missing source
+        if snapshot_path is None:
+            snapshot_path = cls.path_for(json_path=json_path)
+
+        try:
+            snapshot = cls.load(path=snapshot_path, lazy=lazy)
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+            snapshot = None  # missing or corrupted - rebuild
+
+        if snapshot is not None and snapshot.source is not None and \
+                snapshot.source['mtime_ns'] == stat.st_mtime_ns and snapshot.source['size'] == stat.st_size:
+            return snapshot
+
+        with open(json_path, 'rb') as fd:
+            raw = fd.read()
+        sha1 = hashlib.sha1(raw).hexdigest()
+
+        if snapshot is None or snapshot.source is None or snapshot.source['sha1'] != sha1:
+            snapshot = cls.from_json_bytes(raw=raw)
+        snapshot.source = cls.source_stamp(stat=stat, sha1=sha1)  # also refresh a touched but unchanged source
+
+        try:
+            snapshot.save(path=snapshot_path)
+        except OSError:
+            pass  # a read-only database directory just means no caching
+
+        return snapshot
+
+    def plan_instructions(self, index: int) -> Tuple[List[str], List[CompiledWorkout]]:
+
+        """
+        The instructions and compiled workouts of a plan. A lazy snapshot decodes or compiles the plan the first time
+        it is asked for - from its own buffer, never from the json source
+
+        :param index: plan index
+        :type index: int
+        :return: (instructions, compiled workouts)
+        :rtype: tuple[list[str], list[CompiledWorkout]]
+        """
+        plan = self.plans[index]
+        if 'compiled' not in plan:
+            if 'instructions' in plan:
+                compiled = FirstInstructionCompiler(segments=self.segments).compile_plan(
+                    name=plan['name'], instructions=plan['instructions'])
+                plan['compiled'] = compiled
+            else:
+                offset, length = self.plan_spans[index]
+                instructions, compiled = pickle.loads(self.buffer[offset:offset + length])
+                plan['instructions'] = instructions
+                plan['compiled'] = compiled
+
+        return plan['instructions'], plan['compiled']
+
+    def __arrays(self) -> Dict[str, numpy.ndarray]:
+
+        return {'race_seconds': self.race_seconds, 'pace_seconds': self.pace_seconds}
+
+    def to_bytes(self) -> bytes:
+
+        """
+        Serialize the snapshot to the file layout
+
+        :return: the snapshot file content
+        :rtype: bytes
+        """
+        arrays = {key: numpy.ascontiguousarray(value) for key, value in self.__arrays().items()}
+        plans_bytes = [pickle.dumps(self.plan_instructions(index=index), protocol=pickle.HIGHEST_PROTOCOL)
+                       for index in range(len(self.plans))]
+        header = {'name': self.name, 'note': self.note, 'races': self.races, 'reference_race': self.reference_race,
+                  'pace_unit': self.pace_unit, 'segments': self.segments, 'source': self.source,
+                  'plans': [{'name': plan['name'], 'race_name': plan['race_name'], 'offset': 2 ** 62,
+                             'length': len(plan_bytes)} for plan, plan_bytes in zip(self.plans, plans_bytes)],
+                  'arrays': {}}
+
+        # array offsets depend on the header size which depends on the offsets - reserve fixed width offsets
+        for key, value in arrays.items():
+            header['arrays'][key] = {'dtype': value.dtype.str, 'shape': value.shape, 'offset': 2 ** 62}
+        header_size = len(pickle.dumps(header, protocol=pickle.HIGHEST_PROTOCOL))
+        offset = self.__align(len(self.MAGIC) + self.PREAMBLE.size + header_size)
+        for key, value in arrays.items():
+            header['arrays'][key]['offset'] = offset
+            offset = self.__align(offset + value.nbytes)
+        for plan in header['plans']:
+            plan['offset'] = offset
+            offset += plan['length']
+        header_bytes = pickle.dumps(header, protocol=pickle.HIGHEST_PROTOCOL)
+
+        content = bytearray(self.MAGIC)
+        content += self.PREAMBLE.pack(self.VERSION, len(header_bytes))
+        content += header_bytes
+        for key, value in arrays.items():
+            content += b'\x00' * (header['arrays'][key]['offset'] - len(content))
+            content += value.tobytes()
+        for plan, plan_bytes in zip(header['plans'], plans_bytes):
+            content += b'\x00' * (plan['offset'] - len(content))
+            content += plan_bytes
+
+        return bytes(content)
+
+    def save(self, path: str) -> None:
+
+        """
+        Write the snapshot. The file is replaced atomically so concurrent readers never see a partial file
+
+        :param path: snapshot path
+        :type path: str
+        """
+        content = self.to_bytes()
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            with open(tmp_path, 'wb') as fd:
+                fd.write(content)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def publish(self, name: str = None) -> FirstSharedBlock:
+
+        """
+        Copy the snapshot into a new shared memory block that other processes can attach to.
+        The caller owns the block - close and unlink it when the workers are done
+
+        :param name: the block name. Default is a generated unique name
+        :type name: str
+        :return: the shared memory block
+        :rtype: FirstSharedBlock
+        """
+        content = self.to_bytes()
+        block = FirstSharedBlock(name=name, create=True, size=len(content))
+        block.buf[:len(content)] = content
+
+        return block
+
+    @classmethod
+    def __align(cls, offset: int) -> int:
+
+        return (offset + cls.ALIGNMENT - 1) // cls.ALIGNMENT * cls.ALIGNMENT
+
+    @classmethod
+    def load(cls, path: str, lazy: bool = False, mapped: bool = False):
+
+        """
+        Read a snapshot file
+
+        :param path: snapshot path
+        :type path: str
+        :param lazy: don't decode the plan instructions
+        :type lazy: bool
+        :param mapped: memory-map the file instead of reading it. The arrays are read-only views of the mapping,
+                       so processes that map the same file share one copy of the tables
+        :type mapped: bool
+        :return: instance of FirstSnapshot
+        :rtype: FirstSnapshot
+        """
+        with open(path, 'rb') as fd:
+            if mapped:
+                buffer = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                buffer = fd.read()
+
+        return cls.from_buffer(buffer=buffer, lazy=lazy)
+
+    @classmethod
+    def attach(cls, name: str, lazy: bool = False):
+
+        """
+        Attach to a snapshot published to shared memory (see publish). Nothing is copied - the arrays are
+        read-only views of the block, which stays open as long as the snapshot is referenced
+
+        :param name: the block name
+        :type name: str
+        :param lazy: don't decode the plan instructions
+        :type lazy: bool
+        :return: instance of FirstSnapshot
+        :rtype: FirstSnapshot
+        """
+        if sys.version_info >= (3, 13):
+            block = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            block = shared_memory.SharedMemory(name=name)
+            if os.name == 'posix':  # only the publisher may unlink the block when this process exits
+                resource_tracker.unregister(block._name, 'shared_memory')
+        snapshot = cls.from_buffer(buffer=block.buf, lazy=lazy)
+        snapshot.block = block
+
+        return snapshot
+
+    @classmethod
+    def from_buffer(cls, buffer, lazy: bool = False):
+
+        """
+        Decode a snapshot from its file content. The arrays are not copied
+
+        :param buffer: the snapshot file content - bytes, mmap or memoryview
+        :param lazy: don't decode the plan instructions
+        :type lazy: bool
+        :return: instance of FirstSnapshot
+        :rtype: FirstSnapshot
+        """
+        header = cls.read_header(buffer=buffer)
+        arrays = {}
+        for key, spec in header['arrays'].items():
+            dtype = numpy.dtype(spec['dtype'])
+            count = int(numpy.prod(spec['shape']))
+            arrays[key] = numpy.frombuffer(buffer, dtype=dtype, count=count, offset=spec['offset']).reshape(
+                spec['shape'])
+            arrays[key].flags.writeable = False
+
+        snapshot = cls(name=header['name'], note=header['note'], races=header['races'],
+                       race_seconds=arrays['race_seconds'], reference_race=header['reference_race'],
+                       pace_unit=header['pace_unit'], segments=header['segments'],
+                       pace_seconds=arrays['pace_seconds'],
+                       plans=[{'name': plan['name'], 'race_name': plan['race_name']} for plan in header['plans']],
+                       source=header['source'], buffer=buffer,
+                       plan_spans=[(plan['offset'], plan['length']) for plan in header['plans']])
+        if not lazy:
+            for index in range(len(snapshot.plans)):
+                snapshot.plan_instructions(index=index)
+
+        return snapshot
+
+    @classmethod
+    def read_header(cls, buffer) -> Dict:
+
+        """
+        Validate the snapshot preamble and decode the header
+
+        :param buffer: the snapshot file content
+        :type buffer: bytes
+        :return: the header
+        :rtype: dict
+        """
+        start = len(cls.MAGIC)
+        if bytes(buffer[:start]) != cls.MAGIC:
+            raise ValueError('Not a FIRST database snapshot')
+        version, header_size = cls.PREAMBLE.unpack_from(buffer, start)
+        if version != cls.VERSION:
+            raise ValueError('Snapshot version {} is not supported'.format(version))
+        start += cls.PREAMBLE.size
+
+        return pickle.loads(bytes(buffer[start:start + header_size]))
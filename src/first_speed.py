@@ -0,0 +1,268 @@
+import weakref
+from typing import Dict, Union, TYPE_CHECKING
+
+import numpy
+
+from first_distance import FirstDistance
+from first_format import cached_format, register_format
+from first_pace import FirstPace
+from first_time import FirstTime
+
+if TYPE_CHECKING:
+    from first_arrays import UnitConversions
+
+
+class FirstSpeed(object):
+
+    """Immutable speed target, an alternative to FirstPace in steps. Equal values share one instance while it is
+    referenced (see __new__). The canonical value is seconds_per_meter, the same as FirstPace"""
+
+    __slots__ = ('speed', 'length_unit', 'time_unit', 'seconds_per_meter', '__weakref__')
+    __interned = weakref.WeakValueDictionary()
+
+    def __new__(cls, speed: float, length_unit: str = 'mile', time_unit: str = 'hour'):
+
+        """
+        Constructor
+
+        :param speed: positive speed value
+        :type speed: float
+        :param length_unit:
+        :type length_unit: str
+        :param time_unit: second, minute or hour
+        :type time_unit: str
+        :return: instance of FirstSpeed
+        :rtype: FirstSpeed
+        """
+        key = (cls, speed, length_unit, time_unit)
+        instance = cls.__interned.get(key)
+        if instance is not None:
+            return instance
+
+        if speed <= 0:
+            raise ValueError('{} is not a positive number'.format(speed))
+        if not FirstDistance.is_valid_unit(unit=length_unit):
+            raise ValueError('"{}" is not a valid length unit'.format(length_unit))
+        if not FirstTime.units.is_valid(name=time_unit):
+            raise ValueError('"{}" is not a valid time unit'.format(time_unit))
+
+        instance = super().__new__(cls)
+        object.__setattr__(instance, 'speed', speed)
+        object.__setattr__(instance, 'length_unit', length_unit)
+        object.__setattr__(instance, 'time_unit', time_unit)
+        object.__setattr__(instance, 'seconds_per_meter',
+                           FirstTime.units.sizes[time_unit] / (speed * FirstDistance.units.sizes[length_unit]))
+        cls.__interned[key] = instance
+
+        return instance
+
+    def __setattr__(self, key, value):
+
+        raise AttributeError('FirstSpeed is immutable')
+
+    def __reduce__(self):
+
+        return self.__class__, (self.speed, self.length_unit, self.time_unit)
+
+    def __eq__(self, other) -> bool:
+
+        return isinstance(other, FirstSpeed) and self.speed == other.speed and \
+            self.length_unit == other.length_unit and self.time_unit == other.time_unit
+
+    def __hash__(self) -> int:
+
+        return hash((self.speed, self.length_unit, self.time_unit))
+
+    def __str__(self):
+
+        return cached_format('speed_html', self, None)
+
+    @classmethod
+    def from_string(cls, string: str):
+
+        """
+        Instantiate FirstSpeed from a string input
+
+        :param string: format - 'value length_unit per time_unit' like '12.5 km per hour'
+        :type string: str
+        :return: instance of FirstSpeed
+        :rtype: FirstSpeed
+        """
+        tokens = string.split()
+        if len(tokens) != 4 or tokens[2] != 'per':
+            raise ValueError('expected "value length_unit per time_unit" but got "{}"'.format(string))
+
+        try:
+            value = float(tokens[0])
+        except ValueError as ex:
+            raise ValueError('first token is expected to be a number but {}'.format(str(ex)))
+
+        return cls(speed=value, length_unit=tokens[1], time_unit=tokens[3])
+
+    @classmethod
+    def from_pace(cls, pace: FirstPace, time_unit: str = 'hour'):
+
+        """
+        The speed of a pace, in the pace length unit
+
+        :param pace: the pace
+        :type pace: FirstPace
+        :param time_unit: second, minute or hour
+        :type time_unit: str
+        :return: instance of FirstSpeed
+        :rtype: FirstSpeed
+        """
+        return cls(speed=pace.speed(length_unit=pace.length_unit, time_unit=time_unit), length_unit=pace.length_unit,
+                   time_unit=time_unit)
+
+    def to_pace(self, length_unit: Union[str, None] = None) -> FirstPace:
+
+        """
+        The pace of this speed, rounded to the second
+
+        :param length_unit: length unit of the pace, the speed length unit by default
+        :type length_unit: str
+        :return: the pace
+        :rtype: FirstPace
+        """
+        if length_unit is None:
+            length_unit = self.length_unit
+
+        return FirstPace(seconds=round(self.seconds_per_unit(unit=length_unit)), length_unit=length_unit)
+
+    def convert_to(self, length_unit: str, time_unit: Union[str, None] = None) -> float:
+
+        """
+        The speed in other units
+
+        :param length_unit: length unit
+        :type length_unit: str
+        :param time_unit: time unit, the speed time unit by default
+        :type time_unit: str
+        :return: length units per time unit
+        :rtype: float
+        """
+        if time_unit is None:
+            time_unit = self.time_unit
+        FirstDistance.units.unit_id(name=length_unit)  # validate
+        FirstTime.units.unit_id(name=time_unit)
+
+        return FirstTime.units.sizes[time_unit] / (self.seconds_per_meter * FirstDistance.units.sizes[length_unit])
+
+    def seconds_per_unit(self, unit: str) -> float:
+
+        """
+        The pace of this speed per a length unit - not rounded
+
+        :param unit: length unit
+        :type unit: str
+        :return: seconds per unit
+        :rtype: float
+        """
+        FirstDistance.units.unit_id(name=unit)  # validate
+        return self.seconds_per_meter * FirstDistance.units.sizes[unit]
+
+    def to_json(self, output_unit: Union[str, None] = None, conversions: 'UnitConversions' = None) -> Dict:
+
+        length_unit = output_unit if output_unit else self.length_unit
+        if conversions is None or length_unit == self.length_unit:
+            value = self.convert_to(length_unit=length_unit)
+        else:
+            value = FirstTime.units.sizes[self.time_unit] / conversions.seconds_per_unit(pace=self, unit=length_unit)
+        return {'speed': cached_format('speed_html', self, output_unit), 'length_unit': length_unit,
+                'time_unit': self.time_unit, 'value': value}
+
+    def to_html(self, output_unit: Union[str, None] = None) -> str:
+
+        return cached_format('speed_html', self, output_unit)
+
+    def _render_html(self, output_unit: Union[str, None]) -> str:
+
+        if output_unit and output_unit != self.length_unit:
+            return '{0:.3f} {1:s} per {2:s}'.format(self.convert_to(length_unit=output_unit), output_unit,
+                                                     self.time_unit)
+        else:
+            return '{0:.3f} {1:s} per {2:s}'.format(self.speed, self.length_unit, self.time_unit)
+
+    def time_for(self, distance: float, distance_unit: str, unit: str) -> float:
+
+        """
+        How much time will take to run a distance with this speed. The time is rounded to the second before the unit
+        conversion, like FirstPace.time_for
+
+        :param distance: the distance value
+        :type distance: float
+        :param distance_unit: length unit of the distance
+        :type distance_unit: str
+        :param unit: the desired unit of the result
+        :type unit: str
+        :return: the time value for this unit
+        :rtype: float
+        """
+        meters = FirstDistance.units.converter(from_unit=distance_unit, to_unit='m')(distance)
+        return FirstTime.units.converter(from_unit='second', to_unit=unit)(round(meters * self.seconds_per_meter))
+
+    def times_for(self, distances: numpy.ndarray, distance_unit: str, unit: str) -> numpy.ndarray:
+
+        """
+        time_for for an array of distance values
+
+        :param distances: the distance values
+        :type distances: numpy.ndarray
+        :param distance_unit: length unit of the distances
+        :type distance_unit: str
+        :param unit: the desired unit of the results
+        :type unit: str
+        :return: the time values for this unit
+        :rtype: numpy.ndarray
+        """
+        # the same converters and the same order of operations as time_for so the results are identical
+        meters = FirstDistance.units.converter(from_unit=distance_unit, to_unit='m')(
+            numpy.asarray(distances, dtype=numpy.float64))
+        return FirstTime.units.converter(from_unit='second', to_unit=unit)(numpy.rint(meters * self.seconds_per_meter))
+
+    def distance_for(self, seconds: float, unit: str) -> float:
+
+        """
+        How far you run a duration with this speed
+
+        :param seconds: the duration
+        :type seconds: float
+        :param unit: the desired unit of the result
+        :type unit: str
+        :return: the distance value for this unit
+        :rtype: float
+        """
+        return FirstDistance.units.converter(from_unit='m', to_unit=unit)(seconds / self.seconds_per_meter)
+
+    def distances_for(self, seconds: numpy.ndarray, unit: str) -> numpy.ndarray:
+
+        """
+        distance_for for an array of durations
+
+        :param seconds: the durations in seconds
+        :type seconds: numpy.ndarray
+        :param unit: the desired unit of the results
+        :type unit: str
+        :return: the distance values for this unit
+        :rtype: numpy.ndarray
+        """
+        return FirstDistance.units.converter(from_unit='m', to_unit=unit)(
+            numpy.asarray(seconds, dtype=numpy.float64) / self.seconds_per_meter)
+
+    def meters_per_second_delta(self, delta_in_seconds: int) -> float:
+
+        """
+        Convert to speed in m/s for tcx with a tolerance in seconds per length unit, like the FirstPace method
+
+        :param delta_in_seconds:
+        :type delta_in_seconds: int
+        :return: calculated speed in m/s
+        :rtype: float
+        """
+        meters = FirstDistance.units.sizes[self.length_unit]
+
+        return meters / (self.seconds_per_meter * meters + delta_in_seconds)
+
+
+register_format(kind='speed_html', render=FirstSpeed._render_html)
@@ -0,0 +1,372 @@
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, List
+from urllib.request import pathname2url
+
+import numpy
+
+from first_data import FirstRaceRegistry, FirstSegment, PlanInstructions
+from first_distance import FirstDistance
+from first_instructions import FirstInstructionCompiler
+from first_pace import FirstPace
+from first_race import FirstRaceType
+from first_snapshot import FirstSnapshot
+from first_time import FirstTime
+
+SCHEMA = '''
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE races (race_index INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, distance TEXT NOT NULL);
+CREATE TABLE equivalent_times (race_index INTEGER NOT NULL, row_index INTEGER NOT NULL, seconds INTEGER NOT NULL,
+                               PRIMARY KEY (race_index, row_index)) WITHOUT ROWID;
+CREATE INDEX equivalent_times_by_seconds ON equivalent_times (race_index, seconds);
+CREATE TABLE segments (segment_index INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, type TEXT NOT NULL,
+                       distance TEXT, seconds INTEGER, ref_pace_name TEXT, pace_column INTEGER NOT NULL);
+CREATE TABLE paces (pace_column INTEGER NOT NULL, row_index INTEGER NOT NULL, seconds INTEGER NOT NULL,
+                    PRIMARY KEY (pace_column, row_index)) WITHOUT ROWID;
+CREATE INDEX paces_by_seconds ON paces (pace_column, seconds);
+CREATE TABLE plans (plan_index INTEGER PRIMARY KEY, name TEXT NOT NULL, race_name TEXT NOT NULL);
+CREATE TABLE plan_instructions (plan_index INTEGER NOT NULL, line_index INTEGER NOT NULL, instruction TEXT NOT NULL,
+                                PRIMARY KEY (plan_index, line_index)) WITHOUT ROWID;
+'''
+
+
+class FirstSqlitePlanInstructions(object):
+
+    """Sequence of PlanInstructions read from the database the first time each plan is accessed"""
+
+    def __init__(self, connection: Callable[[], sqlite3.Connection], plans: List[Dict],
+                 compiler: FirstInstructionCompiler):
+
+        """
+        Constructor
+
+        :param connection: returns the database connection of the calling thread
+        :type connection: callable
+        :param plans: list of {'name', 'race_name'} ordered by plan index
+        :type plans: list[dict]
+        :param compiler: compiles each plan when it is read
+        :type compiler: FirstInstructionCompiler
+        :return: instance of FirstSqlitePlanInstructions
+        :rtype: FirstSqlitePlanInstructions
+        """
+        self.connection = connection
+        self.plans = plans
+        self.compiler = compiler
+        self.__loaded = {}
+
+    def __len__(self) -> int:
+
+        return len(self.plans)
+
+    def __getitem__(self, index: int) -> PlanInstructions:
+
+        if index < 0:
+            index += len(self.plans)
+        if index < 0 or index >= len(self.plans):
+            raise IndexError('plan index out of range')
+
+        plan_instructions = self.__loaded.get(index)
+        if plan_instructions is None:
+            rows = self.connection().execute('SELECT instruction FROM plan_instructions WHERE plan_index = ? '
+                                           'ORDER BY line_index', (index,)).fetchall()
+            instructions = [row[0] for row in rows]
+            plan_instructions = PlanInstructions(name=self.plans[index]['name'],
+                                                 race_name=self.plans[index]['race_name'],
+                                                 instructions=instructions,
+                                                 compiled=self.compiler.compile_plan(name=self.plans[index]['name'],
+                                                                                     instructions=instructions))
+            self.__loaded[index] = plan_instructions
+
+        return plan_instructions
+
+    def __iter__(self):
+
+        for index in range(len(self.plans)):
+            yield self[index]
+
+
+class FirstSqliteData(FirstRaceRegistry):
+
+    """FIRST database backed by an indexed SQLite file.
+    Race types, segments and plan names are read when the database is opened. Equivalent times, paces
+    and plan instructions stay on disk and are looked up with indexed queries, so many processes can share
+    one database file. Exposes the lookup interface of FirstData used to generate plans.
+    Like FirstData an instance can be shared by threads - each thread queries with its own read-only connection"""
+
+    def __init__(self, db_path: str, race_type_aliases: Dict[str, str] = None):
+
+        """
+        Constructor
+
+        :param db_path: the SQLite database path - see import_json
+        :type db_path: str
+        :param race_type_aliases: alias to race type name. Default is Config.RACE_TYPE_ALIASES
+        :type race_type_aliases: dict[str, str]
+        :return: instance of FirstSqliteData
+        :rtype: FirstSqliteData
+        """
+        if not os.path.isfile(db_path):
+            raise IOError('{} is not a database file'.format(db_path))
+        self.db_path = db_path
+        self.__uri = 'file:{}?mode=ro'.format(pathname2url(os.path.abspath(db_path)))
+        self.__local = threading.local()
+        self.__connections = []
+        self.__connections_lock = threading.Lock()
+
+        meta = dict(self.connection.execute('SELECT key, value FROM meta'))
+        self.name = meta['name']
+        self.note = meta['note']
+        self.reference_race = meta['reference_race']
+        self.pace_unit = meta['pace_unit']
+        self.length_unit = self.pace_unit.split()[-1]
+
+        self.race_types = [FirstRaceType(name=name, distance=FirstDistance.from_string(distance))
+                           for name, distance in self.connection.execute('SELECT name, distance FROM races '
+                                                                         'ORDER BY race_index')]
+        self.__race_bounds = {race_index: (low, high) for race_index, low, high in self.connection.execute(
+            'SELECT race_index, MIN(seconds), MAX(seconds) FROM equivalent_times GROUP BY race_index')}
+
+        self.segments = []
+        self.segments_lookup = {}
+        self.pace_columns = {}
+        segment_types = []
+        for index, name, type_str, distance, seconds, ref_pace_name, pace_column in self.connection.execute(
+                'SELECT segment_index, name, type, distance, seconds, ref_pace_name, pace_column FROM segments '
+                'ORDER BY segment_index'):
+            if type_str == 'DISTANCE':
+                self.segments.append(FirstSegment(name=name, distance=FirstDistance.from_string(distance)))
+            elif type_str == 'TIME':
+                self.segments.append(FirstSegment(name=name, duration=FirstTime(seconds=seconds),
+                                                  ref_pace_name=ref_pace_name))
+            else:  # PACE
+                self.segments.append(FirstSegment(name=name, ref_pace_name=ref_pace_name))
+            self.segments_lookup[name] = index
+            self.pace_columns[name] = pace_column
+            segment_types.append({'name': name, 'type': type_str, 'distance': distance, 'time': seconds,
+                                  'ref_pace_name': ref_pace_name})
+        self.instruction_compiler = FirstInstructionCompiler(segments=segment_types)
+
+        plans = [{'name': name, 'race_name': race_name} for name, race_name in self.connection.execute(
+            'SELECT name, race_name FROM plans ORDER BY plan_index')]
+        self.build_race_type_registry(reference_race=self.reference_race,
+                                      plan_race_names=[plan['race_name'] for plan in plans],
+                                      aliases=race_type_aliases)
+        self.plan_instructions = FirstSqlitePlanInstructions(connection=lambda: self.connection, plans=plans,
+                                                             compiler=self.instruction_compiler)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+
+        """
+        The read-only database connection of the calling thread, opened on first use
+
+        :return: the connection
+        :rtype: sqlite3.Connection
+        """
+        connection = getattr(self.__local, 'connection', None)
+        if connection is None:
+            # used only by this thread - check_same_thread is off so that close() can close it
+            connection = sqlite3.connect(self.__uri, uri=True, check_same_thread=False)
+            self.__local.connection = connection
+            with self.__connections_lock:
+                self.__connections.append(connection)
+
+        return connection
+
+    @classmethod
+    def import_json(cls, json_path: str, db_path: str) -> None:
+
+        """
+        Create the SQLite database from a json database. An existing database file is replaced atomically
+
+        :param json_path: the json database path
+        :type json_path: str
+        :param db_path: the SQLite database path
+        :type db_path: str
+        """
+        snapshot = FirstSnapshot.from_json(json_path=json_path)
+        segments_lookup = {segment['name']: index for index, segment in enumerate(snapshot.segments)}
+
+        tmp_path = '{}.{}.tmp'.format(db_path, os.getpid())
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            connection = sqlite3.connect(tmp_path)
+            with connection:
+                connection.executescript(SCHEMA)
+                connection.executemany('INSERT INTO meta VALUES (?, ?)',
+                                       [('name', snapshot.name), ('note', snapshot.note),
+                                        ('reference_race', snapshot.reference_race),
+                                        ('pace_unit', snapshot.pace_unit)])
+                connection.executemany('INSERT INTO races VALUES (?, ?, ?)',
+                                       [(index, race['name'], race['distance'])
+                                        for index, race in enumerate(snapshot.races)])
+                connection.executemany('INSERT INTO equivalent_times VALUES (?, ?, ?)',
+                                       [(race_index, row_index, seconds)
+                                        for row_index, row in enumerate(snapshot.race_seconds.tolist())
+                                        for race_index, seconds in enumerate(row)])
+                connection.executemany('INSERT INTO segments VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                       [(index, segment['name'], segment['type'], segment['distance'],
+                                         segment['time'], segment['ref_pace_name'],
+                                         segments_lookup[segment['ref_pace_name'] or segment['name']] + 1)
+                                        for index, segment in enumerate(snapshot.segments)])
+                connection.executemany('INSERT INTO paces VALUES (?, ?, ?)',
+                                       [(column, row_index, seconds)
+                                        for row_index, row in enumerate(snapshot.pace_seconds.tolist())
+                                        for column, seconds in enumerate(row)])
+                connection.executemany('INSERT INTO plans VALUES (?, ?, ?)',
+                                       [(index, plan['name'], plan['race_name'])
+                                        for index, plan in enumerate(snapshot.plans)])
+                connection.executemany('INSERT INTO plan_instructions VALUES (?, ?, ?)',
+                                       [(index, line_index, line)
+                                        for index, plan in enumerate(snapshot.plans)
+                                        for line_index, line in enumerate(plan['instructions'])])
+            connection.execute('ANALYZE')
+            connection.close()
+            os.replace(tmp_path, db_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def close(self) -> None:
+
+        """
+        Close the database connections of all the threads
+        """
+        with self.__connections_lock:
+            for connection in self.__connections:
+                connection.close()
+            self.__connections = []
+        self.__local = threading.local()
+
+    def __str__(self) -> str:
+
+        return self.name
+
+    def equivalent_time_index(self, time_from: FirstTime, race_index_from: int) -> int:
+
+        """
+        Indexed query for the row of a race time in the equivalent times table
+
+        :param time_from: race time
+        :type time_from: FirstTime
+        :param race_index_from: race index
+        :type race_index_from: int
+        :return: the first row with a time equal to or longer than time_from
+        :rtype: int
+        """
+        self.check_race_index(race_index=race_index_from)
+        seconds = time_from.total_seconds()
+        if seconds < self.__race_bounds[race_index_from][0] - self.LOW_TIME_MARGIN:
+            raise ValueError('Time is shorter than the lowest database time')
+
+        row = self.connection.execute('SELECT row_index FROM equivalent_times WHERE race_index = ? AND seconds >= ? '
+                                      'ORDER BY seconds, row_index LIMIT 1', (race_index_from, seconds)).fetchone()
+        if row is None:
+            raise ValueError('Time is longer than the highest database time')
+
+        return row[0]
+
+    def equivalent_time(self, time_from: FirstTime, race_index_from: int, race_index_to: int) -> FirstTime:
+
+        """
+        Find equivalent time for another race. E.G. if you ran 5K in 0:20:13, set your half marathon target
+        time to 1:34:15.
+
+        :param time_from:
+        :type time_from: FirstTime
+        :param race_index_from:
+        :type race_index_from: int
+        :param race_index_to:
+        :type race_index_to: int
+        :return: equivalent time
+        :rtype: FirstTime
+        """
+        self.check_race_index(race_index=race_index_from)
+        self.check_race_index(race_index=race_index_to)
+        row_index = self.equivalent_time_index(time_from=time_from, race_index_from=race_index_from)
+        row = self.connection.execute('SELECT seconds FROM equivalent_times WHERE race_index = ? AND row_index = ?',
+                                      (race_index_to, row_index)).fetchone()
+
+        return FirstTime(seconds=row[0])
+
+    def segment_index_by_name(self, name: str) -> int:
+
+        """
+        Performance method - return the segment index in the pace table
+
+        :param name: segment name as appears in the instructions
+        :type name: str
+        :return: the index
+        :rtype int
+        """
+        return self.segments_lookup[name]
+
+    def segment_by_name(self, name: str) -> FirstSegment:
+
+        """
+        Performance method - return the segment definition
+
+        :param name: segment name as appears in the instructions
+        :type name: str
+        :return: the segment definition
+        :rtype: FirstSegment
+        """
+        return self.segments[self.segment_index_by_name(name=name)]
+
+    def pace_column(self, name: str) -> numpy.ndarray:
+
+        """
+        The paces of a segment for all rows
+
+        :param name: segment name as appears in the instructions
+        :type name: str
+        :return: seconds per pace length unit
+        :rtype: numpy.ndarray
+        """
+        rows = self.connection.execute('SELECT seconds FROM paces WHERE pace_column = ? ORDER BY row_index',
+                                       (self.pace_columns[name],)).fetchall()
+
+        return numpy.array([row[0] for row in rows], dtype=numpy.int32)
+
+    def segment_pace(self, time_index: int, name: str) -> FirstPace:
+
+        """
+        Create the pace of a segment. Segments with a reference pace get the reference pace
+
+        :param time_index: the row index in the paces table
+        :type time_index: int
+        :param name: segment name as appears in the instructions
+        :type name: str
+        :return: the pace
+        :rtype: FirstPace
+        """
+        row = self.connection.execute('SELECT seconds FROM paces WHERE pace_column = ? AND row_index = ?',
+                                      (self.pace_columns[name], time_index)).fetchone()
+        if row is None:
+            raise IndexError('pace table row out of range')
+
+        return FirstPace(seconds=row[0], length_unit=self.length_unit)
+
+    def pace_index_by_race_time(self, race_time: FirstTime, race_name: str) -> int:
+
+        """
+        Performance method - return the row index in the pace table
+
+        :param race_time: race target time
+        :type race_time: FirstTime
+        :param race_name: the race name
+        :type race_name: str
+        :return: the index based on the time
+        :rtype: int
+        """
+        ref_time = self.equivalent_time(time_from=race_time,
+                                        race_index_from=self.race_type_index_by_name(name=race_name),
+                                        race_index_to=self.reference_race_index)
+        row = self.connection.execute('SELECT row_index FROM paces WHERE pace_column = 0 AND seconds >= ? '
+                                      'ORDER BY seconds, row_index LIMIT 1', (ref_time.total_seconds(),)).fetchone()
+        if row is None:
+            raise ValueError('Row not found with given time')
+
+        return row[0]
@@ -1,34 +1,256 @@
-from typing import List, Dict, Union
+import itertools
+import weakref
+from typing import Callable, List, Dict, Tuple, Union, TYPE_CHECKING
 
 from first_data import FirstData
 from first_distance import FirstDistance
+from first_format import cached_format, register_format
+from first_instructions import CompiledStep
 from first_pace import FirstPace
+from first_speed import FirstSpeed
 from first_time import FirstTime
-from first_utils import XmlTag
+from first_utils import XmlItem, XmlTag
+
+if TYPE_CHECKING:
+    from first_arrays import UnitConversions
+
+
+class FirstStepIds(object):
+
+    """Step id allocator. Each plan owns one, so plans can be generated in parallel threads"""
+
+    def __init__(self, start: int = 0):
+
+        """
+        Constructor
+
+        :param start: the first id
+        :type start: int
+        :return: instance of FirstStepIds
+        :rtype: FirstStepIds
+        """
+        self.__counter = itertools.count(start)  # next() on a count is atomic
+
+    def next_id(self) -> int:
+
+        """
+        Allocate an id
+
+        :return: the next id
+        :rtype: int
+        """
+        return next(self.__counter)
+
+    def reset(self, start: int = 0) -> None:
+
+        """
+        Restart the counting
+
+        :param start: the first id
+        :type start: int
+        """
+        self.__counter = itertools.count(start)
+
+
+class _FrozenDict(tuple):
+
+    """Immutable form of a JSON object - ((key, frozen value), ...)"""
+
+
+class _FrozenList(tuple):
+
+    """Immutable form of a JSON array"""
+
+
+class _FrozenTag(tuple):
+
+    """Immutable form of an XmlTag - (name, attributes, single_line, mute, frozen items)"""
+
+
+def _freeze(value):
+
+    """
+    An immutable copy of a rendered fragment, for sharing in a cache
+
+    :param value: JSON value or XmlTag
+    :return: the frozen value
+    """
+    if isinstance(value, dict):
+        return _FrozenDict((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return _FrozenList(_freeze(item) for item in value)
+    if type(value) is XmlTag:
+        attributes = None if value.attributes is None else tuple(value.attributes.items())
+        return _FrozenTag((value.name, attributes, value.single_line, value.mute,
+                           tuple(_freeze(item) for item in value.items)))
+    if isinstance(value, XmlItem):
+        raise ValueError('Unexpected XML item type')
+
+    return value  # strings, numbers, bool and None are immutable
+
+
+def _thaw(frozen):
+
+    """
+    A new mutable fragment from its frozen form
+
+    :param frozen: the value from _freeze
+    :return: JSON value or XmlTag
+    """
+    if isinstance(frozen, _FrozenDict):
+        return {key: _thaw(item) for key, item in frozen}
+    if isinstance(frozen, _FrozenList):
+        return [_thaw(item) for item in frozen]
+    if isinstance(frozen, _FrozenTag):
+        name, attributes, single_line, mute, items = frozen
+        tag = XmlTag(name=name, attributes=None if attributes is None else dict(attributes), single_line=single_line,
+                     mute=mute)
+        for item in items:
+            tag.add(item=_thaw(item))
+        return tag
+
+    return frozen
+
+
+class FirstStepShape(object):
+
+    """Immutable content of a step subtree - everything but the step ids and the parent links.
+    Equal subtrees share one instance while it is referenced (hash-consing, see __new__), so the repeated fragments of
+    a plan like the warmup or 4x(800m#400 m@RI) share one shape across its workouts and across plans with the same
+    paces. The JSON and HTML fragments are cached on the shape in an immutable form, and every caller gets a new copy"""
+
+    __slots__ = ('key', 'steps', 'fragments', 'converted_fragments', '__weakref__')
+    __interned = weakref.WeakValueDictionary()
+
+    def __new__(cls, key: Tuple, steps: Tuple['FirstStepShape', ...] = ()):
+
+        """
+        Constructor - use body() and repeat()
+
+        :param key: the hashable content of the step itself
+        :type key: tuple
+        :param steps: shapes of the child steps
+        :type steps: tuple[FirstStepShape]
+        :return: the shared instance of FirstStepShape
+        :rtype: FirstStepShape
+        """
+        interned_key = (key, steps)  # children are interned so they compare by identity
+        instance = cls.__interned.get(interned_key)
+        if instance is not None:
+            return instance
+
+        instance = super().__new__(cls)
+        object.__setattr__(instance, 'key', key)
+        object.__setattr__(instance, 'steps', steps)
+        object.__setattr__(instance, 'fragments', {})
+        # UnitConversions -> fragments rendered with it, dropped with the conversions
+        object.__setattr__(instance, 'converted_fragments', weakref.WeakKeyDictionary())
+        return cls.__interned.setdefault(interned_key, instance)
+
+    def __setattr__(self, key, value):
+
+        raise AttributeError('FirstStepShape is immutable')
+
+    @classmethod
+    def body(cls, name: str, pace: Union[FirstPace, FirstSpeed], intensity: str, distance: Union[FirstDistance, None],
+             time: Union[FirstTime, None]) -> 'FirstStepShape':
+
+        """
+        The shape of a body step
+
+        :param name: step name
+        :type name: str
+        :param pace: running pace or speed target
+        :type pace: FirstPace | FirstSpeed
+        :param intensity: step intensity
+        :type intensity: str
+        :param distance: the segment distance
+        :type distance: FirstDistance
+        :param time: the segment duration
+        :type time: FirstTime
+        :return: the shared shape
+        :rtype: FirstStepShape
+        """
+        # 1 mile and 1.0 mile are equal but render differently
+        distance_type = None if distance is None else type(distance.distance)
+        return cls(key=('body', name, type(pace), pace, intensity, distance, distance_type, time))
+
+    @classmethod
+    def repeat(cls, name: str, repeat: int, steps: Tuple['FirstStepShape', ...]) -> 'FirstStepShape':
+
+        """
+        The shape of a repeat step
+
+        :param name: step name
+        :type name: str
+        :param repeat: number of repetitions of the child steps
+        :type repeat: int
+        :param steps: shapes of the child steps
+        :type steps: tuple[FirstStepShape]
+        :return: the shared shape
+        :rtype: FirstStepShape
+        """
+        return cls(key=('repeat', name, repeat), steps=steps)
+
+    def fragment(self, kind: str, output_unit: Union[str, None], render: Callable[[], object],
+                 conversions: 'UnitConversions' = None):
+
+        """
+        A rendered fragment, rendered only the first time it is asked for
+
+        :param kind: fragment kind like 'json' or 'html'
+        :type kind: str
+        :param output_unit: the unit to render to
+        :type output_unit: str
+        :param render: renders the fragment
+        :type render: callable
+        :param conversions: the conversions the fragment is rendered with - part of the cache key
+        :type conversions: UnitConversions
+        :return: a new copy of the fragment, the caller may modify it
+        """
+        if conversions is None:
+            fragments = self.fragments
+        else:
+            fragments = self.converted_fragments.get(conversions)
+            if fragments is None:
+                fragments = self.converted_fragments.setdefault(conversions, {})
+
+        key = (kind, output_unit)
+        frozen = fragments.get(key)
+        if frozen is None:
+            frozen = fragments.setdefault(key, _freeze(render()))
+
+        return _thaw(frozen)
 
 
 class FirstStepBase(object):
 
     """Base class for steps
     Manage the step name and id.
-    ids start with 0 and incremented with each new instance.
-    You should reset the global id for each plan to restart the counting"""
+    ids come from the FirstStepIds allocator passed to the constructor - FirstPlan owns one per plan.
+    Steps created without an allocator use a shared one; reset it with reset_global_id.
+    Totals are cached per units and invalidated up the parent chain when a step changes, together with the shape -
+    the id-less content shared by equal steps that caches the rendered fragments"""
 
-    __global_id = 0  # static
+    __global_ids = FirstStepIds()  # static
 
     @staticmethod
-    def reset_global_id() -> None:  # reset before each training plan
+    def reset_global_id() -> None:
 
         """
-        Reset the global id
+        Reset the shared allocator
         """
-        FirstStepBase.__global_id = 0
+        FirstStepBase.__global_ids.reset()
 
     # noinspection PyTypeChecker
-    def __init__(self, name: str):
-
-        self.step_id = FirstStepBase.__global_id
-        FirstStepBase.__global_id += 1
+    def __init__(self, name: str, step_ids: FirstStepIds = None):
+
+        if step_ids is None:
+            step_ids = FirstStepBase.__global_ids
+        self.step_id = step_ids.next_id()
+        self.parent = None
+        self.__totals = {}
+        self.__shape = None
         self.name = name
 
     def __str__(self) -> str:
@@ -39,6 +261,105 @@ class FirstStepBase(object):
 
         return '{}Step: "{}"\n'.format(indent, self.name)
 
+    @property
+    def name(self) -> str:
+
+        return self.__name
+
+    @name.setter
+    def name(self, name: str) -> None:
+
+        self.__name = name
+        self.invalidate_totals()
+
+    @property
+    def shape(self) -> FirstStepShape:
+
+        """
+        The shared content of this step and its children, cached until the step changes
+
+        :return: the shape
+        :rtype: FirstStepShape
+        """
+        if self.__shape is None:
+            self.__shape = self.compute_shape()
+
+        return self.__shape
+
+    def compute_shape(self) -> FirstStepShape:
+
+        """
+        Find the shape without the cache - implemented by the derived classes
+
+        :return: the shape
+        :rtype: FirstStepShape
+        """
+        raise NotImplementedError
+
+    def invalidate_totals(self) -> None:
+
+        """
+        Forget the cached totals and shape of this step and the steps that contain it
+        """
+        step = self
+        while step is not None:
+            step.__totals.clear()
+            step.__shape = None
+            step = step.parent
+
+    def totals(self, distance_unit: str = 'm', time_unit: str = 'second') -> Tuple[float, float]:
+
+        """
+        Total distance and duration of the step in one pass, cached per units
+
+        :param distance_unit: length unit
+        :type distance_unit: str
+        :param time_unit: duration unit
+        :type time_unit: str
+        :return: (distance, duration)
+        :rtype: tuple[float, float]
+        """
+        key = (distance_unit, time_unit)
+        totals = self.__totals.get(key)
+        if totals is None:
+            totals = self.compute_totals(distance_unit=distance_unit, time_unit=time_unit)
+            self.__totals[key] = totals
+
+        return totals
+
+    def compute_totals(self, distance_unit: str, time_unit: str) -> Tuple[float, float]:
+
+        """
+        Calculate the totals without the cache - implemented by the derived classes
+
+        :param distance_unit: length unit
+        :type distance_unit: str
+        :param time_unit: duration unit
+        :type time_unit: str
+        :return: (distance, duration)
+        :rtype: tuple[float, float]
+        """
+        raise NotImplementedError
+
+    def total(self, what: str = 'distance', unit: str = 'm') -> float:
+
+        """
+        Calculate the total distance or time for this step
+
+        :param what: distance or time
+        :type what: str
+        :param unit:
+        :type unit: str
+        :return: total distance value
+        :rtype: float
+        """
+        if what == 'distance':
+            return self.totals(distance_unit=unit)[0]
+        elif what == 'time':
+            return self.totals(time_unit=unit)[1]
+        else:
+            raise ValueError('what must be "distance" or "time"')
+
     def tcx_top(self, child: bool, step_type: str) -> XmlTag:
 
         level = 'Child' if child else 'Step'
@@ -57,7 +378,7 @@ class FirstStepBase(object):
 class FirstStepRepeat(FirstStepBase):
 
     # noinspection PyTypeChecker
-    def __init__(self, name: str, repeat: int = 1):
+    def __init__(self, name: str, repeat: int = 1, step_ids: FirstStepIds = None):
 
         """
         Constructor
@@ -66,16 +387,42 @@ class FirstStepRepeat(FirstStepBase):
         :type name: str
         :param repeat: number of repetitions of the child steps
         :type repeat: int
+        :param step_ids: id allocator, the shared one by default
+        :type step_ids: FirstStepIds
         :return: instance of FirstStepRepeat
         :rtype: FirstStepRepeat
         """
         if repeat < 1:
             raise ValueError('repeat must be greater than 0')
 
-        FirstStepBase.__init__(self, name=name)
+        FirstStepBase.__init__(self, name=name, step_ids=step_ids)
+
+        self.__repeat = repeat
+        self.__steps = ()
 
-        self.repeat = repeat
-        self.steps = []
+    @property
+    def steps(self) -> Tuple[FirstStepBase, ...]:
+
+        """
+        The child steps - read-only, change them with add_step, remove_step and set_steps so the totals stay right
+
+        :return: the child steps
+        :rtype: tuple[FirstStepBase]
+        """
+        return self.__steps
+
+    @property
+    def repeat(self) -> int:
+
+        return self.__repeat
+
+    @repeat.setter
+    def repeat(self, repeat: int) -> None:
+
+        if repeat < 1:
+            raise ValueError('repeat must be greater than 0')
+        self.__repeat = repeat
+        self.invalidate_totals()
 
     @staticmethod
     def __get_type() -> str:
@@ -104,16 +451,26 @@ class FirstStepRepeat(FirstStepBase):
 
         return out_string
 
-    def to_json(self, output_unit: Union[str, None] = None) -> Dict:
+    def to_json(self, output_unit: Union[str, None] = None, conversions: 'UnitConversions' = None) -> Dict:
+
+        return self.shape.fragment(kind='json', output_unit=output_unit, conversions=conversions,
+                                   render=lambda: self._render_json(output_unit=output_unit, conversions=conversions))
+
+    def _render_json(self, output_unit: Union[str, None], conversions: 'UnitConversions') -> Dict:
 
         result_dict = {'name': self.name,
                        'repeat': self.repeat,
-                       'steps': [step.to_json(output_unit=output_unit) for step in self.steps]}
+                       'steps': [step.to_json(output_unit=output_unit, conversions=conversions) for step in self.steps]}
 
         return result_dict
 
     def to_html(self, output_unit: Union[str, None] = None) -> XmlTag:
 
+        return self.shape.fragment(kind='html', output_unit=output_unit,
+                                   render=lambda: self._render_html(output_unit=output_unit))
+
+    def _render_html(self, output_unit: Union[str, None]) -> XmlTag:
+
         section = XmlTag(name='div', attributes={'style': 'margin-left: 20px'})
         par = XmlTag(name='p')
         section.add(par)
@@ -136,78 +493,153 @@ class FirstStepRepeat(FirstStepBase):
 
         return step
 
+    def __adopt(self, step: FirstStepBase) -> None:
+
+        if step.parent is not None and step.parent is not self:  # moved - the old parent's totals change too
+            step.parent.remove_step(step=step)
+        step.parent = self
+
     def add_step(self, step: FirstStepBase) -> None:
 
         """
-        Add a child step
+        Add a child step. A step that belongs to another repeat is moved from it
         
         :param step: the step to be added
         :type step: FirstStepBase
         """
 
-        self.steps.append(step)
-        
-    def set_steps(self, steps: List[FirstStepBase]) -> None:
+        self.__adopt(step=step)
+        self.__steps += (step,)
+        self.invalidate_totals()
+
+    def remove_step(self, step: FirstStepBase) -> None:
 
         """
-        Set the steps to be repeated
+        Remove a child step
 
-        :param steps: list of steps
-        :type steps: list[FirstStepBase]
+        :param step: the step to be removed
+        :type step: FirstStepBase
         """
-        self.steps = steps
+        for index, child in enumerate(self.__steps):
+            if child is step:
+                break
+        else:
+            raise ValueError('step is not a child of this repeat')
 
-    def total(self, what: str = 'distance', unit: str = 'm') -> float:
+        self.__steps = self.__steps[:index] + self.__steps[index + 1:]
+        if all(child is not step for child in self.__steps):
+            step.parent = None
+        self.invalidate_totals()
+
+    def set_steps(self, steps: List[FirstStepBase]) -> None:
 
         """
-        Calculate the total distance or time for this step
-        
-        :param what: distance or time
-        :type what: str
-        :param unit: 
-        :type unit: str
-        :return: total distance value
-        :rtype: float
-        """
-        value = 0
+        Set the steps to be repeated. Steps that belong to another repeat are moved from it
 
+        :param steps: list of steps
+        :type steps: list[FirstStepBase]
+        """
+        for child in self.__steps:
+            if all(child is not step for step in steps):
+                child.parent = None
+        for step in steps:
+            self.__adopt(step=step)
+        self.__steps = tuple(steps)
+        self.invalidate_totals()
+
+    def compute_totals(self, distance_unit: str, time_unit: str) -> Tuple[float, float]:
+
+        distance = 0
+        time = 0
         for step in self.steps:
-            value += step.total(what=what, unit=unit)
+            step_distance, step_time = step.totals(distance_unit=distance_unit, time_unit=time_unit)
+            distance += step_distance
+            time += step_time
+
+        return distance * self.repeat, time * self.repeat
 
-        return value * self.repeat
+    def compute_shape(self) -> FirstStepShape:
+
+        return FirstStepShape.repeat(name=self.name, repeat=self.repeat, steps=tuple(step.shape for step in self.steps))
 
 
 class FirstStepBody(FirstStepBase):
 
     # noinspection PyTypeChecker
-    def __init__(self, name: str, pace: FirstPace, intensity: str = 'Active',
-                 distance: FirstDistance = None, time: FirstTime = None):
+    def __init__(self, name: str, pace: Union[FirstPace, FirstSpeed], intensity: str = 'Active',
+                 distance: FirstDistance = None, time: FirstTime = None, step_ids: FirstStepIds = None):
 
         """
         Constructor
         
         :param name: step name
         :type name: str
-        :param pace: running pace
-        :type pace: FirstPace
+        :param pace: running pace or speed target
+        :type pace: FirstPace | FirstSpeed
         :param intensity: TBD
         :type intensity: str
         :param distance: the segment distance
         :type distance: FirstDistance
         :param time: the segment duration
         :type time: FirstTime
+        :param step_ids: id allocator, the shared one by default
+        :type step_ids: FirstStepIds
         """
         if distance is None and time is None:
             raise ValueError('Either distance or time must have a value')
         if distance is not None and time is not None:
             raise ValueError('Cannot set both distance and duration in the same step')
 
-        FirstStepBase.__init__(self, name=name)
+        FirstStepBase.__init__(self, name=name, step_ids=step_ids)
+
+        self.__pace = pace
+        self.__intensity = intensity
+        self.__distance = distance
+        self.__time = time
+
+    @property
+    def pace(self) -> Union[FirstPace, FirstSpeed]:
+
+        return self.__pace
+
+    @pace.setter
+    def pace(self, pace: Union[FirstPace, FirstSpeed]) -> None:
+
+        self.__pace = pace
+        self.invalidate_totals()
+
+    @property
+    def intensity(self) -> str:
 
-        self.pace = pace
-        self.intensity = intensity
-        self.distance = distance
-        self.time = time
+        return self.__intensity
+
+    @intensity.setter
+    def intensity(self, intensity: str) -> None:
+
+        self.__intensity = intensity
+        self.invalidate_totals()
+
+    @property
+    def distance(self) -> FirstDistance:
+
+        return self.__distance
+
+    @distance.setter
+    def distance(self, distance: FirstDistance) -> None:
+
+        self.__distance = distance
+        self.invalidate_totals()
+
+    @property
+    def time(self) -> FirstTime:
+
+        return self.__time
+
+    @time.setter
+    def time(self, time: FirstTime) -> None:
+
+        self.__time = time
+        self.invalidate_totals()
 
     @staticmethod
     def __get_type() -> str:
@@ -232,10 +664,23 @@ class FirstStepBody(FirstStepBase):
         else:
             return 'time'
 
+    def get_target_type(self) -> str:
+
+        """
+        Either pace or speed
+
+        :return: 'pace' or 'speed'
+        :rtype: str
+        """
+        if isinstance(self.pace, FirstSpeed):
+            return 'speed'
+        else:
+            return 'pace'
+
     def __str__(self) -> str:
 
         output = FirstStepBase.__str__(self)
-        output += 'type - {}  pace - {}\n'.format(self.__get_type(), str(self.pace))
+        output += 'type - {}  {} - {}\n'.format(self.__get_type(), self.get_target_type(), str(self.pace))
         if self.get_duration_type() == 'distance':
             output += 'Distance - {}\n'.format(str(self.distance))
         else:
@@ -259,31 +704,41 @@ class FirstStepBody(FirstStepBase):
         if self.get_duration_type() == 'distance':
             out_string += '{}  {}'.format(indent, str(self.distance))
         else:
-            out_string += '{}  {}'.format(indent, str(self.time))
+            out_string += '{}  {}'.format(indent, cached_format('time', self.time, None))
 
         out_string += '  at  {}\n'.format(str(self.pace))
 
         return out_string
 
-    def to_json(self, output_unit: Union[str, None] = None) -> Dict:
+    def to_json(self, output_unit: Union[str, None] = None, conversions: 'UnitConversions' = None) -> Dict:
+
+        return self.shape.fragment(kind='json', output_unit=output_unit, conversions=conversions,
+                                   render=lambda: self._render_json(output_unit=output_unit, conversions=conversions))
+
+    def _render_json(self, output_unit: Union[str, None], conversions: 'UnitConversions') -> Dict:
 
         result_dict = {'name': self.name}
         if self.time:
             result_dict['time'] = self.time.to_json()
         if self.distance:
-            result_dict['distance'] = self.distance.to_json(output_unit=output_unit)
-        result_dict['pace'] = self.pace.to_json(output_unit=output_unit)
+            result_dict['distance'] = self.distance.to_json(output_unit=output_unit, conversions=conversions)
+        result_dict[self.get_target_type()] = self.pace.to_json(output_unit=output_unit, conversions=conversions)
 
         return result_dict
 
     def to_html(self, output_unit: Union[str, None] = None) -> XmlTag:
 
+        return self.shape.fragment(kind='html', output_unit=output_unit,
+                                   render=lambda: self._render_html(output_unit=output_unit))
+
+    def _render_html(self, output_unit: Union[str, None]) -> XmlTag:
+
         section = XmlTag(name='div', attributes={'style': 'margin-left: 20px'})
         par = XmlTag(name='p')
         section.add(par)
         text = ''
         if self.time:
-            text = str(self.time)
+            text = cached_format('time', self.time, None)
         if self.distance:
             text = self.distance.to_html(output_unit=output_unit)
         par.add('{} - {} at {}'.format(self.name, text, self.pace.to_html(output_unit=output_unit)))
@@ -297,11 +752,11 @@ class FirstStepBody(FirstStepBase):
         if self.get_duration_type() == 'distance':
             dur_type = 'Distance_t'
             dur_quantity = 'Meters'
-            dur_value = '{:.0f}'.format(self.distance.convert_to('m'))
+            dur_value = cached_format('tcx_meters', self.distance, None)
         else:  # time
             dur_type = 'Time_t'
             dur_quantity = 'Seconds'
-            dur_value = '{:.0f}'.format(self.time.convert_to('second'))
+            dur_value = cached_format('tcx_seconds', self.time, None)
 
         duration = XmlTag(name='Duration', attributes={'xsi:type': dur_type})
         dur = XmlTag(name=dur_quantity, single_line=True)
@@ -318,41 +773,32 @@ class FirstStepBody(FirstStepBase):
         zone = XmlTag(name='SpeedZone', attributes={'xsi:type': 'CustomSpeedZone_t'})
         target.add(item=zone)
         low = XmlTag(name='LowInMetersPerSecond', single_line=True)
-        low.add(item='{:.7f}'.format(self.pace.meters_per_second_delta(delta_seconds)))
+        low.add(item=cached_format('tcx_speed', (self.pace, delta_seconds), None))
         zone.add(item=low)
         high = XmlTag(name='HighInMetersPerSecond', single_line=True)
-        high.add(item='{:.7f}'.format(self.pace.meters_per_second_delta(-delta_seconds)))
+        high.add(item=cached_format('tcx_speed', (self.pace, -delta_seconds), None))
         zone.add(item=high)
 
         return step
 
-    def total(self, what: str = 'distance', unit: str = 'm') -> float:
-
-        """
-        Calculate the total distance or time for this step
+    def compute_totals(self, distance_unit: str, time_unit: str) -> Tuple[float, float]:
 
-        :param what: distance or time
-        :type what: str
-        :param unit:
-        :type unit: str
-        :return: total distance value
-        :rtype: float
-        """
-        if what == 'distance':
-            if self.get_duration_type() == what:
-                return self.distance.convert_to(unit=unit)
-            else:
-                return self.pace.to_distance(time=self.time, unit=unit)
-        elif what == 'time':
-            if self.get_duration_type() == what:
-                return self.time.convert_to(unit=unit)
-            else:
-                return self.pace.to_time(distance=self.distance, unit=unit)
+        if self.get_duration_type() == 'distance':
+            return (self.distance.convert_to(unit=distance_unit),
+                    self.pace.time_for(distance=self.distance.distance, distance_unit=self.distance.unit,
+                                       unit=time_unit))
         else:
-            raise ValueError('what must be "distance" or "time"')
+            return (self.pace.distance_for(seconds=self.time.total_seconds(), unit=distance_unit),
+                    self.time.convert_to(unit=time_unit))
+
+    def compute_shape(self) -> FirstStepShape:
+
+        return FirstStepShape.body(name=self.name, pace=self.pace, intensity=self.intensity, distance=self.distance,
+                                   time=self.time)
 
     @classmethod
-    def from_instructions(cls, instructions: str, data: FirstData, time_index: int, rp: FirstPace):
+    def from_instructions(cls, instructions: str, data: FirstData, time_index: int, rp: FirstPace,
+                          step_ids: FirstStepIds = None):
 
         """
         Create a step from an instruction string
@@ -365,38 +811,48 @@ class FirstStepBody(FirstStepBase):
         :type time_index: int
         :param rp: race pace
         :type rp: FirstPace
+        :param step_ids: id allocator, the shared one by default
+        :type step_ids: FirstStepIds
+        :return: the step
+        :rtype: FirstStep
+        """
+        return cls.from_compiled(step=data.instruction_compiler.compile_step(instructions=instructions), data=data,
+                                 time_index=time_index, rp=rp, step_ids=step_ids)
+
+    @classmethod
+    def from_compiled(cls, step: CompiledStep, data: FirstData, time_index: int, rp: FirstPace,
+                      step_ids: FirstStepIds = None):
+
+        """
+        Create a step from its compiled instructions
+
+        :param step: compiled step
+        :type step: CompiledStep
+        :param data: First database
+        :type data: FirstData
+        :param time_index: the index in the paces table
+        :type time_index: int
+        :param rp: race pace
+        :type rp: FirstPace
+        :param step_ids: id allocator, the shared one by default
+        :type step_ids: FirstStepIds
         :return: the step
         :rtype: FirstStep
         """
-        segment_name = instructions.split('@')[0]
-        increment = None
-        pace = None
-        duration = None
-        try:
-            segment = data.segment_by_name(segment_name)
-            distance = segment.distance
-        except KeyError:
-            distance = FirstDistance.from_string(segment_name)
-            segment_name = instructions.split('@')[1]
-            pace_list = segment_name.split('+')
-            segment_name = pace_list[0]
-            if len(pace_list) > 1:
-                increment = int(pace_list[1])
-            else:
-                increment = None
-            if segment_name == 'RP':  # special case for race-pace
-                segment = None
-                pace = FirstPace.copy(rp)
-            else:
-                segment = data.segment_by_name(segment_name)
-
-        if segment is not None:
-            if segment.ref_pace_name is not None:
-                segment_name = segment.ref_pace_name
-            segment_index = data.segment_index_by_name(segment_name) + 1  # +1 since the first column is the ref time
-            pace = data.segments_paces[time_index][segment_index]
-            duration = segment.duration
-
-        if increment is not None:
-            pace.increment(increment)
-        return cls(name=instructions, pace=pace, time=duration, distance=distance)
+        if step.pace_name == 'RP':  # special case for race-pace
+            pace = FirstPace.copy(rp)
+        else:
+            pace = data.segment_pace(time_index=time_index, name=step.pace_name)
+        if step.increment is not None:
+            pace = pace.increment(step.increment)
+
+        distance = None if step.distance is None else FirstDistance(distance=step.distance[0], unit=step.distance[1])
+        duration = None if step.duration is None else FirstTime(seconds=step.duration)
+
+        return cls(name=step.name, pace=pace, time=duration, distance=distance, step_ids=step_ids)
+
+
+register_format(kind='tcx_meters', render=lambda distance, _: '{:.0f}'.format(distance.convert_to('m')))
+register_format(kind='tcx_seconds', render=lambda time, _: '{:.0f}'.format(time.convert_to('second')))
+register_format(kind='tcx_speed', render=lambda pace_delta, _: '{:.7f}'.format(
+    pace_delta[0].meters_per_second_delta(pace_delta[1])))
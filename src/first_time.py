@@ -1,37 +1,194 @@
-from datetime import timedelta
-from typing import Dict
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List
 
-from dateutil.parser import parse
+from first_config import Config
+from first_format import register_format
+from first_units import FirstUnitRegistry
 
+_DURATION = re.compile(r'\s*(\d+):(\d{1,2})(?::(\d{1,2}))?\s*')
 
-class FirstTime(timedelta):
 
-    """FirstTime adds restrictions to timedelta. It allows only positive values and a has a conversion method"""
+@lru_cache(maxsize=Config.TIME_PARSE_CACHE_SIZE)
+def _parse_seconds(string: str) -> int:
 
-    def __new__(cls, hours: int = 0, minutes: int = 0, seconds: int = 0):
+    match = _DURATION.fullmatch(string)
+    if match is None:
+        raise ValueError('unknown string format for "{}"'.format(string))
+
+    hours, minutes, seconds = match.groups(default='0')
+    if int(minutes) > 59 or int(seconds) > 59:
+        raise ValueError('minutes and seconds must be less than 60 in "{}"'.format(string))
+    total = int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+    if total == 0:
+        raise ValueError('unknown string format for "{}"'.format(string))
+
+    return total
+
+
+class FirstTime(object):
+
+    """Non negative duration kept as integer milliseconds. It has the parts of timedelta that the application uses
+    (total_seconds, days, seconds, microseconds, str, arithmetic and comparisons) and a conversion method"""
+
+    __slots__ = ('milliseconds',)
+
+    def __init__(self, hours: float = 0, minutes: float = 0, seconds: float = 0, milliseconds: float = 0):
 
         """
         Constructor
 
         :param hours:
-        :type hours: int
+        :type hours: float
         :param minutes:
-        :type minutes: int
+        :type minutes: float
         :param seconds:
-        :type seconds: int
+        :type seconds: float
+        :param milliseconds:
+        :type milliseconds: float
+        :return: instance of FirstTime
+        :rtype: FirstTime
+        """
+        if hours < 0 or minutes < 0 or seconds < 0 or milliseconds < 0:
+            raise ValueError('negative values are invalid')
+
+        object.__setattr__(self, 'milliseconds', round(((hours * 60 + minutes) * 60 + seconds) * 1000 + milliseconds))
+
+    @classmethod
+    def from_milliseconds(cls, milliseconds: int):
+
+        """
+        Create FirstTime from integer milliseconds without the unit arithmetic
+
+        :param milliseconds: non negative
+        :type milliseconds: int
         :return: instance of FirstTime
         :rtype: FirstTime
         """
-        if hours < 0 or minutes < 0 or seconds < 0:
+        if milliseconds < 0:
             raise ValueError('negative values are invalid')
 
-        return super().__new__(cls, hours=hours, minutes=minutes, seconds=seconds)
+        instance = cls.__new__(cls)
+        object.__setattr__(instance, 'milliseconds', milliseconds)
+
+        return instance
+
+    def __setattr__(self, key, value):
+
+        raise AttributeError('FirstTime is immutable')
+
+    def __reduce__(self):
+
+        return self.__class__.from_milliseconds, (self.milliseconds,)
+
+    def __str__(self) -> str:
+
+        # same layout as timedelta: '1 day, 2:03:09' and '0:01:30.400000'
+        seconds, milliseconds = divmod(self.milliseconds, 1000)
+        minutes, seconds = divmod(seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        days, hours = divmod(hours, 24)
+
+        output = '{}:{:02d}:{:02d}'.format(hours, minutes, seconds)
+        if milliseconds:
+            output += '.{:03d}000'.format(milliseconds)
+        if days:
+            output = '{} day{}, {}'.format(days, '' if days == 1 else 's', output)
+
+        return output
+
+    def __repr__(self) -> str:
+
+        return 'FirstTime(milliseconds={})'.format(self.milliseconds)
+
+    def __eq__(self, other) -> bool:
+
+        return isinstance(other, FirstTime) and self.milliseconds == other.milliseconds
+
+    def __lt__(self, other: 'FirstTime') -> bool:
+
+        return self.milliseconds < other.milliseconds
+
+    def __le__(self, other: 'FirstTime') -> bool:
+
+        return self.milliseconds <= other.milliseconds
+
+    def __gt__(self, other: 'FirstTime') -> bool:
+
+        return self.milliseconds > other.milliseconds
+
+    def __ge__(self, other: 'FirstTime') -> bool:
+
+        return self.milliseconds >= other.milliseconds
+
+    def __hash__(self) -> int:
+
+        return hash(self.milliseconds)
+
+    def __bool__(self) -> bool:
+
+        return self.milliseconds != 0
+
+    def __add__(self, other: 'FirstTime') -> 'FirstTime':
+
+        if not isinstance(other, FirstTime):
+            return NotImplemented
+        return self.from_milliseconds(self.milliseconds + other.milliseconds)
+
+    def __sub__(self, other: 'FirstTime') -> 'FirstTime':
+
+        if not isinstance(other, FirstTime):
+            return NotImplemented
+        return self.from_milliseconds(self.milliseconds - other.milliseconds)  # raises if negative
+
+    def __mul__(self, factor: float) -> 'FirstTime':
+
+        if isinstance(factor, FirstTime):
+            return NotImplemented
+        return self.from_milliseconds(round(self.milliseconds * factor))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+
+        if isinstance(other, FirstTime):
+            return self.milliseconds / other.milliseconds
+        return self.from_milliseconds(round(self.milliseconds / other))
+
+    def total_seconds(self) -> float:
+
+        """
+        The whole duration in seconds, like timedelta.total_seconds
+
+        :return: seconds
+        :rtype: float
+        """
+        return self.milliseconds / 1000
+
+    @property
+    def days(self) -> int:
+
+        return self.milliseconds // 86400000
+
+    @property
+    def seconds(self) -> int:
+
+        """Seconds within the last day, like timedelta.seconds. Use total_seconds for the whole duration"""
+
+        return self.milliseconds // 1000 % 86400
+
+    @property
+    def microseconds(self) -> int:
+
+        return self.milliseconds % 1000 * 1000
 
     def to_json(self) -> Dict:
 
-        return {'time': str(self), 'seconds': self.seconds}
+        whole, milliseconds = divmod(self.milliseconds, 1000)
+        return {'time': str(self), 'seconds': self.total_seconds() if milliseconds else whole}
 
-    conversions = {'second': 1, 'minute': 60, 'hour': 3600}
+    units = FirstUnitRegistry(sizes=Config.DURATION_UNITS)
+    conversions = units.sizes  # unit to seconds
 
     @classmethod
     def from_string(cls, string: str):
@@ -40,16 +197,24 @@ class FirstTime(timedelta):
         Create FirstTime from a string
         
         :type string: str
-        :param string: format - HH:MM:SS
+        :param string: format - H:MM:SS or H:MM. Hours may exceed 24
         :return: instance of FirstTime
         :rtype: FirstTime
         """
-        t_from_str = parse(timestr=string)  # caller should catch the exception
+        return cls(seconds=_parse_seconds(string))  # caller should catch the exception
+
+    @staticmethod
+    def parse_many(strings: Iterable[str]) -> List[int]:
 
-        if t_from_str.hour == 0 and t_from_str.minute == 0 and t_from_str.second == 0:
-            raise ValueError('unknown string format for "{}"'.format(string))
+        """
+        Parse a column of duration strings
 
-        return cls(hours=t_from_str.hour, minutes=t_from_str.minute, seconds=t_from_str.second)
+        :param strings: format - H:MM:SS or H:MM
+        :type strings: list[str]
+        :return: the durations in seconds
+        :rtype: list[int]
+        """
+        return [_parse_seconds(string) for string in strings]
 
     def convert_to(self, unit: str) -> float:
 
@@ -61,13 +226,7 @@ class FirstTime(timedelta):
         :return: the converted value
         :rtype: float
         """
-        if unit not in self.conversions:
-            raise ValueError('{} is not a valid unit'.format(unit))
+        return self.units.converter(from_unit='second', to_unit=unit)(self.milliseconds / 1000)
 
-        seconds = timedelta.total_seconds(self)
-        # seconds = super(FirstTime, self).total_seconds()
 
-        if unit == 'second':
-            return seconds
-        else:
-            return seconds / self.conversions[unit]
+register_format(kind='time', render=lambda time, _: str(time))
@@ -0,0 +1,152 @@
+from typing import Callable, Dict
+
+import numpy
+
+
+def _identity(value: float) -> float:
+
+    return value
+
+
+class FirstUnitRegistry(object):
+
+    """Units of one dimension (length, duration) with integer ids and a precomputed conversion matrix.
+    Units can be registered at run time, e.g. FirstDistance.units.register(name='yd', size=0.9144)"""
+
+    def __init__(self, sizes: Dict[str, float]):
+
+        """
+        Constructor
+
+        :param sizes: unit name to its size in the base unit, like {'m': 1, 'km': 1000}
+        :type sizes: dict[str, float]
+        :return: instance of FirstUnitRegistry
+        :rtype: FirstUnitRegistry
+        """
+        self.ids = {}
+        self.names = []
+        self.sizes = {}
+        self.matrix = numpy.ones((0, 0))
+        self.__converters = {}
+
+        for name, size in sizes.items():
+            self.register(name=name, size=size)
+
+    def register(self, name: str, size: float) -> int:
+
+        """
+        Add a unit
+
+        :param name: unit name
+        :type name: str
+        :param size: the unit size in the base unit
+        :type size: float
+        :return: the unit id
+        :rtype: int
+        """
+        if size <= 0:
+            raise ValueError('unit size must be positive')
+        if name in self.ids:
+            if self.sizes[name] != size:
+                raise ValueError('{} is already registered with a different size'.format(name))
+            return self.ids[name]
+
+        unit_id = len(self.names)
+        self.ids[name] = unit_id
+        self.names.append(name)
+        self.sizes[name] = size
+
+        sizes = numpy.array([self.sizes[unit] for unit in self.names], dtype=numpy.float64)
+        matrix = sizes[:, numpy.newaxis] / sizes[numpy.newaxis, :]  # row unit value * factor = column unit value
+        matrix.flags.writeable = False
+        self.matrix = matrix
+
+        return unit_id
+
+    def is_valid(self, name: str) -> bool:
+
+        """
+        Check if a unit is registered
+
+        :param name: unit name
+        :type name: str
+        :return: True if registered
+        :rtype: bool
+        """
+        return name in self.ids
+
+    def unit_id(self, name: str) -> int:
+
+        """
+        The id of a unit - its row and column in the conversion matrix
+
+        :param name: unit name
+        :type name: str
+        :return: the unit id
+        :rtype: int
+        """
+        unit_id = self.ids.get(name)
+        if unit_id is None:
+            raise ValueError('{} is not a valid unit'.format(name))
+
+        return unit_id
+
+    def factor(self, from_unit: str, to_unit: str) -> float:
+
+        """
+        Conversion factor
+
+        :param from_unit: unit name
+        :type from_unit: str
+        :param to_unit: unit name
+        :type to_unit: str
+        :return: value in from_unit * factor = value in to_unit
+        :rtype: float
+        """
+        return float(self.matrix[self.unit_id(name=from_unit), self.unit_id(name=to_unit)])
+
+    def converter(self, from_unit: str, to_unit: str) -> Callable[[float], float]:
+
+        """
+        A conversion function for a pair of units - look it up once and reuse it.
+        The function multiplies by the from size and divides by the to size, like the original conversions,
+        so the results are identical to the digit
+
+        :param from_unit: unit name
+        :type from_unit: str
+        :param to_unit: unit name
+        :type to_unit: str
+        :return: value in from_unit -> value in to_unit
+        :rtype: callable
+        """
+        key = (from_unit, to_unit)
+        converter = self.__converters.get(key)
+        if converter is None:
+            self.unit_id(name=from_unit)  # validate both
+            self.unit_id(name=to_unit)
+            from_size = self.sizes[from_unit]
+            to_size = self.sizes[to_unit]
+            if from_unit == to_unit:
+                converter = _identity
+            else:
+                def converter(value: float) -> float:
+                    return value * from_size / to_size
+            self.__converters[key] = converter
+
+        return converter
+
+    def convert(self, value: float, from_unit: str, to_unit: str) -> float:
+
+        """
+        Convert a value
+
+        :param value: value in from_unit
+        :type value: float
+        :param from_unit: unit name
+        :type from_unit: str
+        :param to_unit: unit name
+        :type to_unit: str
+        :return: value in to_unit
+        :rtype: float
+        """
+        return self.converter(from_unit=from_unit, to_unit=to_unit)(value)
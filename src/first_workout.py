@@ -1,14 +1,59 @@
-from typing import Dict, Union
-
-from parse import *
+from typing import Dict, Iterator, List, Tuple, Union, TYPE_CHECKING
 
 import datetime
 
 from first_data import FirstData
+from first_instructions import CompiledRepeat, CompiledStep, CompiledWorkout
 from first_pace import FirstPace
-from first_step import FirstStepBase, FirstStepRepeat, FirstStepBody
+from first_step import FirstStepBase, FirstStepIds, FirstStepRepeat, FirstStepBody
 from first_utils import XmlTag, HtmlTable, HtmlBold
 
+if TYPE_CHECKING:
+    from first_arrays import UnitConversions
+
+
+class FirstTimelineSegment(object):
+
+    """One effort of a workout timeline - a body step, or a whole repeat block in compressed mode.
+    Offsets, durations and distances are in seconds and meters"""
+
+    __slots__ = ('workout', 'step', 'count', 'start_time', 'start_distance', 'duration', 'distance')
+
+    def __init__(self, workout: 'FirstWorkout', step: FirstStepBase, count: int, start_time: float,
+                 start_distance: float, duration: float, distance: float):
+
+        """
+        Constructor
+
+        :param workout: the workout
+        :type workout: FirstWorkout
+        :param step: the step itself - not a copy
+        :type step: FirstStepBase
+        :param count: 1 for a body step, the number of repetitions for a compressed repeat block
+        :type count: int
+        :param start_time: seconds from the start of the workout
+        :type start_time: float
+        :param start_distance: meters from the start of the workout
+        :type start_distance: float
+        :param duration: seconds, for all the repetitions of a block
+        :type duration: float
+        :param distance: meters, for all the repetitions of a block
+        :type distance: float
+        :return: instance of FirstTimelineSegment
+        :rtype: FirstTimelineSegment
+        """
+        self.workout = workout
+        self.step = step
+        self.count = count
+        self.start_time = start_time
+        self.start_distance = start_distance
+        self.duration = duration
+        self.distance = distance
+
+    def __repr__(self) -> str:
+
+        return 'segment: {} X {} at {:.0f} s'.format(self.step.name, self.count, self.start_time)
+
 
 class FirstWorkout(object):
 
@@ -92,21 +137,23 @@ class FirstWorkout(object):
                 for step in self.steps:
                     out_string += step.details(indent=indent + '  ')
 
+            distance, minutes = self.totals(distance_unit='mile', time_unit='minute')
             out_string += '{0}  Totals: distance = {1:.2f} miles   duration = {2:.2f} minutes\n'.format(
-                indent, self.total(unit='mile'), self.total(what='time', unit='minute'))
+                indent, distance, minutes)
 
         return out_string
 
-    def to_json(self, output_unit: Union[str, None] = None) -> Dict:
+    def to_json(self, output_unit: Union[str, None] = None, conversions: 'UnitConversions' = None) -> Dict:
 
         unit = output_unit or 'mile'
+        distance, minutes = self.totals(distance_unit=unit, time_unit='minute')
         result_dict = {'name': self.name,
                        'note': self.note,
                        'status': self.status,
                        'date': str(self.workout_date),
-                       'steps': [step.to_json(output_unit=output_unit) for step in self.steps],
-                       'total_distance': {'distance': self.total(unit=unit), 'unit': unit},
-                       'total_time': {'time': self.total(what='time', unit='minute'), 'unit': 'minute'}}
+                       'steps': [step.to_json(output_unit=output_unit, conversions=conversions) for step in self.steps],
+                       'total_distance': {'distance': distance, 'unit': unit},
+                       'total_time': {'time': minutes, 'unit': 'minute'}}
 
         return result_dict
 
@@ -123,8 +170,9 @@ class FirstWorkout(object):
         section.add(table)
         table.add_header(column_names=['key', 'value'], mute=True)
         unit = output_unit or 'mile'
-        table.add_row(values=['Total Distance:', HtmlBold('{:.2f} {}'.format(self.total(unit=unit), unit))])
-        table.add_row(values=['Total Time:', HtmlBold('{:.0f} minutes'.format(self.total(what='time', unit='minute')))])
+        distance, minutes = self.totals(distance_unit=unit, time_unit='minute')
+        table.add_row(values=['Total Distance:', HtmlBold('{:.2f} {}'.format(distance, unit))])
+        table.add_row(values=['Total Time:', HtmlBold('{:.0f} minutes'.format(minutes))])
 
         return section
 
@@ -146,6 +194,57 @@ class FirstWorkout(object):
 
         return result
 
+    def totals(self, distance_unit: str = 'mile', time_unit: str = 'minute') -> Tuple[float, float]:
+
+        """
+        Total distance and duration of the workout in one pass over the (cached) step totals
+
+        :param distance_unit: length unit
+        :type distance_unit: str
+        :param time_unit: duration unit
+        :type time_unit: str
+        :return: (distance, duration)
+        :rtype: tuple[float, float]
+        """
+        distance = 0
+        time = 0
+        for step in self.steps:
+            step_distance, step_time = step.totals(distance_unit=distance_unit, time_unit=time_unit)
+            distance += step_distance
+            time += step_time
+
+        return distance, time
+
+    def timeline(self, compressed: bool = False) -> Iterator[FirstTimelineSegment]:
+
+        """
+        The efforts of the workout in order, with their start offsets. Repeats are unrolled lazily - the same step
+        objects are yielded again for each repetition
+
+        :param compressed: yield repeat blocks once with their repetition count instead of unrolling them
+        :type compressed: bool
+        :return: generator of segments
+        :rtype: iterator[FirstTimelineSegment]
+        """
+        start_time = 0.0
+        start_distance = 0.0
+
+        def segments(steps: List[FirstStepBase]) -> Iterator[FirstTimelineSegment]:
+            nonlocal start_time, start_distance
+            for step in steps:
+                if isinstance(step, FirstStepRepeat) and not compressed:
+                    for _ in range(step.repeat):
+                        yield from segments(steps=step.steps)
+                else:
+                    distance, duration = step.totals(distance_unit='m', time_unit='second')
+                    count = step.repeat if isinstance(step, FirstStepRepeat) else 1
+                    yield FirstTimelineSegment(workout=self, step=step, count=count, start_time=start_time,
+                                               start_distance=start_distance, duration=duration, distance=distance)
+                    start_time += duration
+                    start_distance += distance
+
+        return segments(steps=self.steps)
+
     def tcx(self) -> XmlTag:
 
         workout = XmlTag(name='Workout', attributes={'Sport': 'Running'})
@@ -168,74 +267,54 @@ class FirstWorkout(object):
         return workout
 
     @staticmethod
-    def __parse_simple_steps(data: FirstData, instructions: str, time_index: int, race_pace: FirstPace):
-
-        steps = []
+    def __steps_from_compiled(steps: List[Union[CompiledStep, CompiledRepeat]], data: FirstData, time_index: int,
+                              race_pace: FirstPace, step_ids: FirstStepIds) -> List[FirstStepBase]:
 
-        last = instructions.split('#')[-1]
-        result = parse('{:d}x', last)
-        if result is not None:
-            simple_instructions = '#'.join(instructions.split('#')[:-1])
-            repeat = result.fixed[0]
-        else:
-            simple_instructions = instructions
-            repeat = -1
-
-        if simple_instructions != '':
-            for item in simple_instructions.split('#'):
-                steps.append(FirstStepBody.from_instructions(instructions=item, data=data,
-                                                             time_index=time_index, rp=race_pace))
+        result = []
+        for step in steps:
+            if isinstance(step, CompiledRepeat):
+                repeat = FirstStepRepeat(name='repeat X ' + str(step.repeat), repeat=step.repeat, step_ids=step_ids)
+                repeat.set_steps(steps=FirstWorkout.__steps_from_compiled(steps=step.steps, data=data,
+                                                                          time_index=time_index,
+                                                                          race_pace=race_pace, step_ids=step_ids))
+                result.append(repeat)
+            else:
+                result.append(FirstStepBody.from_compiled(step=step, data=data, time_index=time_index,
+                                                          rp=race_pace, step_ids=step_ids))
 
-        return steps, repeat
+        return result
 
-    @staticmethod
-    def __parse_steps(data: FirstData, instructions: str, time_index: int, race_pace: FirstPace):
-
-        steps = []
-        simple_instructions = ''
-        remainder = instructions
-
-        while remainder:
-            char = remainder[0]
-            if char == '(':
-                simple_steps, repeat = FirstWorkout.__parse_simple_steps(data=data, instructions=simple_instructions,
-                                                                         time_index=time_index, race_pace=race_pace)
-                simple_instructions = ''
-                if repeat < 1:
-                    raise ValueError('Syntax error: missing nX before (')
-
-                steps += simple_steps
-                remainder = remainder[1:]
-                step = FirstStepRepeat(name='repeat X ' + str(repeat), repeat=repeat)
-                repeat_steps, remainder, close_par = FirstWorkout.__parse_steps(data=data, instructions=remainder,
-                                                                                time_index=time_index,
-                                                                                race_pace=race_pace)
-                if not close_par:
-                    raise ValueError('Unbalanced parentheses')
-                step.set_steps(steps=repeat_steps)
-                steps.append(step)
-            elif char == ')':
-                remainder = remainder[1:]
-                simple_steps, repeat = FirstWorkout.__parse_simple_steps(data=data, instructions=simple_instructions,
-                                                                         time_index=time_index, race_pace=race_pace)
-
-                steps += simple_steps
-                return steps, remainder, True
-            else:
-                simple_instructions += char
-                remainder = remainder[1:]
+    @classmethod
+    def from_compiled(cls, compiled: CompiledWorkout, wo_date: datetime.date,
+                      data: FirstData, time_index: int, race_pace: FirstPace, step_ids: FirstStepIds = None):
 
-        simple_steps, repeat = FirstWorkout.__parse_simple_steps(data=data, instructions=simple_instructions,
-                                                                 time_index=time_index, race_pace=race_pace)
-        if repeat > 0:
-            raise ValueError('Syntax error: trailing nX')
-        steps += simple_steps
+        """
+        Constructor - create workout from compiled instructions
+        :param compiled: see FirstInstructionCompiler
+        :type compiled: CompiledWorkout
+        :param wo_date:
+        :type wo_date: datetime.date
+        :param data:
+        :type data: FirstData
+        :param time_index:
+        :type time_index: int
+        :param race_pace:
+        :type race_pace: FirstPace
+        :param step_ids: id allocator, the shared one by default
+        :type step_ids: FirstStepIds
+        :return: instance of FirstWorkout
+        :rtype: FirstWorkout
+        """
+        wo = cls(name=compiled.name, workout_date=wo_date, note=compiled.note)
+        for step in FirstWorkout.__steps_from_compiled(steps=compiled.steps, data=data, time_index=time_index,
+                                                       race_pace=race_pace, step_ids=step_ids):
+            wo.add_step(step=step)
 
-        return steps, remainder, False
+        return wo
 
     @classmethod
     def from_instructions(cls, instructions: str, wo_date: datetime.date,
-                          data: FirstData, time_index: int, race_pace: FirstPace):
+                          data: FirstData, time_index: int, race_pace: FirstPace, step_ids: FirstStepIds = None):
 
         """
         Constructor - create workout from instructions
@@ -249,19 +328,11 @@ class FirstWorkout(object):
         :type time_index: int
         :param race_pace:
         :type race_pace: FirstPace
+        :param step_ids: id allocator, the shared one by default
+        :type step_ids: FirstStepIds
         :return: instance of FirstWorkout
         :rtype: FirstWorkout
         """
-
-        split1 = instructions.split(' ', 2)
-        name = 'Week {} Keyrun {}'.format(split1[0], split1[1])
-        wo = cls(name=name, workout_date=wo_date, note=split1[2])
-
-        steps, remainder, close_par = FirstWorkout.__parse_steps(instructions=split1[2], data=data,
-                                                                 time_index=time_index, race_pace=race_pace)
-        if len(remainder) > 0:
-            raise ValueError('remainder is expected to be empty after all steps are parsed')
-        for step in steps:
-            wo.add_step(step=step)
-
-        return wo
+        return cls.from_compiled(compiled=data.instruction_compiler.compile_workout(instructions=instructions),
+                                 wo_date=wo_date, data=data, time_index=time_index, race_pace=race_pace,
+                                 step_ids=step_ids)
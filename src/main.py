@@ -22,7 +22,7 @@ def process_args():
     parser.add_argument('-e', '--ref_race_type', default=None,
                         help='Reference race type to calculate target time. Default is the same as race type')
     parser.add_argument('-y', '--race_type', default='Marathon',
-                        help='One of 5K, 10K, HalfMarathon, Marathon. Default is Marathon')
+                        help='One of 5K, 10K, HalfMarathon (or half), Marathon. Default is Marathon')
     parser.add_argument('-n', '--race_name', default='My Race', help='Race name. Default is the race type')
     parser.add_argument('-d', '--race_date', help='Race date - MM/DD/YYYY', required=True)
     parser.add_argument('-u', '--length_unit', default='mile', help='Show distances and paces with this unit')
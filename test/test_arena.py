@@ -0,0 +1,86 @@
+import unittest
+from datetime import date
+
+from first_config import Config
+from first_data import FirstData
+from first_plan import FirstPlan
+from first_race import FirstRace
+from first_step import FirstStepBase, FirstStepBody, FirstStepRepeat
+from first_time import FirstTime
+
+
+class TestFirstStepArena(unittest.TestCase):
+
+    def test_arena(self):
+
+        self.addCleanup(FirstStepBase.reset_global_id)  # other tests expect step ids from 0
+        data = FirstData(json_path=Config.DATABASE_JSON)
+        race = FirstRace(race_type=data.get_race_type_by_name('Marathon'), name='San Francisco Marathon',
+                         race_date=date(year=2017, month=7, day=23), target_time=FirstTime.from_string('3:45:00'))
+        plan = FirstPlan(name='arena', weekly_schedule=[1, 3, 5], race=race)
+        plan.generate_workouts(data=data)
+
+        try:
+            arena = plan.step_arena()
+            self.assertEqual(48, arena.workout_count)
+            self.assertEqual(sum(len(workout.steps) for workout in plan.workouts), int((arena.parent == -1).sum()))
+            self.assertTrue(len(arena.paces) < 30)
+
+            for workout_index in [0, 1, 20, 47]:
+                workout = plan.workouts[workout_index]
+                views = arena.workout_steps(workout_index=workout_index)
+                self.assertEqual(len(workout.steps), len(views))
+                for step, view in zip(workout.steps, views):
+                    self.assertEqual(step.to_json(output_unit='km'), view.to_json(output_unit='km'))
+                    self.assertEqual(step.tcx().indented_str(), view.tcx().indented_str())
+                    self.assertEqual(step.to_html().indented_str(), view.to_html().indented_str())
+                    self.assertEqual(step.details(indent='  '), view.details(indent='  '))
+                    self.assertEqual(str(step), str(view))
+                    self.assertEqual(step.totals(distance_unit='km', time_unit='minute'),
+                                     view.totals(distance_unit='km', time_unit='minute'))
+                    self.assertEqual(step.total(unit='mile'), view.total(unit='mile'))
+
+            repeat = next(step for step in plan.workouts[0].steps if isinstance(step, FirstStepRepeat))
+            view = arena.view(index=int(arena.step_id.tolist().index(repeat.step_id)))
+            self.assertEqual(repeat.repeat, view.repeat)
+            self.assertEqual([child.step_id for child in repeat.steps], [child.step_id for child in view.steps])
+
+            body = plan.workouts[0].steps[0]
+            self.assertTrue(isinstance(body, FirstStepBody))
+            view = arena.view(index=0)
+            self.assertIs(body.pace, view.pace)
+            self.assertEqual((body.distance, body.time, body.intensity), (view.distance, view.time, view.intensity))
+
+            for index in range(-1, len(arena)):  # the sibling links agree with the parent column
+                self.assertEqual([int(row) for row in (arena.parent == index).nonzero()[0]],
+                                 [child.index for child in arena.children(index=index)])
+            self.assertEqual(len(arena), sum(len(arena.workout_steps(workout_index=index)) +
+                                             int((arena.parent >= 0)[arena.workout == index].sum())
+                                             for index in range(arena.workout_count)))
+            self.assertEqual(1, arena.pace.itemsize)  # small plans get small indexes
+            self.assertEqual(2, arena.parent.itemsize)
+            self.assertLess(arena.nbytes(), 5000)
+
+            distances, minutes = arena.totals(distance_unit='mile', time_unit='minute')
+            for workout, distance, time in zip(plan.workouts, distances.tolist(), minutes.tolist()):
+                expected_distance, expected_time = workout.totals(distance_unit='mile', time_unit='minute')
+                self.assertAlmostEqual(expected_distance, distance)
+                self.assertAlmostEqual(expected_time, time)
+        except ValueError as vex:
+            self.fail(str(vex))
+
+        try:
+            _ = arena.view(index=len(arena))
+            self.fail('Should not get here with index out of range')
+        except ValueError as ex:
+            self.assertEqual('step index must be between 0 and {}'.format(len(arena) - 1), str(ex))
+
+        try:
+            _ = arena.children(index=-2)
+            self.fail('Should not get here with index out of range')
+        except ValueError as ex:
+            self.assertEqual('step index must be between -1 and {}'.format(len(arena) - 1), str(ex))
+
+
+if __name__ == '__main__':
+    unittest.main()
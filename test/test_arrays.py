@@ -0,0 +1,70 @@
+import unittest
+
+from first_arrays import DistanceArray, DurationArray, PaceArray
+from first_distance import FirstDistance
+from first_pace import FirstPace
+from first_time import FirstTime
+
+
+class TestFirstArrays(unittest.TestCase):
+
+    def test_distance_array(self):
+
+        try:
+            distances = DistanceArray.from_distances(distances=[FirstDistance.from_string('400.0 m'),
+                                                                FirstDistance.from_string('5.0 km'),
+                                                                FirstDistance.from_string('1.0 mile')])
+            self.assertEqual(3, len(distances))
+            self.assertEqual([400.0, 5000.0, 1609.344], distances.meters.tolist())
+            self.assertEqual(['0.249', '3.107', '1.000'], ['{:.3f}'.format(value)
+                                                          for value in distances.convert_to(unit='mile')])
+            self.assertEqual(['0.400 km', '5.000 km', '1.609 km'], distances.format(unit='km'))
+            self.assertEqual(['0.4 km', '5.0 km', '1.6 km'], distances.format(unit='km', decimals=1))
+            self.assertEqual(FirstDistance(distance=5.0, unit='km'), distances.to_distances(unit='km')[1])
+            self.assertEqual([3.0, 2.5],
+                             DistanceArray.from_values(values=[3, 2.5], unit='km').convert_to('km').tolist())
+        except ValueError as ex:
+            self.fail(str(ex))
+
+        try:
+            _ = distances.convert_to(unit='mm')
+            self.fail('Should not get here with unknown unit')
+        except ValueError as ex:
+            self.assertEqual('mm is not a valid unit', str(ex))
+
+    def test_duration_array(self):
+
+        try:
+            times = DurationArray.from_times(times=[FirstTime.from_string('0:15:00'), FirstTime(seconds=90.4),
+                                                    FirstTime.from_string('26:03:09')])
+            self.assertEqual([900.0, 90.4, 93789.0], times.seconds.tolist())
+            self.assertEqual([15.0, 1.5066666666666668, 1563.15], times.convert_to(unit='minute').tolist())
+            self.assertEqual(['0:15:00', '0:01:30', '26:03:09'], times.format())
+            self.assertEqual([FirstTime(minutes=15), FirstTime(seconds=90.4),
+                              FirstTime(hours=26, minutes=3, seconds=9)], times.to_times())
+        except ValueError as ex:
+            self.fail(str(ex))
+
+    def test_pace_array(self):
+
+        try:
+            paces = PaceArray.from_paces(paces=[FirstPace.from_string('0:08:00 min per mile'),
+                                                FirstPace.from_string('0:05:00 min per km')])
+            self.assertEqual(['0:08:00 min per mile', '0:08:03 min per mile'], paces.format(unit='mile'))
+            self.assertEqual(['0:04:58 min per km', '0:05:00 min per km'], paces.format(unit='km'))
+            self.assertEqual([FirstPace(minutes=4, seconds=58, length_unit='km'),
+                              FirstPace(minutes=5, length_unit='km')], paces.to_paces(unit='km'))
+            self.assertEqual(['480.000', '300.000'], ['{:.3f}'.format(value) for value in PaceArray.from_values(
+                seconds=[480, 300], unit='mile').convert_to(unit='mile')])
+
+            times = paces.to_time(distances=DistanceArray.from_values(values=[2, 10], unit='km'))
+            self.assertEqual(['0:09:57', '0:50:00'], times.format())
+            distances = paces.to_distance(times=DurationArray(seconds=[480, 300]))
+            self.assertEqual(['1.000 mile', '1.000 km'], [distances.format(unit='mile')[0],
+                                                          distances.format(unit='km')[1]])
+        except ValueError as ex:
+            self.fail(str(ex))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -33,6 +33,17 @@ class TestFirstData(unittest.TestCase):
         except ValueError as ex:
             self.assertEqual('Race type lulu not found', str(ex))
 
+        try:  # normalized names and aliases
+            self.assertEqual(2, data.race_type_index_by_name(name='Half Marathon'))
+            self.assertEqual(2, data.race_type_index_by_name(name='half'))
+            self.assertEqual(3, data.race_type_index_by_name(name='marathon'))
+            self.assertEqual('10K', data.get_race_type_by_name(name='10 km').name)
+            self.assertEqual(2, data.plan_index_by_race_name(name='half-marathon'))
+            data.add_race_type_alias(alias='Ultra Short', name='5K')
+            self.assertEqual(0, data.race_type_index_by_name(name='ultrashort'))
+        except ValueError as vex:
+            self.fail(str(vex))
+
         try:  # time not found high
             from_time = FirstTime.from_string('4:49:59')
             _ = data.equivalent_time(time_from=from_time, race_index_from=2, race_index_to=0)
@@ -77,6 +88,67 @@ class TestFirstData(unittest.TestCase):
         except IOError as ioex:
             self.assertEqual("[Errno 2] No such file or directory: 'lulu'", str(ioex))
 
+    def test_batch_lookups(self):
+
+        data = FirstData(json_path=Config.DATABASE_JSON)
+        try:  # batch results match the single lookups
+            times = [FirstTime.from_string(string) for string in ['0:20:13', '0:15:00', '0:14:00', '0:30:00']]
+            indexes = data.equivalent_time_indexes(times_from=times, race_index_from=0)
+            self.assertEqual([32, 0, 0, 90], indexes.tolist())
+            self.assertEqual([data.equivalent_time(time_from=time, race_index_from=0, race_index_to=2)
+                              for time in times],
+                             data.equivalent_times(times_from=times, race_index_from=0, race_index_to=2))
+            seconds = [3 * 3600 + 59 * 60 + 59, 3 * 3600 + 55 * 60 + 1, 4 * 3600]
+            self.assertEqual([data.pace_index_by_race_time(race_time=FirstTime(seconds=value), race_name='Marathon')
+                              for value in seconds],
+                             data.pace_indexes_by_race_times(race_times=seconds, race_name='Marathon').tolist())
+        except ValueError as vex:
+            self.fail(str(vex))
+
+        try:  # one time out of range fails the batch
+            _ = data.equivalent_times(times_from=[1200, 7200], race_index_from=0, race_index_to=2)
+            self.fail('Should not get here with time not found')
+        except ValueError as ex:
+            self.assertEqual('Time is longer than the highest database time', str(ex))
+
+    def test_interpolated_paces(self):
+
+        data = FirstData(json_path=Config.DATABASE_JSON)
+        try:  # table rows are reproduced and times between rows get paces between rows
+            row_times = [data.race_times[index][3] for index in [0, 40, 90]]
+            paces = data.interpolated_paces(race_times=row_times, race_name='Marathon')
+            self.assertEqual([data.pace_row(index).tolist() for index in [0, 40, 90]], paces.tolist())
+            paces = data.interpolated_paces(race_times=[FirstTime.from_string('3:59:59'),
+                                                        FirstTime.from_string('3:55:01')], race_name='Marathon')
+            self.assertGreater(paces[0][10], paces[1][10])
+            self.assertLess(data.pace_row(57)[10], paces[0][10])
+            self.assertGreater(data.pace_row(58)[10], paces[0][10])
+            self.assertEqual('0:08:43 min per mile', str(data.interpolated_pace(
+                race_time=FirstTime.from_string('3:59:59'), race_name='Marathon', segment_name='long')))
+        except ValueError as vex:
+            self.fail(str(vex))
+
+        try:  # bounded extrapolation
+            clamped = data.interpolated_paces(race_times=[8500, 17900], race_name='Marathon', extrapolation='clamp')
+            self.assertEqual([data.pace_row(0).tolist(), data.pace_row(-1).tolist()], clamped.tolist())
+            extended = data.interpolated_paces(race_times=[8500, 17900], race_name='Marathon', extrapolation='linear')
+            self.assertLess(extended[0][1], clamped[0][1])
+            self.assertGreater(extended[1][1], clamped[1][1])
+        except ValueError as vex:
+            self.fail(str(vex))
+
+        try:  # outside the table without extrapolation
+            _ = data.interpolated_paces(race_times=[17900], race_name='Marathon')
+            self.fail('Should not get here with time not found')
+        except ValueError as ex:
+            self.assertEqual('Time is longer than the highest database time', str(ex))
+
+        try:  # beyond the extrapolation bound
+            _ = data.interpolated_paces(race_times=[7000], race_name='Marathon', extrapolation='linear')
+            self.fail('Should not get here with time not found')
+        except ValueError as ex:
+            self.assertEqual('Time is shorter than the lowest database time', str(ex))
+
     def test_segments(self):
 
         try:  # good path
@@ -93,6 +165,13 @@ class TestFirstData(unittest.TestCase):
             self.assertEqual('0:05:56 min per mile', str(data.segments_paces[30][3]))
             self.assertEqual('0:30:00', str(data.segments_paces[-1][0]))
             self.assertEqual('0:11:31 min per mile', str(data.segments_paces[-1][11]))
+            self.assertEqual((91, 12), data.pace_matrix.shape)
+            self.assertEqual(4 * 60 + 22, data.pace_row(0)[4])
+            self.assertEqual(11 * 60 + 31, data.pace_column('easy')[-1])
+            self.assertEqual(data.pace_column('easy').tolist(), data.pace_column('cooldown').tolist())
+            self.assertFalse(data.pace_column('400m').flags.writeable)
+            self.assertEqual('0:11:31 min per mile', str(data.segment_pace(time_index=90, name='RI')))
+            self.assertIs(data.segment_pace(time_index=90, name='RI'), data.segment_pace(time_index=90, name='easy'))
         except ValueError as vex:
             self.fail(str(vex))
         except IOError as ioex:
@@ -0,0 +1,131 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from first_config import Config
+from first_data_holder import FirstDataHolder
+
+
+class TestFirstDataHolder(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.json_path = os.path.join(self.tmp_dir, 'training_db.json')
+        shutil.copyfile(Config.DATABASE_JSON, self.json_path)
+        with open(self.json_path, 'r') as fd:
+            self.content = fd.read()
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, content: str) -> None:
+
+        with open(self.json_path, 'w') as fd:
+            fd.write(content)
+
+    def test_check(self):
+
+        holder = FirstDataHolder(json_path=self.json_path)
+        try:  # no change
+            data = holder.data
+            self.assertFalse(holder.check())
+            self.assertIs(data, holder.data)
+            self.assertEqual('0:04:09 min per mile', str(data.segments_paces[0][1]))
+        except ValueError as vex:
+            self.fail(str(vex))
+
+        try:  # a change is swapped in, the old instance is untouched
+            self.write(self.content.replace('"0:15:00 1:02 1:36', '"0:15:00 1:01 1:36'))
+            self.assertTrue(holder.check())
+            self.assertIsNot(data, holder.data)
+            self.assertEqual('0:04:05 min per mile', str(holder.data.segments_paces[0][1]))
+            self.assertEqual('0:04:09 min per mile', str(data.segments_paces[0][1]))
+            metrics = holder.metrics()
+            self.assertEqual(2, metrics['checks'])
+            self.assertEqual(1, metrics['reloads'])
+            self.assertEqual(0, metrics['failed_reloads'])
+            self.assertGreater(metrics['last_reload_seconds'], 0)
+        except ValueError as vex:
+            self.fail(str(vex))
+
+        try:  # a broken file keeps the previous database
+            data = holder.data
+            self.write(self.content[:100])
+            self.assertFalse(holder.check())
+            self.assertIs(data, holder.data)
+            self.assertEqual(1, holder.metrics()['failed_reloads'])
+            self.assertIsNotNone(holder.metrics()['last_error'])
+        except ValueError as vex:
+            self.fail(str(vex))
+
+    def test_lazy_reload(self):
+
+        for use_snapshot in [True, False]:
+            holder = FirstDataHolder(json_path=self.json_path, use_snapshot=use_snapshot, lazy_plans=True)
+            try:  # the old instance still decodes the plans it didn't open before the reload
+                data = holder.data
+                self.assertFalse(data.plan_instructions.is_loaded(3))
+                self.write(self.content.replace('"1 1 warmup#3x(1600m#200 m@RI)cooldown',
+                                                '"1 1 warmup#4x(1600m#200 m@RI)cooldown'))
+                self.assertTrue(holder.check())
+                self.assertIsNot(data, holder.data)
+                self.assertEqual('1 1 warmup#3x(1600m#200 m@RI)cooldown', data.plan_instructions[3].instructions[0])
+                self.assertEqual('1 1 warmup#4x(1600m#200 m@RI)cooldown',
+                                 holder.data.plan_instructions[3].instructions[0])
+                self.assertEqual(len(data.plan_instructions[3].instructions), len(data.plan_instructions[3].compiled))
+            except ValueError as vex:
+                self.fail(str(vex))
+            finally:
+                self.write(self.content)
+
+    def test_polling(self):
+
+        holder = FirstDataHolder(json_path=self.json_path, poll_interval=0.01)
+        holder.start()
+        try:
+            self.write(self.content.replace('"FIRST - Run Less', '"FIRST - Run Much Less'))
+            deadline = time.time() + 5
+            while holder.metrics()['reloads'] == 0 and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(1, holder.metrics()['reloads'])
+            self.assertTrue(holder.data.name.startswith('FIRST - Run Much Less'))
+        finally:
+            holder.stop()
+
+        try:  # bad interval
+            _ = FirstDataHolder(json_path=self.json_path, poll_interval=0)
+            self.fail('Should not get here with a zero interval')
+        except ValueError as ex:
+            self.assertEqual('poll_interval must be positive', str(ex))
+
+    def test_wrong_shape(self):
+
+        holder = FirstDataHolder(json_path=self.json_path, poll_interval=0.01)
+        data = holder.data
+        holder.start()
+        try:  # valid json with the wrong shape is a failed reload and the thread keeps polling
+            self.write(self.content.replace('"workout_instructions": [', '"workout_instructions": null, "unused": ['))
+            deadline = time.time() + 5
+            while holder.metrics()['failed_reloads'] == 0 and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(1, holder.metrics()['failed_reloads'])
+            self.assertIsNotNone(holder.metrics()['last_error'])
+            self.assertIs(data, holder.data)
+
+            self.write(self.content.replace('"FIRST - Run Less', '"FIRST - Run Much Less'))
+            deadline = time.time() + 5
+            while holder.metrics()['reloads'] == 0 and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(1, holder.metrics()['reloads'])
+            self.assertIsNone(holder.metrics()['last_error'])
+            self.assertTrue(holder.data.name.startswith('FIRST - Run Much Less'))
+        finally:
+            holder.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
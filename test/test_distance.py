@@ -1,3 +1,4 @@
+import pickle
 import unittest
 
 from first_distance import FirstDistance
@@ -124,5 +125,26 @@ class TestFirstDistance(unittest.TestCase):
             self.fail(ex)
 
 
+    def test_value_semantics(self):
+
+        try:
+            distance = FirstDistance.from_string('400.0 m')
+            self.assertIs(distance, FirstDistance(distance=400.0, unit='m'))
+            self.assertIsNot(distance, FirstDistance(distance=400, unit='m'))  # prints differently
+            self.assertEqual(distance, FirstDistance(distance=400, unit='m'))
+            self.assertEqual(hash(distance), hash(FirstDistance(distance=400, unit='m')))
+            self.assertNotEqual(distance, FirstDistance(distance=400.0, unit='km'))
+            self.assertEqual(1, len({distance, FirstDistance(distance=400, unit='m')}))
+            self.assertIs(distance, pickle.loads(pickle.dumps(distance)))
+        except ValueError as ex:
+            self.fail(str(ex))
+
+        try:
+            distance.distance = 5.0
+            self.fail('FirstDistance is expected to be immutable')
+        except AttributeError as ex:
+            self.assertEqual('FirstDistance is immutable', str(ex))
+
+
 if __name__ == '__main__':
     unittest.main()
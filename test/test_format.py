@@ -0,0 +1,43 @@
+import unittest
+
+from first_distance import FirstDistance
+from first_format import cached_format, clear_format_cache, format_cache_info
+from first_pace import FirstPace
+
+
+class TestFirstFormat(unittest.TestCase):
+
+    def test_cache(self):
+
+        clear_format_cache()
+        try:
+            distance = FirstDistance.from_string('5.0 km')
+            self.assertEqual('3.107 mile', distance.to_html(output_unit='mile'))
+            self.assertEqual({'hits': 0, 'misses': 1}, {key: value for key, value in format_cache_info().items()
+                                                        if key in ('hits', 'misses')})
+            self.assertEqual('3.107 mile', FirstDistance(distance=5.0, unit='km').to_html(output_unit='mile'))
+            self.assertEqual('5.000 km', distance.to_html())
+            self.assertEqual(1, format_cache_info()['hits'])
+            self.assertEqual(2, format_cache_info()['size'])
+
+            pace = FirstPace(minutes=8)
+            self.assertEqual('0:04:58 min per km', pace.to_html(output_unit='km'))
+            self.assertEqual('0:04:58 min per km', pace.to_json(output_unit='km')['pace'])
+            self.assertEqual('0:08:00 min per mile', str(pace))
+            self.assertEqual(2, format_cache_info()['hits'])
+            self.assertEqual('3.3668285', cached_format('tcx_speed', (pace, -2), None))
+        except ValueError as ex:
+            self.fail(str(ex))
+
+        try:
+            _ = cached_format('lulu', pace, None)
+            self.fail('Should not get here with an unknown kind')
+        except KeyError as ex:
+            self.assertEqual("'lulu'", str(ex))
+
+        clear_format_cache()
+        self.assertEqual({'hits': 0, 'misses': 0, 'size': 0, 'maxsize': 4096}, format_cache_info())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from first_config import Config
+from first_data import FirstData
+from first_instructions import CompiledRepeat, CompiledStep, FirstInstructionCompiler
+from first_snapshot import FirstSnapshot
+
+
+class TestFirstInstructionCompiler(unittest.TestCase):
+
+    def test_compile_workout(self):
+
+        compiler = FirstInstructionCompiler(segments=FirstSnapshot.from_json(json_path=Config.DATABASE_JSON).segments)
+        try:
+            workout = compiler.compile_workout(instructions='3 1 warmup#2x(1600m#400 m@RI)800m#5 mile@RP+20')
+            self.assertEqual('Week 3 Keyrun 1', workout.name)
+            self.assertEqual('warmup#2x(1600m#400 m@RI)800m#5 mile@RP+20', workout.note)
+            self.assertEqual(4, len(workout.steps))
+            self.assertEqual(CompiledStep(name='warmup', pace_name='warmup', duration=900), workout.steps[0])
+            self.assertEqual(CompiledRepeat(repeat=2, steps=[
+                CompiledStep(name='1600m', pace_name='1600m', distance=(1600.0, 'm')),
+                CompiledStep(name='400 m@RI', pace_name='RI', distance=(400.0, 'm'))]), workout.steps[1])
+            self.assertEqual(CompiledStep(name='5 mile@RP+20', pace_name='RP', distance=(5.0, 'mile'), increment=20),
+                             workout.steps[3])
+        except ValueError as vex:
+            self.fail(str(vex))
+
+        for instructions, message in [('1 1 warmup#3x(400m', 'Unbalanced parentheses'),
+                                      ('1 1 warmup#400m)', 'Unbalanced parentheses'),
+                                      ('1 1 warmup(400m)', 'Syntax error: missing nX before ('),
+                                      ('1 1 warmup#3x', 'Syntax error: trailing nX'),
+                                      ('1 1 5 mile@lng', 'Unknown segment "lng" in "5 mile@lng"'),
+                                      ('1 1 5 mile@RP+x', 'Invalid pace increment in "5 mile@RP+x"'),
+                                      ('1 1 long', 'Either distance or time must have a value in "long"'),
+                                      ('1 1', 'Expected week, key-run and steps in "1 1"')]:
+            try:
+                _ = compiler.compile_workout(instructions=instructions)
+                self.fail('Should not get here with bad instructions')
+            except ValueError as ex:
+                self.assertEqual(message, str(ex))
+
+    def test_load_time_validation(self):
+
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            json_path = os.path.join(tmp_dir, 'training_db.json')
+            with open(Config.DATABASE_JSON, 'r') as fd:
+                content = fd.read()
+            with open(json_path, 'w') as fd:
+                content = content.replace('5 mile@long#1', '5 mile@lng#1')
+                fd.write(content.replace('"1 1 warmup#8x(400m#400 m@RI)cooldown"', '"1 1 warmup#8x(400m)cooldown)"'))
+            try:  # all the errors with their positions
+                _ = FirstData(json_path=json_path)
+                self.fail('Should not get here with bad instructions')
+            except ValueError as ex:
+                self.assertEqual('Invalid plan instructions:\n'
+                                 '  "5K plan instructions" week 1 keyrun 1: Unbalanced parentheses\n'
+                                 '  "10K plan instructions" week 1 keyrun 1: Unbalanced parentheses\n'
+                                 '  "Marathon plan instructions" week 3 keyrun 2: '
+                                 'Unknown segment "lng" in "5 mile@lng"', str(ex))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+        try:  # compiled with the database and reused by plan generation
+            data = FirstData(json_path=Config.DATABASE_JSON)
+            plan = data.plan_instructions[data.plan_index_by_race_name(name='Marathon')]
+            self.assertEqual(len(plan.instructions), len(plan.compiled))
+            self.assertEqual('Week 16 Keyrun 3', plan.compiled[-1].name)
+        except ValueError as vex:
+            self.fail(str(vex))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,11 @@
+import pickle
 import unittest
 
+import numpy
+
+from first_distance import FirstDistance
 from first_pace import FirstPace
+from first_time import FirstTime
 
 
 class TestFirstPace(unittest.TestCase):
@@ -57,3 +62,107 @@ class TestFirstPace(unittest.TestCase):
             self.fail('Should not get here with unit = lulu')
         except ValueError as ex:
             self.assertEqual('"lulu" is not a valid length unit', str(ex))
+
+    def test_value_semantics(self):
+
+        try:
+            pace = FirstPace.from_string('0:08:10 min per mile')
+            self.assertIs(pace, FirstPace(minutes=8, seconds=10))
+            self.assertIs(pace, FirstPace(seconds=490, length_unit='mile'))
+            self.assertIs(pace, FirstPace.copy(pace))
+            self.assertEqual(hash(pace), hash(FirstPace(minutes=8, seconds=10)))
+            self.assertNotEqual(pace, FirstPace(minutes=8, seconds=10, length_unit='km'))
+            self.assertIs(pace, pickle.loads(pickle.dumps(pace)))
+            slower = pace.increment(15)
+            self.assertEqual('0:08:25 min per mile', str(slower))
+            self.assertEqual('0:08:10 min per mile', str(pace))
+        except ValueError as ex:
+            self.fail(str(ex))
+
+        try:
+            pace.length_unit = 'km'
+            self.fail('FirstPace is expected to be immutable')
+        except AttributeError as ex:
+            self.assertEqual('FirstPace is immutable', str(ex))
+
+        valid = FirstPace(seconds=50)  # interned before the invalid ones
+        try:
+            _ = FirstPace(minutes=1, seconds=-10)
+            self.fail('Should not get here with negative seconds')
+        except ValueError as ex:
+            self.assertEqual('negative values are invalid', str(ex))
+
+        try:
+            _ = FirstPace(minutes=-1, seconds=110)
+            self.fail('Should not get here with negative minutes')
+        except ValueError as ex:
+            self.assertEqual('negative values are invalid', str(ex))
+
+        try:
+            _ = FirstPace(seconds=50, length_unit='lulu')
+            self.fail('Should not get here with unit = lulu')
+        except ValueError as ex:
+            self.assertEqual('"lulu" is not a valid length unit', str(ex))
+        self.assertEqual('0:00:50 min per mile', str(valid))
+
+    def test_numeric_conversions(self):
+
+        try:
+            pace = FirstPace.from_string('0:09:00 min per mile')
+            self.assertEqual(pace.to_time(distance=FirstDistance(distance=5.0, unit='km'), unit='second'),
+                             pace.time_for(distance=5.0, distance_unit='km', unit='second'))
+            self.assertEqual(1678, pace.time_for(distance=5.0, distance_unit='km', unit='second'))
+            self.assertEqual([1678.0, 134.0], pace.times_for(distances=numpy.array([5.0, 0.4]), distance_unit='km',
+                                                             unit='second').tolist())
+            self.assertEqual([9.0, 2.25], pace.times_for(distances=[1, 0.25], distance_unit='mile',
+                                                         unit='minute').tolist())
+            self.assertEqual(pace.to_distance(time=FirstTime(minutes=45), unit='km'),
+                             pace.distance_for(seconds=2700, unit='km'))
+            self.assertAlmostEqual(5.0, pace.distance_for(seconds=2700, unit='mile'))
+            self.assertEqual([5.0, 0.5], pace.distances_for(seconds=numpy.array([2700, 270]), unit='mile').tolist())
+        except ValueError as ex:
+            self.fail(str(ex))
+
+        distances = numpy.linspace(0.1, 42.195, 500)
+        durations = numpy.linspace(1, 20000, 500)
+        for pace in [FirstPace.from_string('0:09:00 min per mile'), FirstPace.from_string('0:04:47 min per km')]:
+            for distance_unit, unit in [('km', 'second'), ('mile', 'minute'), ('m', 'hour'), ('km', 'minute')]:
+                self.assertEqual([pace.time_for(distance=distance, distance_unit=distance_unit, unit=unit)
+                                  for distance in distances.tolist()],
+                                 pace.times_for(distances=distances, distance_unit=distance_unit, unit=unit).tolist())
+                self.assertEqual([pace.distance_for(seconds=seconds, unit=distance_unit)
+                                  for seconds in durations.tolist()],
+                                 pace.distances_for(seconds=durations, unit=distance_unit).tolist())
+
+        try:
+            _ = pace.distances_for(seconds=[60], unit='lulu')
+            self.fail('Should not get here with unit = lulu')
+        except ValueError as ex:
+            self.assertEqual('lulu is not a valid unit', str(ex))
+
+    def test_speed(self):
+
+        try:
+            pace = FirstPace(minutes=8, length_unit='mile')
+            self.assertAlmostEqual(480 / 1609.344, pace.seconds_per_meter)
+            self.assertAlmostEqual(480, pace.seconds_per_unit(unit='mile'))
+            self.assertAlmostEqual(298.2582, pace.seconds_per_unit(unit='km'), places=4)
+            self.assertAlmostEqual(3.3528, pace.speed(), places=4)
+            self.assertAlmostEqual(7.5, pace.speed(length_unit='mile', time_unit='hour'))
+            self.assertAlmostEqual(12.0701, pace.speed(length_unit='km', time_unit='hour'), places=4)
+            self.assertAlmostEqual(1609.344 / 470, pace.meters_per_second_delta(-10))
+            self.assertEqual('0:04:58 min per km', pace.to_html(output_unit='km'))
+        except ValueError as ex:
+            self.fail(str(ex))
+
+        try:
+            _ = pace.speed(length_unit='lulu')
+            self.fail('Should not get here with unit = lulu')
+        except ValueError as ex:
+            self.assertEqual('lulu is not a valid unit', str(ex))
+
+        try:
+            pace.seconds_per_meter = 1.0
+            self.fail('FirstPace is expected to be immutable')
+        except AttributeError as ex:
+            self.assertEqual('FirstPace is immutable', str(ex))
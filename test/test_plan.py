@@ -1,5 +1,7 @@
+import gc
 import json
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 
 from first_config import Config
@@ -16,6 +18,17 @@ from first_workout import FirstWorkout
 
 class TestFirstPlan(unittest.TestCase):
 
+    def setUp(self):
+
+        self.data = FirstData(json_path=Config.DATABASE_JSON)
+
+    def plan(self, race_name, target_time, name='test'):
+
+        race = FirstRace(race_type=self.data.get_race_type_by_name(race_name), name=race_name,
+                         race_date=date(year=2017, month=7, day=23), target_time=FirstTime.from_string(target_time))
+
+        return FirstPlan(name=name, weekly_schedule=[1, 3, 5], race=race)
+
     def test_to_string(self):
 
         ws1 = [0, 2, 5]
@@ -225,6 +238,161 @@ class TestFirstPlan(unittest.TestCase):
         except TypeError as tex:
             self.fail(str(tex))
 
+    def test_step_arrays(self):
+
+        plan = self.plan(race_name='Marathon', target_time='3:45:00', name='analytics')
+
+        try:
+            self.assertEqual(0, len(plan.weekly_volume()))
+            plan.generate_workouts(data=self.data)
+            arrays = plan.step_arrays()
+            self.assertEqual(137, len(arrays['pace']))
+            self.assertEqual([1, 3, 3, 1], arrays['count'][:4].tolist())
+            self.assertEqual([0, 0, 0, 0, 1], arrays['workout'][:5].tolist())
+            self.assertEqual(['0:15:00', '0:07:11'], arrays['duration'].format()[:2])
+
+            weekly = plan.weekly_volume(unit='mile')
+            self.assertEqual(16, len(weekly))
+            self.assertAlmostEqual(sum(workout.total() for workout in plan.workouts), weekly.sum())
+            self.assertAlmostEqual(sum(workout.total() for workout in plan.workouts[-3:]), weekly[-1])
+            self.assertAlmostEqual(weekly[0] * 1.609344, plan.weekly_volume(unit='km')[0])
+        except ValueError as vex:
+            self.fail(str(vex))
+
+    def test_unit_conversions(self):
+
+        plan = self.plan(race_name='HalfMarathon', target_time='1:45:00', name='conversions')
+        plan.generate_workouts(data=self.data)
+
+        try:
+            conversions = plan.unit_conversions(units=['km', 'mile'])
+            self.assertEqual(['km', 'mile'], conversions.units)
+            self.assertEqual(plan.to_json(output_unit='km'), plan.to_json(output_unit='km', conversions=conversions))
+            self.assertEqual(plan.to_json(output_unit='m'), plan.to_json(output_unit='m', conversions=conversions))
+            step = plan.workouts[0].steps[0]
+            self.assertEqual(step.pace.seconds_per_unit(unit='km'),
+                             conversions.seconds_per_unit(pace=step.pace, unit='km'))
+            distance = FirstDistance(distance=2.5, unit='mile')
+            self.assertEqual(distance.convert_to(unit='km'), conversions.distance(distance=distance, unit='km'))
+        except ValueError as vex:
+            self.fail(str(vex))
+
+    def test_parallel_generation(self):
+
+        plans = [self.plan(race_name=race_name, target_time=target_time, name=race_name)
+                 for race_name, target_time in [('Marathon', '3:45:00'), ('HalfMarathon', '1:45:00'),
+                                                ('10K', '0:45:00'), ('5K', '0:22:00')]]
+
+        def step_ids(steps):
+            for step in steps:
+                yield step.step_id
+                if isinstance(step, FirstStepRepeat):
+                    yield from step_ids(step.steps)
+
+        with ThreadPoolExecutor(max_workers=len(plans)) as executor:
+            list(executor.map(lambda plan: plan.generate_workouts(data=self.data), plans))
+
+        for plan in plans:
+            ids = [step_id for workout in plan.workouts for step_id in step_ids(workout.steps)]
+            self.assertEqual(list(range(len(ids))), ids)
+
+    def test_timeline(self):
+
+        plan = self.plan(race_name='10K', target_time='0:50:00', name='timeline')
+        plan.generate_workouts(data=self.data)
+
+        segments = plan.timeline()
+        first = next(segments)
+        self.assertIs(plan.workouts[0], first.workout)
+        self.assertEqual(0.0, first.start_time)
+        self.assertEqual(len(plan.workouts), sum(1 for segment in plan.timeline(compressed=True)
+                                                 if segment.start_time == 0))
+        self.assertAlmostEqual(sum(workout.total(unit='m') for workout in plan.workouts),
+                               sum(segment.distance for segment in plan.timeline()))
+
+    def test_shared_steps(self):
+
+        plan1 = self.plan(race_name='Marathon', target_time='3:45:00', name='first')
+        plan1.generate_workouts(data=self.data)
+        plan2 = self.plan(race_name='Marathon', target_time='3:45:00', name='second')
+        plan2.generate_workouts(data=self.data)
+
+        steps1 = [step for workout in plan1.workouts for step in workout.steps]
+        shapes = {id(step.shape) for step in steps1}
+        self.assertLess(len(shapes), len(steps1))  # the warmups, cooldowns and intervals repeat
+
+        for workout1, workout2 in zip(plan1.workouts, plan2.workouts):
+            for step1, step2 in zip(workout1.steps, workout2.steps):
+                self.assertIs(step1.shape, step2.shape)
+                self.assertEqual(step1.to_json(output_unit='km'), step2.to_json(output_unit='km'))
+        self.assertEqual(json.dumps(plan1.to_json()['workouts']), json.dumps(plan2.to_json()['workouts']))
+
+        # changing a result doesn't change the other plan, or the next result
+        expected = json.dumps(plan2.to_json(output_unit='km'))
+        plan1.workouts[0].steps[0].to_json(output_unit='km')['name'] = 'changed'
+        plan1.to_json(output_unit='km')['workouts'][0]['steps'][0]['name'] = 'changed'
+        plan1.workouts[0].steps[0].to_html().add(item='changed')
+        self.assertEqual(expected, json.dumps(plan2.to_json(output_unit='km')))
+        self.assertEqual(plan1.to_json(output_unit='km')['workouts'], plan2.to_json(output_unit='km')['workouts'])
+        self.assertEqual(plan1.to_html(), plan2.to_html().replace('second', 'first'))
+
+        # fragments rendered with conversions are kept per conversions and dropped with them
+        shape = plan1.workouts[0].steps[0].shape
+        conversions = plan1.unit_conversions(units=['km'])
+        self.assertEqual(plan1.workouts[0].steps[0].to_json(output_unit='km'),
+                         plan1.workouts[0].steps[0].to_json(output_unit='km', conversions=conversions))
+        self.assertIn(('json', 'km'), shape.converted_fragments[conversions])
+        count = len(shape.converted_fragments)
+        del conversions
+        gc.collect()
+        self.assertEqual(count - 1, len(shape.converted_fragments))
+
+        plan2.workouts[0].steps[0].name = 'renamed'
+        self.assertIsNot(plan1.workouts[0].steps[0].shape, plan2.workouts[0].steps[0].shape)
+        self.assertNotEqual(json.dumps(plan1.to_json()['workouts']), json.dumps(plan2.to_json()['workouts']))
+
+    def test_cached_conversions(self):
+
+        plan = self.plan(race_name='10K', target_time='0:50:00', name='cached')
+        plan.generate_workouts(data=self.data)
+        shape = plan.workouts[0].steps[0].shape
+        gc.collect()
+
+        # to_json keeps its conversions, so the second call is served from the fragment cache
+        first = plan.to_json(output_unit='km')
+        self.assertEqual(1, len(shape.converted_fragments))
+        conversions, fragments = list(shape.converted_fragments.items())[0]
+        frozen = fragments[('json', 'km')]
+        self.assertEqual(first, plan.to_json(output_unit='km'))
+        self.assertEqual([conversions], list(shape.converted_fragments.keys()))
+        self.assertIs(frozen, shape.converted_fragments[conversions][('json', 'km')])
+
+        # new workouts get new conversions
+        plan.add_workout(workout=plan.workouts[0])
+        self.assertEqual(first['workouts'][0], plan.to_json(output_unit='km')['workouts'][-1])
+        del conversions
+        gc.collect()
+        self.assertEqual(1, len(shape.converted_fragments))
+
+    def test_native_unit(self):
+
+        plan = FirstPlan(name='native', weekly_schedule=[1, 3, 5])
+        workout = FirstWorkout(name='Week 1 Key-run 1', workout_date=date(year=2017, month=6, day=24))
+        step = FirstStepBody(name='Native tempo', pace=FirstPace.from_string('0:08:30 min per mile'),
+                             distance=FirstDistance.from_string('3 mile'))
+        workout.add_step(step=step)
+        plan.add_workout(workout=workout)
+        gc.collect()
+
+        # nothing to convert - the steps are rendered without conversions
+        self.assertEqual({'distance': 3.0, 'unit': 'mile'},
+                         plan.to_json(output_unit='mile')['workouts'][0]['steps'][0]['distance'])
+        self.assertIn(('json', 'mile'), step.shape.fragments)
+        self.assertEqual(0, len(step.shape.converted_fragments))
+
+        self.assertEqual('km', plan.to_json(output_unit='km')['workouts'][0]['steps'][0]['distance']['unit'])
+        self.assertEqual(1, len(step.shape.converted_fragments))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,193 @@
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from first_config import Config
+from first_data import FirstData
+from first_snapshot import FirstSnapshot
+
+
+def attached_long_pace(args):
+
+    snapshot_path, shared_memory_name = args
+    data = FirstData.attach(snapshot_path=snapshot_path, shared_memory_name=shared_memory_name)
+    time_index = data.pace_index_by_race_time(race_time=data.race_times[40][3], race_name='Marathon')
+    return str(data.segment_pace(time_index=time_index, name='long'))
+
+
+class TestFirstSnapshot(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.json_path = os.path.join(self.tmp_dir, 'training_db.json')
+        shutil.copyfile(Config.DATABASE_JSON, self.json_path)
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmp_dir)
+
+    def test_from_json(self):
+
+        try:
+            snapshot = FirstSnapshot.from_json(json_path=self.json_path)
+            self.assertEqual((91, 4), snapshot.race_seconds.shape)
+            self.assertEqual(15 * 60, snapshot.race_seconds[0][0])
+            self.assertEqual(4 * 3600 + 51 * 60 + 56, snapshot.race_seconds[-1][3])
+            self.assertEqual((91, 12), snapshot.pace_seconds.shape)
+            self.assertEqual(30 * 60, snapshot.pace_seconds[-1][0])
+            self.assertEqual(4 * 60 + 22, snapshot.pace_seconds[0][4])
+            self.assertEqual(11 * 60 + 31, snapshot.pace_seconds[-1][11])
+            self.assertEqual(900, snapshot.segments[-3]['time'])
+            self.assertEqual(4, len(snapshot.plans))
+            self.assertEqual(os.path.getsize(self.json_path), snapshot.source['size'])
+        except ValueError as vex:
+            self.fail(str(vex))
+
+    def test_save_load(self):
+
+        try:
+            snapshot = FirstSnapshot.from_json(json_path=self.json_path)
+            path = FirstSnapshot.path_for(json_path=self.json_path)
+            self.assertEqual(os.path.join(self.tmp_dir, 'training_db.snapshot'), path)
+            snapshot.save(path=path)
+            loaded = FirstSnapshot.load(path=path)
+            self.assertEqual(snapshot.name, loaded.name)
+            self.assertEqual(snapshot.segments, loaded.segments)
+            self.assertEqual(snapshot.plans, loaded.plans)
+            self.assertEqual(snapshot.source, loaded.source)
+            self.assertEqual(snapshot.race_seconds.tolist(), loaded.race_seconds.tolist())
+            self.assertEqual(snapshot.pace_seconds.tolist(), loaded.pace_seconds.tolist())
+        except ValueError as vex:
+            self.fail(str(vex))
+
+        with open(path, 'wb') as fd:
+            fd.write(b'lulu')
+        try:  # bad file
+            _ = FirstSnapshot.load(path=path)
+            self.fail('Should not get here with a bad snapshot file')
+        except ValueError as ex:
+            self.assertEqual('Not a FIRST database snapshot', str(ex))
+
+    def test_lazy_plans(self):
+
+        try:  # plans are decoded one by one, with or without the snapshot
+            eager = FirstData(json_path=self.json_path, use_snapshot=False)
+            for use_snapshot in [False, True, True]:  # build, save, then load
+                data = FirstData(json_path=self.json_path, use_snapshot=use_snapshot, lazy_plans=True)
+                self.assertEqual(4, len(data.plan_instructions))
+                self.assertFalse(data.plan_instructions.is_loaded(2))
+                self.assertEqual(2, data.plan_index_by_race_name(name='HalfMarathon'))
+                plan = data.plan_instructions[2]
+                self.assertTrue(data.plan_instructions.is_loaded(2))
+                self.assertFalse(data.plan_instructions.is_loaded(3))
+                self.assertIs(plan, data.plan_instructions[2])
+                self.assertEqual(eager.plan_instructions[2].instructions, plan.instructions)
+                self.assertEqual(len(plan.instructions), len(plan.compiled))
+                self.assertEqual('Marathon plan instructions', data.plan_instructions[-1].name)
+        except ValueError as vex:
+            self.fail(str(vex))
+
+        try:  # only the snapshot is read - the source may change or go away
+            data = FirstData(json_path=self.json_path, lazy_plans=True)
+            self.assertFalse(data.plan_instructions.is_loaded(0))
+            with open(self.json_path, 'a') as fd:
+                fd.write('\n')
+            self.assertEqual(eager.plan_instructions[0].instructions, data.plan_instructions[0].instructions)
+            os.remove(self.json_path)
+            os.remove(FirstSnapshot.path_for(json_path=self.json_path))
+            self.assertEqual(eager.plan_instructions[3].instructions, data.plan_instructions[3].instructions)
+            self.assertEqual(len(eager.plan_instructions[3].compiled), len(data.plan_instructions[3].compiled))
+        except ValueError as vex:
+            self.fail(str(vex))
+
+    def test_cached(self):
+
+        path = FirstSnapshot.path_for(json_path=self.json_path)
+        try:  # built and saved on the first load
+            data = FirstData(json_path=self.json_path)
+            self.assertTrue(os.path.exists(path))
+            self.assertEqual('0:04:22 min per mile', str(data.segments_paces[0][4]))
+            first_mtime = os.stat(path).st_mtime_ns
+
+            data = FirstData(json_path=self.json_path)  # loaded from the snapshot
+            self.assertEqual(first_mtime, os.stat(path).st_mtime_ns)
+            self.assertEqual('1:34:15', str(data.race_times[32][2]))
+        except ValueError as vex:
+            self.fail(str(vex))
+
+        try:  # corrupted snapshot is rebuilt
+            with open(path, 'wb') as fd:
+                fd.write(b'lulu')
+            data = FirstData(json_path=self.json_path)
+            self.assertEqual(91, len(data.segments_paces))
+            self.assertEqual(4, len(FirstSnapshot.load(path=path).races))
+        except ValueError as vex:
+            self.fail(str(vex))
+
+        try:  # stale snapshot is rebuilt when the source changes
+            with open(self.json_path, 'r') as fd:
+                content = fd.read()
+            with open(self.json_path, 'w') as fd:
+                fd.write(content.replace('"0:15:00 1:02 1:36', '"0:15:00 1:01 1:36'))
+            data = FirstData(json_path=self.json_path)
+            self.assertEqual('0:04:05 min per mile', str(data.segments_paces[0][1]))
+        except ValueError as vex:
+            self.fail(str(vex))
+
+    def test_publish_attach(self):
+
+        eager = FirstData(json_path=self.json_path, use_snapshot=False)
+        time_index = eager.pace_index_by_race_time(race_time=eager.race_times[40][3], race_name='Marathon')
+        expected = str(eager.segment_pace(time_index=time_index, name='long'))
+        path = os.path.join(self.tmp_dir, 'published.snapshot')
+        try:  # memory-mapped snapshot file
+            FirstData(json_path=self.json_path, lazy_plans=True).publish(snapshot_path=path)
+            data = FirstData.attach(snapshot_path=path)
+            self.assertFalse(data.snapshot.race_seconds.flags.writeable)
+            self.assertFalse(data.snapshot.race_seconds.flags.owndata)
+            self.assertEqual(eager.plan_instructions[3].instructions, data.plan_instructions[3].instructions)
+            self.assertEqual('1:34:15', str(data.race_times[32][2]))
+        except ValueError as vex:
+            self.fail(str(vex))
+
+        block = eager.publish_shared()
+        try:  # shared memory from worker processes
+            data = FirstData.attach(shared_memory_name=block.name)
+            self.assertEqual(eager.pace_matrix.tolist(), data.pace_matrix.tolist())
+            with multiprocessing.Pool(processes=2) as pool:
+                self.assertEqual([expected] * 4, pool.map(attached_long_pace, [(path, None), (None, block.name)] * 2))
+        except ValueError as vex:
+            self.fail(str(vex))
+        finally:
+            block.unlink()
+
+        block = eager.publish_shared()
+        try:  # a process that was not started by the publisher leaves the block alone when it exits
+            script = 'import sys; from first_data import FirstData; ' \
+                     'print(FirstData.attach(shared_memory_name=sys.argv[1]).race_times[32][2])'
+            src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+            result = subprocess.run([sys.executable, '-c', script, block.name], capture_output=True, text=True,
+                                    env=dict(os.environ, PYTHONPATH=src_dir), check=True)
+            self.assertEqual('1:34:15', result.stdout.strip())
+            self.assertNotIn('leaked', result.stderr)
+            data = FirstData.attach(shared_memory_name=block.name)
+            self.assertEqual(eager.pace_matrix.tolist(), data.pace_matrix.tolist())
+        except ValueError as vex:
+            self.fail(str(vex))
+        finally:
+            block.unlink()
+
+        try:
+            _ = FirstData.attach()
+            self.fail('Should not get here without a source')
+        except ValueError as ex:
+            self.assertEqual('Exactly one of snapshot_path and shared_memory_name is required', str(ex))
+
+
+if __name__ == '__main__':
+    unittest.main()
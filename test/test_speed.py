@@ -0,0 +1,93 @@
+import pickle
+import unittest
+
+from first_pace import FirstPace
+from first_speed import FirstSpeed
+
+
+class TestFirstSpeed(unittest.TestCase):
+
+    def test_to_string(self):
+
+        try:
+            speed = FirstSpeed(speed=7.5)
+            self.assertEqual('7.500 mile per hour', str(speed))
+            self.assertEqual('12.070 km per hour', speed.to_html(output_unit='km'))
+            self.assertEqual({'speed': '12.070 km per hour', 'length_unit': 'km', 'time_unit': 'hour',
+                              'value': 12.07008}, {key: round(value, 5) if key == 'value' else value
+                                                   for key, value in speed.to_json(output_unit='km').items()})
+            self.assertEqual('7.500 mile per hour', speed.to_json()['speed'])
+        except ValueError as ex:
+            self.fail(str(ex))
+
+        try:
+            _ = FirstSpeed(speed=3, length_unit='lulu')
+            self.fail('Should not get here with unit = lulu')
+        except ValueError as ex:
+            self.assertEqual('"lulu" is not a valid length unit', str(ex))
+
+        try:
+            _ = FirstSpeed(speed=3, time_unit='day')
+            self.fail('Should not get here with time unit = day')
+        except ValueError as ex:
+            self.assertEqual('"day" is not a valid time unit', str(ex))
+
+        try:
+            _ = FirstSpeed(speed=0)
+            self.fail('Should not get here with speed = 0')
+        except ValueError as ex:
+            self.assertEqual('0 is not a positive number', str(ex))
+
+    def test_from_string(self):
+
+        try:
+            speed = FirstSpeed.from_string('3.5 m per second')
+            self.assertIs(speed, FirstSpeed(speed=3.5, length_unit='m', time_unit='second'))
+            self.assertAlmostEqual(12.6, speed.convert_to(length_unit='km', time_unit='hour'))
+            self.assertIs(speed, pickle.loads(pickle.dumps(speed)))
+        except ValueError as ex:
+            self.fail(str(ex))
+
+        try:
+            _ = FirstSpeed.from_string('3.5 m/s')
+            self.fail('Should not get here with "3.5 m/s"')
+        except ValueError as ex:
+            self.assertEqual('expected "value length_unit per time_unit" but got "3.5 m/s"', str(ex))
+
+        try:
+            speed.speed = 1
+            self.fail('FirstSpeed is expected to be immutable')
+        except AttributeError as ex:
+            self.assertEqual('FirstSpeed is immutable', str(ex))
+
+    def test_pace(self):
+
+        try:
+            pace = FirstPace(minutes=8)
+            speed = FirstSpeed.from_pace(pace=pace)
+            self.assertAlmostEqual(7.5, speed.speed)
+            self.assertAlmostEqual(pace.seconds_per_meter, speed.seconds_per_meter)
+            self.assertIs(pace, speed.to_pace())
+            self.assertEqual('0:04:58 min per km', str(speed.to_pace(length_unit='km')))
+            self.assertEqual(pace.time_for(distance=5, distance_unit='km', unit='second'),
+                             speed.time_for(distance=5, distance_unit='km', unit='second'))
+            self.assertEqual([1491.0, 3600.0], speed.times_for(distances=[5000, 12070.08], distance_unit='m',
+                                                               unit='second').tolist())
+            self.assertAlmostEqual(7.5, speed.distance_for(seconds=3600, unit='mile'))
+            self.assertAlmostEqual(12.07008, speed.distances_for(seconds=[3600], unit='km')[0])
+            self.assertAlmostEqual(pace.meters_per_second_delta(5), speed.meters_per_second_delta(5))
+
+            speed = FirstSpeed(speed=12.5, length_unit='km')
+            distances = [0.1 * index for index in range(1, 500)]
+            for distance_unit, unit in [('km', 'second'), ('mile', 'minute'), ('m', 'hour')]:
+                self.assertEqual([speed.time_for(distance=distance, distance_unit=distance_unit, unit=unit)
+                                  for distance in distances],
+                                 speed.times_for(distances=distances, distance_unit=distance_unit, unit=unit).tolist())
+                self.assertEqual([speed.distance_for(seconds=seconds, unit=distance_unit) for seconds in distances],
+                                 speed.distances_for(seconds=distances, unit=distance_unit).tolist())
+        except ValueError as ex:
+            self.fail(str(ex))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from first_config import Config
+from first_data import FirstData
+from first_plan import FirstPlan
+from first_race import FirstRace
+from first_sqlite import FirstSqliteData
+from first_time import FirstTime
+
+
+class TestFirstSqliteData(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, 'training_db.sqlite')
+        FirstSqliteData.import_json(json_path=Config.DATABASE_JSON, db_path=self.db_path)
+        self.data = FirstSqliteData(db_path=self.db_path)
+        self.json_data = FirstData(json_path=Config.DATABASE_JSON)
+
+    def tearDown(self):
+
+        self.data.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_lookups(self):
+
+        data = self.data
+        try:
+            self.assertEqual(4, len(data.race_types))
+            self.assertEqual(2, data.race_type_index_by_name(name='Half Marathon'))
+            self.assertEqual('13.11 mile', str(data.get_race_type_by_name(name='half').distance))
+            self.assertEqual(14, len(data.segments))
+            self.assertEqual('cooldown  time  0:10:00  easy', str(data.segment_by_name('cooldown')))
+            from_time = FirstTime.from_string(string='0:20:13')
+            self.assertEqual('1:34:15', str(data.equivalent_time(time_from=from_time,
+                                                                 race_index_from=0, race_index_to=2)))
+            for seconds in range(14 * 60, 30 * 60, 37):
+                time = FirstTime(seconds=seconds)
+                self.assertEqual(self.json_data.equivalent_time(time_from=time, race_index_from=0, race_index_to=3),
+                                 data.equivalent_time(time_from=time, race_index_from=0, race_index_to=3))
+                self.assertEqual(self.json_data.pace_index_by_race_time(race_time=time, race_name='5K'),
+                                 data.pace_index_by_race_time(race_time=time, race_name='5K'))
+            self.assertEqual('0:04:22 min per mile', str(data.segment_pace(time_index=0, name='1000m')))
+            self.assertEqual('0:11:31 min per mile', str(data.segment_pace(time_index=90, name='warmup')))
+            self.assertEqual(self.json_data.pace_column('long').tolist(), data.pace_column('long').tolist())
+            self.assertEqual(4, len(data.plan_instructions))
+            self.assertEqual(self.json_data.plan_instructions[3].instructions,
+                             data.plan_instructions[-1].instructions)
+        except ValueError as vex:
+            self.fail(str(vex))
+
+        try:  # time not found high
+            _ = data.equivalent_time(time_from=FirstTime.from_string('4:49:59'), race_index_from=2, race_index_to=0)
+            self.fail('Should not get here with time not found')
+        except ValueError as ex:
+            self.assertEqual('Time is longer than the highest database time', str(ex))
+
+        try:  # time not found low
+            _ = data.equivalent_time(time_from=FirstTime.from_string('0:49:59'), race_index_from=2, race_index_to=0)
+            self.fail('Should not get here with time not found')
+        except ValueError as ex:
+            self.assertEqual('Time is shorter than the lowest database time', str(ex))
+
+        try:  # bad database file
+            _ = FirstSqliteData(db_path='lulu')
+            self.fail('Should not get here with bad file name')
+        except IOError as ioex:
+            self.assertEqual('lulu is not a database file', str(ioex))
+
+    def test_generate_workouts(self):
+
+        plans = []
+        for data in [self.json_data, self.data]:
+            race = FirstRace(race_type=data.get_race_type_by_name('Marathon'), name='San Francisco Marathon',
+                             race_date=date(year=2017, month=7, day=23),
+                             target_time=FirstTime.from_string('3:30:00'))
+            plan = FirstPlan(name='My first marathon training plan', weekly_schedule=[0, 2, 5], race=race)
+            plan.generate_workouts(data=data)
+            plans.append(plan)
+
+        self.assertEqual(plans[0].to_json(), plans[1].to_json())
+
+    def test_equal_times(self):
+
+        json_path = os.path.join(self.tmp_dir, 'equal_times.json')
+        db_path = os.path.join(self.tmp_dir, 'equal_times.sqlite')
+        with open(Config.DATABASE_JSON, 'r') as fd:
+            database = json.load(fd)
+        for row in range(1, 4):  # rows 0-3 have the same 5K time
+            database['equivalent_times'][row][0] = database['equivalent_times'][0][0]
+        with open(json_path, 'w') as fd:
+            json.dump(database, fd)
+
+        FirstSqliteData.import_json(json_path=json_path, db_path=db_path)
+        data = FirstSqliteData(db_path=db_path)
+        json_data = FirstData(json_path=json_path, use_snapshot=False)
+        try:
+            for time in [FirstTime.from_string('0:14:50'), FirstTime.from_string('0:15:00'),
+                         FirstTime.from_string('0:15:01')]:
+                self.assertEqual(json_data.equivalent_time_index(time_from=time, race_index_from=0),
+                                 data.equivalent_time_index(time_from=time, race_index_from=0))
+                self.assertEqual(json_data.pace_index_by_race_time(race_time=time, race_name='5K'),
+                                 data.pace_index_by_race_time(race_time=time, race_name='5K'))
+            self.assertEqual(0, data.equivalent_time_index(time_from=FirstTime.from_string('0:15:00'),
+                                                           race_index_from=0))
+        except ValueError as vex:
+            self.fail(str(vex))
+        finally:
+            data.close()
+
+    def test_threads(self):
+
+        times = [FirstTime(seconds=seconds) for seconds in range(14 * 60, 30 * 60, 7)]
+
+        def lookup(time):
+            return (self.data.equivalent_time(time_from=time, race_index_from=0, race_index_to=3),
+                    self.data.pace_index_by_race_time(race_time=time, race_name='5K'),
+                    self.data.plan_instructions[int(time.total_seconds()) % 4].name)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lookup, times))
+
+        self.assertEqual([lookup(time) for time in times], results)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,8 +3,10 @@ import unittest
 # so i don't forget - decided to put the 'repeat' feature in the workout instead recursively here
 from first_distance import FirstDistance
 from first_pace import FirstPace
+from first_speed import FirstSpeed
 from first_step import FirstStepBody, FirstStepRepeat, FirstStepBase
 from first_time import FirstTime
+from first_utils import FirstUtils
 
 
 class TestFirstStepNew(unittest.TestCase):
@@ -148,6 +150,38 @@ class TestFirstStepNew(unittest.TestCase):
         except ValueError as ex:
             self.assertEqual('Cannot set both distance and duration in the same step', str(ex))
 
+    def test_speed_target(self):
+
+        FirstStepBase.reset_global_id()
+
+        speed = FirstSpeed.from_string('6 mile per hour')
+        distance = FirstDistance.from_string(string='3 mile')
+
+        try:
+            step_b = FirstStepBody(name='3 miles @ 6 mph', pace=speed, distance=distance)
+            self.assertEqual('speed', step_b.get_target_type())
+            cmp_string = 'Step: "3 miles @ 6 mph"  id = 0\n' + \
+                         'type - body  speed - 6.000 mile per hour\nDistance - 3.0 mile\n'
+            self.assertEqual(cmp_string, str(step_b))
+            self.assertAlmostEqual(30.0, step_b.total(what='time', unit='minute'), 5)
+            self.assertEqual('  Step: "3 miles @ 6 mph"\n    3.0 mile  at  6.000 mile per hour\n',
+                             step_b.details(indent='  '))
+            cmp_json = {'distance': {'distance': 4.828032, 'unit': 'km'},
+                        'name': '3 miles @ 6 mph',
+                        'speed': {'length_unit': 'km', 'speed': '9.656 km per hour', 'time_unit': 'hour',
+                                  'value': 9.656064}}
+            FirstUtils.assert_deep_almost_equal(self, cmp_json, step_b.to_json(output_unit='km'), 5)
+            self.assertIn('3 miles @ 6 mph - 4.828 km at 9.656 km per hour',
+                          step_b.to_html(output_unit='km').indented_str())
+            tcx = step_b.tcx().indented_str()
+            self.assertIn('<LowInMetersPerSecond>2.6600727</LowInMetersPerSecond>', tcx)
+            self.assertIn('<HighInMetersPerSecond>2.7047798</HighInMetersPerSecond>', tcx)
+
+            step_t = FirstStepBody(name='20 minutes', pace=speed, time=FirstTime(minutes=20))
+            self.assertAlmostEqual(2.0, step_t.total(unit='mile'), 5)
+        except ValueError as ex:
+            self.fail(str(ex))
+
     def test_repeat(self):
 
         FirstStepBase.reset_global_id()
@@ -291,6 +325,145 @@ class TestFirstStepNew(unittest.TestCase):
         except ValueError as ex:
             self.assertEqual('repeat must be greater than 0', str(ex))
 
+    def test_totals_cache(self):
+
+        FirstStepBase.reset_global_id()
+
+        pace = FirstPace.from_string(str_input='0:10:00 min per mile')
+        step_b = FirstStepBody(name='1 mile', pace=pace, distance=FirstDistance.from_string(string='1 mile'))
+        step_t = FirstStepBody(name='5 minutes', pace=pace, time=FirstTime(minutes=5))
+
+        try:
+            repeat = FirstStepRepeat(name='repeat X 3', repeat=3)
+            repeat.set_steps(steps=[step_b])
+            self.assertIs(repeat, step_b.parent)
+            self.assertEqual((3.0, 30.0), repeat.totals(distance_unit='mile', time_unit='minute'))
+            self.assertIs(repeat.totals(distance_unit='mile', time_unit='minute'),
+                          repeat.totals(distance_unit='mile', time_unit='minute'))
+
+            repeat.add_step(step=step_t)
+            self.assertEqual((4.5, 45.0), repeat.totals(distance_unit='mile', time_unit='minute'))
+            self.assertAlmostEqual(4.5, repeat.total(unit='mile'))
+
+            step_b.pace = FirstPace.from_string(str_input='0:08:00 min per mile')
+            self.assertEqual((4.5, 39.0), repeat.totals(distance_unit='mile', time_unit='minute'))
+            self.assertAlmostEqual(39.0, repeat.total(what='time', unit='minute'))
+
+            repeat.repeat = 2
+            self.assertEqual((3.0, 26.0), repeat.totals(distance_unit='mile', time_unit='minute'))
+
+            step_t.time = FirstTime(minutes=10)
+            self.assertEqual((4.0, 36.0), repeat.totals(distance_unit='mile', time_unit='minute'))
+        except ValueError as ex:
+            self.fail(str(ex))
+
+        try:  # the steps can only change through the methods that clear the totals
+            self.assertEqual((step_b, step_t), repeat.steps)
+            self.assertRaises(AttributeError, lambda: repeat.steps.append(step_t))
+            with self.assertRaises(AttributeError):
+                repeat.steps = []
+
+            repeat.remove_step(step=step_t)
+            self.assertIsNone(step_t.parent)
+            self.assertEqual((step_b,), repeat.steps)
+            self.assertEqual((2.0, 16.0), repeat.totals(distance_unit='mile', time_unit='minute'))
+            repeat.add_step(step=step_t)
+        except ValueError as ex:
+            self.fail(str(ex))
+
+        try:  # moving a step to another repeat changes the totals of the old parent and its parents
+            outer = FirstStepRepeat(name='repeat X 2', repeat=2)
+            outer.add_step(step=repeat)
+            other = FirstStepRepeat(name='repeat X 1', repeat=1)
+            self.assertEqual((8.0, 72.0), outer.totals(distance_unit='mile', time_unit='minute'))
+
+            other.add_step(step=step_t)
+            self.assertIs(other, step_t.parent)
+            self.assertEqual((step_b,), repeat.steps)
+            self.assertEqual((2.0, 16.0), repeat.totals(distance_unit='mile', time_unit='minute'))
+            self.assertEqual((4.0, 32.0), outer.totals(distance_unit='mile', time_unit='minute'))
+            self.assertEqual((1.0, 10.0), other.totals(distance_unit='mile', time_unit='minute'))
+
+            repeat.set_steps(steps=[step_b, step_t])
+            self.assertEqual((), other.steps)
+            self.assertEqual((0, 0), other.totals(distance_unit='mile', time_unit='minute'))
+            self.assertEqual((8.0, 72.0), outer.totals(distance_unit='mile', time_unit='minute'))
+        except ValueError as ex:
+            self.fail(str(ex))
+
+        try:
+            other.remove_step(step=step_t)
+            self.fail('Should not get here with a step of another repeat')
+        except ValueError as ex:
+            self.assertEqual('step is not a child of this repeat', str(ex))
+
+        try:
+            _ = repeat.total(what='speed')
+            self.fail('Should not get here with what = speed')
+        except ValueError as ex:
+            self.assertEqual('what must be "distance" or "time"', str(ex))
+
+        try:
+            repeat.repeat = 0
+            self.fail('Should not get here with repeat = 0')
+        except ValueError as ex:
+            self.assertEqual('repeat must be greater than 0', str(ex))
+
+    def test_shared_shape(self):
+
+        FirstStepBase.reset_global_id()
+
+        pace = FirstPace.from_string(str_input='0:10:00 min per mile')
+
+        def intervals():
+            repeat = FirstStepRepeat(name='repeat X 2', repeat=2)
+            repeat.set_steps(steps=[FirstStepBody(name='800m', pace=pace, distance=FirstDistance(800, 'm')),
+                                    FirstStepBody(name='400 m@RI', pace=pace, time=FirstTime(minutes=2))])
+            return repeat
+
+        try:
+            repeat1 = intervals()
+            repeat2 = intervals()
+            self.assertNotEqual(repeat1.step_id, repeat2.step_id)
+            self.assertIs(repeat1.shape, repeat2.shape)
+            self.assertIs(repeat1.steps[0].shape, repeat1.shape.steps[0])
+            self.assertEqual(repeat1.to_json(), repeat2.to_json())
+            self.assertIn(('json', None), repeat1.shape.fragments)
+            self.assertEqual(repeat1.to_html(output_unit='km').indented_str(),
+                             repeat2.to_html(output_unit='km').indented_str())
+            self.assertNotEqual(repeat1.to_json(), repeat1.to_json(output_unit='km'))
+
+            # every caller gets its own copy of the cached fragments
+            result = repeat1.to_json()
+            result['name'] = 'changed'
+            result['steps'][0]['pace']['time']['seconds'] = 0
+            self.assertEqual('repeat X 2', repeat2.to_json()['name'])
+            self.assertEqual(600, repeat2.to_json()['steps'][0]['pace']['time']['seconds'])
+            html = repeat1.to_html(output_unit='km').indented_str()
+            tag = repeat1.to_html(output_unit='km')
+            tag.add(item='changed')
+            tag.items[0].add(item='changed')
+            self.assertEqual(html, repeat2.to_html(output_unit='km').indented_str())
+
+            repeat2.steps[1].time = FirstTime(minutes=3)
+            self.assertIsNot(repeat1.shape, repeat2.shape)
+            self.assertEqual(180, repeat2.to_json()['steps'][1]['time']['seconds'])
+            self.assertEqual(120, repeat1.to_json()['steps'][1]['time']['seconds'])
+
+            repeat2.steps[1].time = FirstTime(minutes=2)
+            self.assertIs(repeat1.shape, repeat2.shape)
+
+            repeat2.name = 'intervals'
+            self.assertEqual('intervals', repeat2.to_json()['name'])
+            self.assertEqual('repeat X 2', repeat1.to_json()['name'])
+
+            # 1 mile and 1.0 mile are equal but render differently
+            mile = FirstStepBody(name='1 mile', pace=pace, distance=FirstDistance(1, 'mile'))
+            mile_float = FirstStepBody(name='1 mile', pace=pace, distance=FirstDistance(1.0, 'mile'))
+            self.assertIsNot(mile.shape, mile_float.shape)
+        except ValueError as ex:
+            self.fail(str(ex))
+
     def test_reset(self):
 
         FirstStepBase.reset_global_id()
@@ -1,3 +1,4 @@
+import pickle
 import unittest
 
 from first_time import FirstTime
@@ -37,7 +38,7 @@ class TestFirstTime(unittest.TestCase):
             _ = FirstTime.from_string(string='abc')
             self.fail('FirstTime is expected to fail with "abc"')
         except ValueError as ex:
-            self.assertEqual('(\'Unknown string format:\', \'abc\')', str(ex))
+            self.assertEqual('unknown string format for "abc"', str(ex))
 
         try:
             time = FirstTime.from_string(string='3:45')
@@ -57,6 +58,85 @@ class TestFirstTime(unittest.TestCase):
         except ValueError as ex:
             self.assertEqual('unknown string format for "4/15/2015"', str(ex))
 
+        try:  # ultra races
+            time = FirstTime.from_string(string='26:03:09')
+            self.assertEqual(26 * 3600 + 3 * 60 + 9, time.total_seconds())
+            self.assertEqual('1 day, 2:03:09', str(time))
+        except ValueError:
+            self.fail('test_from_string should not fail for valid string')
+
+        for string in ['1:60:00', '1:20:75']:
+            try:
+                _ = FirstTime.from_string(string=string)
+                self.fail('test_from_string should not pass for "{}"'.format(string))
+            except ValueError as ex:
+                self.assertEqual('minutes and seconds must be less than 60 in "{}"'.format(string), str(ex))
+
+        for string in ['0:00:00', '1:2:3:4', '1:02:03.5', '-1:00:00', '1::00']:
+            try:
+                _ = FirstTime.from_string(string=string)
+                self.fail('test_from_string should not pass for "{}"'.format(string))
+            except ValueError as ex:
+                self.assertEqual('unknown string format for "{}"'.format(string), str(ex))
+
+    def test_parse_many(self):
+
+        try:
+            self.assertEqual([900, 1883, 4172, 8758, 90000], FirstTime.parse_many(
+                strings=['0:15:00', '0:31:23', '1:09:32', '2:25:58', '25:00']))
+            self.assertEqual([], FirstTime.parse_many(strings=[]))
+        except ValueError:
+            self.fail('test_parse_many should not fail for valid strings')
+
+        try:
+            _ = FirstTime.parse_many(strings=['0:15:00', 'abc'])
+            self.fail('FirstTime is expected to fail with "abc"')
+        except ValueError as ex:
+            self.assertEqual('unknown string format for "abc"', str(ex))
+
+    def test_milliseconds(self):
+
+        try:
+            lap = FirstTime(seconds=71.3)
+            self.assertEqual(71300, lap.milliseconds)
+            self.assertEqual(71.3, lap.total_seconds())
+            self.assertEqual('0:01:11.300000', str(lap))
+            self.assertEqual({'time': '0:01:11.300000', 'seconds': 71.3}, lap.to_json())
+            self.assertEqual(FirstTime(seconds=71, milliseconds=300), lap)
+            self.assertEqual(FirstTime(minutes=4, seconds=45.2), lap * 4)
+            self.assertEqual(FirstTime(minutes=4, seconds=45.2), 4 * lap)
+            self.assertEqual(FirstTime(seconds=35.65), lap / 2)
+            self.assertEqual(4.0, (lap * 4) / lap)
+            self.assertEqual(FirstTime(seconds=142.6), lap + lap)
+            self.assertEqual(FirstTime(seconds=1.3), lap - FirstTime(seconds=70))
+            self.assertTrue(FirstTime(seconds=71) < lap <= FirstTime(seconds=71.3))
+            self.assertEqual(sorted([lap, FirstTime(minutes=1)]), [FirstTime(minutes=1), lap])
+            self.assertFalse(FirstTime())
+            self.assertEqual(hash(lap), hash(FirstTime.from_milliseconds(71300)))
+            self.assertEqual(lap, pickle.loads(pickle.dumps(lap)))
+        except ValueError as ex:
+            self.fail(str(ex))
+
+        try:  # more than a day
+            time = FirstTime(hours=50, seconds=5)
+            self.assertEqual((2, 7205, 0), (time.days, time.seconds, time.microseconds))
+            self.assertEqual('2 days, 2:00:05', str(time))
+            self.assertEqual({'time': '2 days, 2:00:05', 'seconds': 180005}, time.to_json())
+        except ValueError as ex:
+            self.fail(str(ex))
+
+        try:
+            _ = FirstTime(seconds=1) - FirstTime(seconds=2)
+            self.fail('FirstTime should not accept negative values')
+        except ValueError as ex:
+            self.assertEqual('negative values are invalid', str(ex))
+
+        try:
+            lap.milliseconds = 0
+            self.fail('FirstTime is expected to be immutable')
+        except AttributeError as ex:
+            self.assertEqual('FirstTime is immutable', str(ex))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+from first_distance import FirstDistance
+from first_units import FirstUnitRegistry
+
+
+class TestFirstUnitRegistry(unittest.TestCase):
+
+    def test_registry(self):
+
+        try:
+            units = FirstUnitRegistry(sizes={'m': 1, 'km': 1000, 'mile': 1609.344})
+            self.assertEqual(['m', 'km', 'mile'], units.names)
+            self.assertEqual(1, units.unit_id(name='km'))
+            self.assertTrue(units.is_valid(name='mile'))
+            self.assertFalse(units.is_valid(name='ft'))
+            self.assertEqual((3, 3), units.matrix.shape)
+            self.assertEqual(1000.0, units.factor(from_unit='km', to_unit='m'))
+            self.assertEqual('1.609344', '{:.6f}'.format(units.factor(from_unit='mile', to_unit='km')))
+            self.assertEqual(2500, units.convert(value=2.5, from_unit='km', to_unit='m'))
+
+            to_km = units.converter(from_unit='mile', to_unit='km')
+            self.assertIs(to_km, units.converter(from_unit='mile', to_unit='km'))
+            self.assertEqual(26.22 * 1609.344 / 1000, to_km(26.22))
+            self.assertEqual(5, units.converter(from_unit='km', to_unit='km')(5))
+        except ValueError as ex:
+            self.fail(str(ex))
+
+        try:  # new units
+            self.assertEqual(3, units.register(name='lap', size=400.0))
+            self.assertEqual(3, units.register(name='lap', size=400.0))
+            self.assertEqual((4, 4), units.matrix.shape)
+            self.assertEqual(10.5, units.convert(value=4.2, from_unit='km', to_unit='lap'))
+        except ValueError as ex:
+            self.fail(str(ex))
+
+        for name, size, message in [('lap', 300.0, 'lap is already registered with a different size'),
+                                    ('zero', 0, 'unit size must be positive')]:
+            try:
+                units.register(name=name, size=size)
+                self.fail('Should not get here with a bad unit')
+            except ValueError as ex:
+                self.assertEqual(message, str(ex))
+
+        try:
+            _ = units.converter(from_unit='m', to_unit='mm')
+            self.fail('Should not get here with unknown unit')
+        except ValueError as ex:
+            self.assertEqual('mm is not a valid unit', str(ex))
+
+    def test_distance_units(self):
+
+        try:
+            FirstDistance.units.register(name='nmi', size=1852.0)
+            distance = FirstDistance.from_string('2.0 nmi')
+            self.assertEqual(3.704, distance.convert_to(unit='km'))
+            self.assertEqual('3704', '{:.0f}'.format(distance.convert_to(unit='m')))
+        except ValueError as ex:
+            self.fail(str(ex))
+
+
+if __name__ == '__main__':
+    unittest.main()
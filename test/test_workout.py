@@ -492,6 +492,40 @@ class TestFirstWorkout(unittest.TestCase):
         except ValueError as ex:
             self.assertEqual('Unbalanced parentheses', str(ex))
 
+    def test_timeline(self):
+
+        rp = FirstPace.from_string(str_input='0:09:35 min per mile')
+        data = FirstData(json_path=Config.DATABASE_JSON)
+        instructions = '1 1 warmup#3x(1600m#200 m@RI)cooldown'
+        wo1 = FirstWorkout.from_instructions(instructions=instructions, wo_date=date(2017, 8, 21), data=data,
+                                             time_index=50, race_pace=rp)
+
+        try:
+            segments = list(wo1.timeline())
+            self.assertEqual(8, len(segments))
+            self.assertEqual(['warmup'] + ['1600m', '200 m@RI'] * 3 + ['cooldown'],
+                             [segment.step.name for segment in segments])
+            self.assertIs(segments[1].step, segments[3].step)
+            self.assertEqual([1] * 8, [segment.count for segment in segments])
+            self.assertEqual(0.0, segments[0].start_time)
+            for previous, segment in zip(segments, segments[1:]):
+                self.assertAlmostEqual(previous.start_time + previous.duration, segment.start_time)
+                self.assertAlmostEqual(previous.start_distance + previous.distance, segment.start_distance)
+            self.assertAlmostEqual(wo1.total(what='time', unit='second'),
+                                   segments[-1].start_time + segments[-1].duration)
+            self.assertAlmostEqual(wo1.total(unit='m'), segments[-1].start_distance + segments[-1].distance)
+            self.assertAlmostEqual(1600, segments[3].distance)
+
+            compressed = list(wo1.timeline(compressed=True))
+            self.assertEqual(3, len(compressed))
+            self.assertIs(wo1.steps[1], compressed[1].step)
+            self.assertEqual([1, 3, 1], [segment.count for segment in compressed])
+            self.assertAlmostEqual(segments[7].start_time, compressed[2].start_time)
+            self.assertAlmostEqual(segments[7].start_distance, compressed[2].start_distance)
+            self.assertIs(wo1, compressed[0].workout)
+        except ValueError as ex:
+            self.fail(str(ex))
+
 
 if __name__ == '__main__':
     unittest.main()